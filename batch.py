@@ -0,0 +1,223 @@
+"""Headless batch conversion of image folders
+
+Usage:
+    python main.py batch --to lab,hsv --jobs 8 in_dir out_dir
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import engine
+import lut3d
+import spaces as color_spaces
+
+# Target spaces offered by the batch command
+TARGET_SPACES = color_spaces.target_names()
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# Inputs read in the parent to calibrate the 3D lookup tables on
+SAMPLE_FILES = 3
+
+
+def find_images(in_dir):
+    """Return the sorted list of image files directly inside in_dir"""
+    files = []
+    for name in sorted(os.listdir(in_dir)):
+        path = os.path.join(in_dir, name)
+        if os.path.isfile(path) and name.lower().endswith(IMAGE_EXTENSIONS):
+            files.append(path)
+    return files
+
+
+def output_path(out_dir, src_path, space, ext):
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    return os.path.join(out_dir, f"{stem}_{space}{ext}")
+
+
+def convert_file(src_path, out_dir, spaces, ext=".png", use_float=False):
+    """Convert one file to every requested space and write the results
+
+    Only the number of pixels is returned so that no image data has to be
+    sent back to the parent process.
+    """
+    image = engine.read_image(src_path)
+    if use_float:
+        image = engine.to_float(image)
+    elif image.dtype != "uint8" and ext.lower() not in engine.RAW_EXTENSIONS:
+        # Conversions of deep input are float32, which only the raw containers
+        # hold; other formats get the 8-bit encodings of the quantized image
+        image = engine.as_display(image)
+
+    # One output buffer per file and dtype, reused for every space
+    buffers = {}
+    for space in spaces:
+        converted = engine.convert(image, "rgb", space, out=buffers.get(_output_dtype(image, space)))
+        buffers[converted.dtype] = converted
+        # Raw converted data, same as the "raw" option of the save dialogs
+        engine.save_raw(output_path(out_dir, src_path, space, ext), converted, space)
+    return image.shape[0] * image.shape[1]
+
+
+def _output_dtype(image, space):
+    # 8-bit input keeps OpenCV's 8-bit encodings, everything else is float32
+    if image.dtype == np.uint8 and not color_spaces.get(space).float_only:
+        return image.dtype
+    return np.dtype(np.float32)
+
+
+def _init_worker(decisions=None):
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+    # 3D table choices made once in the parent, see prepare_tables
+    if decisions:
+        lut3d.set_decisions(decisions)
+
+
+def prepare_tables(paths, spaces):
+    """Build the 3D lookup tables of spaces and decide on them here, not in every worker
+
+    The first readable of the first SAMPLE_FILES paths are the calibration
+    samples. Returns the initargs of _init_worker.
+    """
+    def samples():
+        for path in paths[:SAMPLE_FILES]:
+            try:
+                yield engine.read_image(path)
+            except ValueError:
+                pass
+
+    return (lut3d.prepare(spaces, samples()),)
+
+
+def _convert_job(job):
+    src_path, out_dir, spaces, ext, use_float = job
+    try:
+        return src_path, convert_file(src_path, out_dir, spaces, ext, use_float), None
+    except Exception as e:
+        return src_path, 0, str(e)
+
+
+def run_batch(in_dir, out_dir, spaces, jobs=None, ext=".png", progress=None, use_float=False):
+    """Convert every image in in_dir on a process pool
+
+    Returns a summary dict with counts, failures and throughput.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    files = find_images(in_dir)
+    jobs = jobs or os.cpu_count() or 1
+    work = [(path, out_dir, tuple(spaces), ext, use_float) for path in files]
+
+    done = 0
+    pixels = 0
+    failures = []
+    start = time.perf_counter()
+
+    if jobs == 1:
+        _init_worker()
+        results = map(_convert_job, work)
+        executor = None
+    else:
+        # Float conversions never go through a table
+        initargs = prepare_tables(files, () if use_float else spaces)
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs)
+        # Results are consumed as they arrive, outputs are already on disk
+        results = executor.map(_convert_job, work, chunksize=max(1, len(work) // (jobs * 8)))
+
+    try:
+        for src_path, n_pixels, error in results:
+            done += 1
+            pixels += n_pixels
+            if error:
+                failures.append((src_path, error))
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress(done, len(work), done / elapsed if elapsed > 0 else 0.0)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "files": len(work),
+        "converted": done - len(failures),
+        "failures": failures,
+        "seconds": elapsed,
+        "images_per_second": done / elapsed if elapsed > 0 else 0.0,
+        "megapixels_per_second": pixels / 1e6 / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def parse_spaces(value):
+    spaces = [s.strip().lower() for s in value.split(",") if s.strip()]
+    unknown = [s for s in spaces if s not in TARGET_SPACES]
+    if not spaces or unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown color space(s): {', '.join(unknown) or value!r} "
+            f"(choose from {', '.join(TARGET_SPACES)})")
+    return spaces
+
+
+def check_output_args(parser, args):
+    """Normalize args.ext and reject float32 output to a format that cannot hold it"""
+    args.ext = args.ext if args.ext.startswith(".") else "." + args.ext
+    if args.ext.lower() in engine.RAW_EXTENSIONS:
+        return
+    if args.use_float:
+        parser.error(f"--float output needs --ext {', '.join(engine.RAW_EXTENSIONS)}")
+    float_only = [space for space in args.spaces if color_spaces.get(space).float_only]
+    if float_only:
+        parser.error(f"{', '.join(float_only)} output is float32 and needs --ext "
+                     f"{', '.join(engine.RAW_EXTENSIONS)}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py batch",
+                                     description="Convert a folder of images without the GUI")
+    parser.add_argument("in_dir", help="Directory with input images")
+    parser.add_argument("out_dir", help="Directory for converted images")
+    parser.add_argument("--to", dest="spaces", type=parse_spaces, default=["lab", "hsv"],
+                        help=f"Comma separated target spaces from {','.join(TARGET_SPACES)} "
+                             "(default: lab,hsv)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--ext", default=".png",
+                        help="Output file extension: .png (8-bit, deep inputs are quantized), "
+                             "or .npy, .npz, .tiff for any depth (default: .png)")
+    parser.add_argument("--float", dest="use_float", action="store_true",
+                        help="Convert in float32 (L 0-100, signed a/b, H 0-360); needs .npy/.npz/.tiff")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Only print the summary")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_output_args(parser, args)
+    if not os.path.isdir(args.in_dir):
+        print(f"Error: input directory not found: {args.in_dir}", file=sys.stderr)
+        return 2
+
+    def report(done, total, rate):
+        print(f"\r{done}/{total} images  {rate:.1f} images/s", end="", file=sys.stderr)
+
+    summary = run_batch(args.in_dir, args.out_dir, args.spaces, args.jobs, args.ext,
+                        progress=None if args.quiet else report, use_float=args.use_float)
+    if not args.quiet and summary["files"]:
+        print(file=sys.stderr)
+
+    for src_path, error in summary["failures"]:
+        print(f"Failed: {src_path}: {error}", file=sys.stderr)
+    print(f"Converted {summary['converted']}/{summary['files']} images in "
+          f"{summary['seconds']:.2f}s ({summary['images_per_second']:.1f} images/s, "
+          f"{summary['megapixels_per_second']:.1f} MP/s)")
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Forward/inverse conversion time of every registered color space
+
+OpenCV spaces go through cvtColor, spaces OpenCV lacks (OKLab) through
+their NumPy implementation, so the table shows what the NumPy code costs
+relative to cvtColor at the same image size and depth. OKLab results are
+also checked against a float64 reference of the published matrices.
+
+    python benchmarks/colorspaces.py                   # 12 MP synthetic image
+    python benchmarks/colorspaces.py --megapixels 40 --json spaces.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+def best_ms(fn, repeat):
+    fn()  # warm-up: lookup tables, OpenCV dispatch
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def oklab_reference(rgb):
+    """float64 OKLab straight from the published definition"""
+    import numpy as np
+    import spaces
+
+    c = rgb.astype(np.float64)
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    lms = np.cbrt(linear @ np.array(spaces._OKLAB_M1).T)
+    return lms @ np.array(spaces._OKLAB_M2).T
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, default=12, help="Synthetic image size")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs, the best is reported")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE")
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    import engine
+    import spaces
+
+    height = int((args.megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = int(args.megapixels * 1e6 / height)
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    inputs = {"uint8": image, "float32": engine.to_float(image)}
+    megapixels = width * height / 1e6
+
+    results = {}
+    print(f"{width}x{height} ({megapixels:.1f} MP), best of {args.repeat}")
+    print(f"{'space':8} {'impl':8} {'depth':8} {'forward':>10} {'inverse':>10} {'MP/s':>8}")
+    for name in spaces.target_names():
+        space = spaces.get(name)
+        impl = "numpy" if space.float_only else "cvtColor"
+        for depth, img in inputs.items():
+            converted = engine.convert(img, "rgb", name)
+            forward = best_ms(lambda: engine.convert(img, "rgb", name), args.repeat)
+            inverse = best_ms(lambda: engine.convert(converted, name, "rgb"), args.repeat)
+            results.setdefault(name, {})[depth] = {"forward_ms": forward, "inverse_ms": inverse}
+            print(f"{name:8} {impl:8} {depth:8} {forward:8.1f}ms {inverse:8.1f}ms "
+                  f"{megapixels / forward * 1000:8.1f}")
+
+    sample = inputs["float32"][:256]
+    error = float(np.abs(engine.convert(sample, "rgb", "oklab") - oklab_reference(sample)).max())
+    round_trip = float(np.abs(engine.convert(engine.convert(sample, "rgb", "oklab"), "oklab", "rgb")
+                              - sample).max())
+    results["oklab_check"] = {"max_error_vs_float64": error, "max_round_trip_error": round_trip}
+    print(f"OKLab max error vs float64 reference {error:.2e}, round trip {round_trip:.2e}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Peak RSS and per-update time of the display pipeline, before and after
+
+"legacy" replays the original pipeline (working copy of the loaded image,
+.copy() before every channel slice, normalize and GRAY2RGB at full
+resolution, resize last). "current" uses the engine as the GUI does now.
+Each pipeline/image pair runs in a fresh process so peak RSS is comparable.
+
+    python benchmarks/display_memory.py                  # synthetic 4/16/40 MP images
+    python benchmarks/display_memory.py --images DIR     # reference image set
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+CANVAS = (1160, 640)
+VIEWS = [("rgb", "all", "rgb"), ("rgb", "R", "rgb"),
+         ("lab", "all", "rgb"), ("lab", "L", "raw"), ("lab", "a", "rgb"),
+         ("hsv", "all", "raw"), ("hsv", "H", "rgb")]
+
+
+def legacy_load(path):
+    import cv2
+
+    original = cv2.imread(path)
+    original = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
+    current = original.copy()
+    return original, current
+
+
+def legacy_view(images, space, channel, mode):
+    import cv2
+
+    display = images[space].copy()
+    if channel != "all":
+        index = "RGB".find(channel) if space == "rgb" else {"lab": "Lab", "hsv": "HSV"}[space].find(channel)
+        display = display[:, :, index]
+        if not (space == "rgb" or (space == "lab" and channel == "L" and mode == "rgb")):
+            display = cv2.normalize(display, None, 0, 255, cv2.NORM_MINMAX)
+        display = cv2.cvtColor(display, cv2.COLOR_GRAY2RGB)
+    elif space != "rgb":
+        if mode == "raw":
+            display = cv2.normalize(display, None, 0, 255, cv2.NORM_MINMAX)
+        else:
+            code = cv2.COLOR_LAB2RGB if space == "lab" else cv2.COLOR_HSV2RGB
+            display = cv2.cvtColor(display, code)
+    height, width = display.shape[:2]
+    scale = min(CANVAS[0] / width, CANVAS[1] / height)
+    return cv2.resize(display, (int(width * scale), int(height * scale)))
+
+
+def current_view(pyramids, space, channel, mode):
+    """Fit-to-canvas view rendered tile by tile, as ImageColorSpaceConverter.show_on_canvas"""
+    import cv2
+    import engine
+    from viewport import Viewport
+
+    levels, ranges = pyramids[space]
+    if ranges is not None:
+        ranges = ranges["image"]
+    viewport = Viewport(levels[0].shape[1], levels[0].shape[0], *CANVAS)
+    level_image = levels[viewport.level(len(levels))]
+    tiles = []
+    for x0, y0, x1, y1, cx0, cy0, cx1, cy1 in viewport.visible_tiles(level_image.shape[1],
+                                                                      level_image.shape[0]):
+        tiles.append(engine.render_channel(level_image[y0:y1, x0:x1], space, channel, mode,
+                                           (cx1 - cx0, cy1 - cy0), ranges, cv2.INTER_AREA))
+    return tiles
+
+
+def peak_rss_mib():
+    """Peak resident set size of this process
+
+    VmHWM is reset on exec, ru_maxrss is not (it would include the parent
+    process that generated the synthetic images), so prefer /proc.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker(pipeline, path, repeat):
+    import cv2
+
+    start = time.perf_counter()
+    if pipeline == "legacy":
+        original, current = legacy_load(path)
+        images = {"rgb": current,
+                  "lab": cv2.cvtColor(original, cv2.COLOR_RGB2LAB),
+                  "hsv": cv2.cvtColor(original, cv2.COLOR_RGB2HSV)}
+        render = lambda view: legacy_view(images, *view)
+    else:
+        import engine
+        from gui import convert_task
+
+        original = engine.read_image(path)
+        pyramids = {"rgb": (engine.build_pyramid(original), None)}
+        for space in ("lab", "hsv"):
+            _, pyramids[space], _ = convert_task(original, pyramids["rgb"][0], space)
+        render = lambda view: current_view(pyramids, *view)
+    load_seconds = time.perf_counter() - start
+
+    update_ms = []
+    for _ in range(repeat):
+        for view in VIEWS:
+            t0 = time.perf_counter()
+            render(view)
+            update_ms.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "load_and_convert_s": load_seconds,
+        "update_ms_median": statistics.median(update_ms),
+        "update_ms_p95": sorted(update_ms)[int(len(update_ms) * 0.95) - 1],
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def synthetic_images(directory, megapixels):
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    paths = []
+    for mp in megapixels:
+        height = int((mp * 1e6 * 3 / 4) ** 0.5)
+        width = int(mp * 1e6 / height)
+        # Smooth gradients plus noise, closer to real images than pure noise
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        image = np.dstack([x + 0 * y, y + 0 * x, (x + y) / 2]).astype(np.uint8)
+        image = cv2.add(image, rng.integers(0, 16, image.shape, dtype=np.uint8))
+        path = os.path.join(directory, f"synthetic_{mp}mp.png")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", help="Directory with reference images")
+    parser.add_argument("--megapixels", default="4,16,40",
+                        help="Synthetic image sizes when --images is not given")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over all views")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE")
+    parser.add_argument("--worker", nargs=2, metavar=("PIPELINE", "IMAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.worker[0], args.worker[1], args.repeat)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            import batch
+            paths = batch.find_images(args.images)
+        else:
+            paths = synthetic_images(tmp, [float(v) for v in args.megapixels.split(",")])
+
+        results = {}
+        print(f"{'image':28} {'pipeline':8} {'load+conv':>10} {'update p50':>11} "
+              f"{'update p95':>11} {'peak RSS':>10}")
+        for path in paths:
+            for pipeline in ("legacy", "current"):
+                proc = subprocess.run([sys.executable, __file__, "--repeat", str(args.repeat),
+                                       "--worker", pipeline, path],
+                                      capture_output=True, text=True, check=True)
+                r = json.loads(proc.stdout)
+                results.setdefault(os.path.basename(path), {})[pipeline] = r
+                print(f"{os.path.basename(path)[:28]:28} {pipeline:8} {r['load_and_convert_s']:9.2f}s "
+                      f"{r['update_ms_median']:9.1f}ms {r['update_ms_p95']:9.1f}ms "
+                      f"{r['peak_rss_mib']:7.0f}MiB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""3D LUT conversion of 8-bit RGB versus the direct conversion, per space
+
+For every registered space the packed 2**24 entry table is built in
+memory, then both paths are timed on a smooth synthetic image (gradients
+plus noise, like photos) and on uniform noise (the worst case for the
+gather), and the table results are compared with the direct conversion.
+The last column is what engine.convert would pick for the smooth image.
+
+    python benchmarks/lookup_tables.py                       # 12 MP
+    python benchmarks/lookup_tables.py --megapixels 40 --spaces lab,oklab --json lut.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_ms(fn, repeat):
+    fn()  # warm-up, pages in the table
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, default=12, help="Synthetic image size")
+    parser.add_argument("--spaces", help="Comma separated spaces (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs, the best is reported")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE")
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    import lut3d
+    import spaces
+    from suite import synthetic_image
+
+    smooth = synthetic_image(args.megapixels)
+    noise = np.random.default_rng(0).integers(0, 256, smooth.shape, dtype=np.uint8)
+    names = args.spaces.split(",") if args.spaces else spaces.target_names()
+
+    results = {}
+    print(f"{smooth.shape[1]}x{smooth.shape[0]}, best of {args.repeat}")
+    print(f"{'space':8} {'build':>8} {'table':>8} {'direct':>9} {'lut':>9} {'direct':>9} {'lut':>9} "
+          f"{'max err':>8} {'auto':>6}")
+    print(f"{'':8} {'':>8} {'':>8} {'smooth':>9} {'smooth':>9} {'noise':>9} {'noise':>9}")
+    for name in names:
+        start = time.perf_counter()
+        table = lut3d.build_table(name)
+        build_s = time.perf_counter() - start
+        r = {"build_s": build_s, "table_mib": table.nbytes / 2 ** 20}
+        for label, img in (("smooth", smooth), ("noise", noise)):
+            r[f"direct_{label}_ms"] = best_ms(lambda: lut3d._reference(img, name), args.repeat)
+            r[f"lut_{label}_ms"] = best_ms(lambda: lut3d.lookup(img, table), args.repeat)
+        direct = lut3d._reference(smooth, name).astype(np.float64)
+        looked_up = lut3d.lookup(smooth, table).astype(np.float64)
+        r["max_abs_error"] = float(np.abs(direct - looked_up).max())
+        r["auto_selected"] = name in lut3d.auto_spaces() and r["lut_smooth_ms"] < r["direct_smooth_ms"]
+        results[name] = r
+        print(f"{name:8} {build_s:7.2f}s {r['table_mib']:5.0f}MiB {r['direct_smooth_ms']:7.1f}ms "
+              f"{r['lut_smooth_ms']:7.1f}ms {r['direct_noise_ms']:7.1f}ms {r['lut_noise_ms']:7.1f}ms "
+              f"{r['max_abs_error']:8.1e} {'lut' if r['auto_selected'] else 'direct':>6}")
+        del table
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
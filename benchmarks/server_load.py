@@ -0,0 +1,189 @@
+"""Load test of the HTTP conversion service (server.py)
+
+Starts a local instance on a free port (or targets --url) and drives it
+from asyncio clients: --connections concurrent connections, each sending
+requests back to back over one keep-alive connection (or a new
+connection per request with --no-keepalive). Bodies are raw RGB buffers
+of a synthetic image, --batch images per request, or the image encoded
+as PNG with --png. Reports throughput (requests/s, MP/s), latency
+percentiles and errors, next to the in-process engine.convert time of
+the same image as the floor.
+
+    python benchmarks/server_load.py                                   # 2 MP raw to lab
+    python benchmarks/server_load.py --connections 8 --requests 400 --to oklab
+    python benchmarks/server_load.py --batch 16 --megapixels 0.25 --json load.json
+    python benchmarks/server_load.py --url http://127.0.0.1:8765 --png --endpoint render
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(threads=None):
+    """Run `main.py serve --port 0` and return (process, url) once it listens"""
+    command = [sys.executable, os.path.join(REPO_DIR, "main.py"), "serve", "--port", "0"]
+    if threads:
+        command += ["--threads", str(threads)]
+    process = subprocess.Popen(command, stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith("Listening on "):
+        process.kill()
+        raise RuntimeError(f"Server did not start: {line.strip()}")
+    return process, line.split()[-1]
+
+
+def build_request(url, endpoint, space, body, shape):
+    parts = urllib.parse.urlsplit(url)
+    params = {"to": space} if endpoint == "convert" else {"space": space, "channel": "all"}
+    if shape is not None:
+        params["shape"] = ",".join(map(str, shape))
+    target = f"/{endpoint}?{urllib.parse.urlencode(params)}"
+    head = (f"POST {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1")
+    return parts.hostname, parts.port, head
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, head, body, count, keepalive, latencies, errors):
+    reader = writer = None
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(head)
+            writer.write(body)
+            status = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors.append(str(e) or type(e).__name__)
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(f"HTTP {status}")
+        if not keepalive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, endpoint, space, body, shape, connections, requests, keepalive):
+    host, port, head = build_request(url, endpoint, space, body, shape)
+    latencies, errors = [], []
+    per_client = [requests // connections + (i < requests % connections) for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, head, body, count, keepalive, latencies, errors)
+                           for count in per_client if count))
+    return time.perf_counter() - start, latencies, errors
+
+
+def percentile_ms(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000 if ordered else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Running server to test (default: start one)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads of the started server")
+    parser.add_argument("--endpoint", choices=("convert", "render"), default="convert")
+    parser.add_argument("--to", default="lab", help="Target space (default: lab)")
+    parser.add_argument("--megapixels", type=float, default=2, help="Synthetic image size")
+    parser.add_argument("--batch", type=int, default=1, help="Raw images per request")
+    parser.add_argument("--png", action="store_true", help="Send the image PNG encoded")
+    parser.add_argument("--connections", type=int, default=4, help="Concurrent connections")
+    parser.add_argument("--requests", type=int, default=200, help="Requests in total")
+    parser.add_argument("--no-keepalive", dest="keepalive", action="store_false",
+                        help="Open a new connection per request")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE")
+    args = parser.parse_args(argv)
+
+    import cv2
+    import numpy as np
+
+    import engine
+    from suite import synthetic_image
+
+    image = synthetic_image(args.megapixels)
+    if args.png:
+        if args.batch != 1:
+            parser.error("--png sends one image per request")
+        body, shape = cv2.imencode(".png", cv2.cvtColor(image, cv2.COLOR_RGB2BGR))[1].tobytes(), None
+    else:
+        stack = np.broadcast_to(image, (args.batch,) + image.shape) if args.batch > 1 else image
+        body, shape = np.ascontiguousarray(stack).tobytes(), stack.shape
+    megapixels = image.shape[0] * image.shape[1] * args.batch / 1e6
+
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        engine.convert(image, "rgb", args.to)
+        times.append(time.perf_counter() - start)
+    direct_ms = min(times) * 1000 * args.batch
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args.threads)
+    try:
+        # One request first, so the timed run does not include warm-up
+        asyncio.run(run_load(url, args.endpoint, args.to, body, shape, 1, 1, True))
+        wall, latencies, errors = asyncio.run(run_load(url, args.endpoint, args.to, body, shape,
+                                                       args.connections, args.requests,
+                                                       args.keepalive))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    result = {
+        "python": sys.version.split()[0],
+        "url": url,
+        "endpoint": args.endpoint,
+        "space": args.to,
+        "body": "png" if args.png else "raw",
+        "megapixels_per_request": round(megapixels, 3),
+        "body_mib": round(len(body) / 2 ** 20, 2),
+        "connections": args.connections,
+        "keepalive": args.keepalive,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_s": round(len(latencies) / wall, 1),
+        "mp_per_s": round(len(latencies) * megapixels / wall, 1),
+        "p50_ms": round(percentile_ms(latencies, 50), 2),
+        "p95_ms": round(percentile_ms(latencies, 95), 2),
+        "p99_ms": round(percentile_ms(latencies, 99), 2),
+        "direct_convert_ms": round(direct_ms, 2),
+    }
+    print(json.dumps(result, indent=2))
+    for error in sorted(set(errors))[:5]:
+        print(f"Error: {error}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
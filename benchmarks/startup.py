@@ -0,0 +1,159 @@
+"""Startup benchmark: import cost, time-to-first-window, time-to-first-conversion
+
+Every measurement runs in a fresh interpreter so nothing is cached between
+runs. Results can be stored as a baseline and compared later:
+
+    python benchmarks/startup.py --save benchmarks/startup_baseline.json
+    python benchmarks/startup.py --compare benchmarks/startup_baseline.json
+
+Time-to-first-window needs a display and is skipped without one.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_WINDOW = """
+import tkinter as tk
+import gui
+root = tk.Tk()
+app = gui.ImageColorSpaceConverter(root)
+root.update()
+print("ready", flush=True)
+root.destroy()
+"""
+
+FIRST_CONVERSION = """
+import numpy as np
+import engine
+image = np.random.default_rng(0).integers(0, 256, (1000, 1000, 3), dtype=np.uint8)
+engine.convert(image, "rgb", "lab")
+print("ready", flush=True)
+"""
+
+# Modules that must not be imported just to start the given entry point
+FORBIDDEN = {
+    "gui": ("matplotlib", "tensorflow", "cv2", "PIL"),
+    "batch": ("tkinter", "matplotlib", "tensorflow"),
+}
+
+
+def run_python(args, code=None):
+    """Run a fresh interpreter in the repo and return (seconds, stdout, stderr)"""
+    cmd = [sys.executable] + args + (["-c", code] if code else [])
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=REPO_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed")
+    return elapsed, proc.stdout, proc.stderr
+
+
+def import_profile(module):
+    """Return {module name: cumulative import microseconds} for `import module`
+
+    Interpreter startup imports (site, encodings, ...) are left out.
+    """
+    _, _, stderr = run_python(["-X", "importtime"], f"import {module}")
+    lines = [line[len("import time:"):] for line in stderr.splitlines()
+             if line.startswith("import time:")]
+    cumulative = {}
+    # The requested module is the last top-level entry, its imports precede it
+    for line in reversed(lines):
+        _, cum, name = line.split("|")
+        if not cum.strip().isdigit():
+            break
+        if cumulative and not name.startswith("  "):
+            break
+        cumulative[name.strip()] = int(cum)
+    return cumulative
+
+
+def measure(code, repeat):
+    times = []
+    for _ in range(repeat):
+        elapsed, stdout, _ = run_python([], code)
+        if "ready" not in stdout:
+            raise RuntimeError("benchmark script did not finish")
+        times.append(elapsed)
+    return times
+
+
+def summarize(times):
+    return {"median": statistics.median(times), "min": min(times), "max": max(times)}
+
+
+def run(repeat):
+    results = {"python": sys.version.split()[0]}
+
+    for module, forbidden in FORBIDDEN.items():
+        profile = import_profile(module)
+        loaded = [name for name in forbidden
+                  if any(m == name or m.startswith(name + ".") for m in profile)]
+        heaviest = sorted((name for name in profile if name != module),
+                          key=profile.get, reverse=True)[:5]
+        results[f"import_{module}"] = {
+            "total_ms": profile.get(module, 0) / 1000,
+            "heaviest": {name: profile[name] / 1000 for name in heaviest},
+            "unexpected_modules": loaded,
+        }
+
+    results["baseline_interpreter"] = summarize(measure("print('ready')", repeat))
+    results["first_conversion"] = summarize(measure(FIRST_CONVERSION, repeat))
+    try:
+        results["first_window"] = summarize(measure(FIRST_WINDOW, repeat))
+    except RuntimeError as e:
+        print(f"Skipping time-to-first-window: {e}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison and return True if nothing regressed"""
+    ok = True
+    checks = [("first_conversion", "median", 1000), ("first_window", "median", 1000)]
+    checks += [(f"import_{module}", "total_ms", 1) for module in FORBIDDEN]
+    for key, field, to_ms in checks:
+        if key not in results or key not in baseline:
+            continue
+        now, before = results[key][field] * to_ms, baseline[key][field] * to_ms
+        change = (now - before) / before if before else 0.0
+        flag = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and change <= tolerance
+        print(f"{key:18} {before:8.1f} ms -> {now:8.1f} ms ({change:+.0%}) {flag}")
+    for module in FORBIDDEN:
+        unexpected = results[f"import_{module}"]["unexpected_modules"]
+        if unexpected:
+            ok = False
+            print(f"import {module} loads {', '.join(unexpected)}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--save", metavar="FILE", help="Store results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare with a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before failing (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 0 if compare(results, baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
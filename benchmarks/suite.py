@@ -0,0 +1,263 @@
+"""Benchmark suite: conversion, display and save paths by image size and thread count
+
+Each (size, thread count) pair runs in a fresh process on a synthetic
+image, so peak memory is comparable between runs. Cases:
+
+    convert/<space>     engine.convert from RGB, every registered space
+    render/<space>/<ch> channel extraction + normalize/LUT + resize to the canvas
+    pyramid             display pyramid of the loaded image
+    photoimage          PIL image and Tk PhotoImage of a canvas-sized view
+    save/<format>       engine.save_image per file format
+
+Every case reports latency percentiles, throughput (MP/s) and the peak RSS
+it added on top of the process. Results can be stored as a baseline and
+compared later, as with startup.py:
+
+    python benchmarks/suite.py --megapixels 1,4,16 --threads 1,4 --save suite_baseline.json
+    python benchmarks/suite.py --megapixels 1,4,16 --threads 1,4 --compare suite_baseline.json
+    python benchmarks/suite.py --megapixels 200 --cases convert,save --repeat 3
+
+photoimage needs a display; run under `xvfb-run` on servers, otherwise
+only the PIL part is measured.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+CANVAS = (1160, 640)
+RENDER_VIEWS = [("rgb", "R", "rgb"), ("lab", "a", "rgb"), ("hsv", "H", "rgb")]
+SAVE_FORMATS = (".png", ".jpg", ".tiff", ".bmp", ".npy")
+CASES = ("convert", "render", "pyramid", "photoimage", "save")
+
+
+def synthetic_image(megapixels):
+    """Smooth gradients plus noise, closer to real images than pure noise"""
+    import cv2
+    import numpy as np
+
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = int(megapixels * 1e6 / height)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.empty((height, width, 3), np.uint8)
+    image[:, :, 0] = x
+    image[:, :, 1] = y
+    image[:, :, 2] = (x + y) / 2
+    noise = np.random.default_rng(0).integers(0, 16, (height, width, 3), dtype=np.uint8)
+    return cv2.add(image, noise, dst=image)
+
+
+def current_rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def peak_rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux only), so each case gets its own peak"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def time_case(fn, repeat, megapixels):
+    """Run fn repeat times after a warm-up and summarize latency, throughput and memory
+
+    Memory is measured on the warm-up call: once the allocator holds on to
+    freed pages, later calls no longer raise the RSS.
+    """
+    try:
+        before = current_rss_mib()
+        measured = reset_peak_rss()
+    except OSError:
+        before, measured = None, False
+    fn()  # warm-up: lookup tables, OpenCV dispatch, lazily built tables
+    peak_extra = peak_rss_mib() - before if measured else None
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "p50_ms": percentile(times, 50),
+        "p95_ms": percentile(times, 95),
+        "max_ms": times[-1],
+        "throughput_mp_s": megapixels / (times[len(times) // 2] / 1000),
+        "peak_extra_mib": peak_extra,
+    }
+
+
+def make_photoimage():
+    """PhotoImage factory, or None without a display"""
+    try:
+        import tkinter as tk
+        from PIL import ImageTk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:  # TclError without a display
+        print(f"Skipping Tk PhotoImage: {e}", file=sys.stderr)
+        return None
+    return lambda pil_image: ImageTk.PhotoImage(pil_image, master=root)
+
+
+def worker(megapixels, threads, repeat, cases):
+    import cv2
+    import engine
+    import spaces
+    from PIL import Image
+
+    cv2.setNumThreads(threads)
+    image = synthetic_image(megapixels)
+    mp = image.shape[0] * image.shape[1] / 1e6
+    results = {"shape": list(image.shape), "threads": threads}
+
+    if "convert" in cases:
+        for name in spaces.target_names():
+            if spaces.get(name).float_only:
+                # NumPy spaces take float input, as the GUI gives them
+                source = engine.to_float(image)
+                results[f"convert/{name}"] = time_case(
+                    lambda: engine.convert(source, "rgb", name), repeat, mp)
+                del source
+            else:
+                results[f"convert/{name}"] = time_case(
+                    lambda: engine.convert(image, "rgb", name), repeat, mp)
+
+    if "render" in cases:
+        size = engine.fit_size(image.shape[1], image.shape[0], *CANVAS)
+        for space, ch, mode in RENDER_VIEWS:
+            converted = engine.convert(image, "rgb", space)
+            ranges = engine.normalization_ranges(converted, space, "image")
+            colormap = engine.resolve_colormap(space, ch, "auto")
+            results[f"render/{space}/{ch}"] = time_case(
+                lambda: engine.render_channel(converted, space, ch, mode, size, ranges,
+                                              colormap=colormap), repeat, mp)
+            del converted
+
+    if "pyramid" in cases:
+        results["pyramid"] = time_case(lambda: engine.build_pyramid(image), repeat, mp)
+
+    if "photoimage" in cases:
+        size = engine.fit_size(image.shape[1], image.shape[0], *CANVAS)
+        view = engine.render_channel(image, "rgb", "all", "rgb", size)
+        view_mp = view.shape[0] * view.shape[1] / 1e6
+        results["photoimage/pil"] = time_case(lambda: Image.fromarray(view), repeat, view_mp)
+        photoimage = make_photoimage()
+        if photoimage is not None:
+            results["photoimage/tk"] = time_case(lambda: photoimage(Image.fromarray(view)),
+                                                 repeat, view_mp)
+
+    if "save" in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            for ext in SAVE_FORMATS:
+                path = os.path.join(tmp, "out" + ext)
+                raw = ext == ".npy"
+                results[f"save/{ext[1:]}"] = time_case(
+                    lambda: engine.save_image(path, image, "rgb", raw=raw), repeat, mp)
+                results[f"save/{ext[1:]}"]["bytes"] = os.path.getsize(path)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print p50 changes against a baseline and return True if nothing regressed"""
+    ok = True
+    for run, cases in results.items():
+        if not isinstance(cases, dict):
+            continue
+        for case, r in cases.items():
+            before = baseline.get(run, {}).get(case)
+            if not isinstance(r, dict) or not isinstance(before, dict) or not before.get("p50_ms"):
+                continue
+            change = (r["p50_ms"] - before["p50_ms"]) / before["p50_ms"]
+            flag = "REGRESSION" if change > tolerance else "ok"
+            ok = ok and change <= tolerance
+            print(f"{run:12} {case:22} {before['p50_ms']:9.1f} ms -> {r['p50_ms']:9.1f} ms "
+                  f"({change:+.0%}) {flag}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", default="1,4,16,50",
+                        help="Comma separated synthetic image sizes (up to 200 MP and more)")
+    parser.add_argument("--threads", default=f"1,{os.cpu_count() or 1}",
+                        help="Comma separated OpenCV thread counts")
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help=f"Comma separated subset of {','.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case")
+    parser.add_argument("--save", metavar="FILE", help="Store results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare with a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown of the median before failing (default: 0.25)")
+    parser.add_argument("--worker", nargs=2, type=float, metavar=("MP", "THREADS"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    if args.worker:
+        megapixels, threads = args.worker
+        print(json.dumps(worker(megapixels, int(threads), args.repeat, cases)))
+        return 0
+
+    results = {"python": sys.version.split()[0]}
+    print(f"{'run':12} {'case':22} {'p50':>9} {'p95':>9} {'MP/s':>8} {'peak +RSS':>10}")
+    for mp in [float(v) for v in args.megapixels.split(",")]:
+        for threads in [int(v) for v in args.threads.split(",")]:
+            run = f"{mp:g}mp/t{threads}"
+            proc = subprocess.run([sys.executable, __file__, "--repeat", str(args.repeat),
+                                   "--cases", ",".join(cases), "--worker", str(mp), str(threads)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                error = proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"
+                print(f"{run:12} failed: {error}", file=sys.stderr)
+                results[run] = {"error": error}
+                continue
+            results[run] = json.loads(proc.stdout)
+            for case, r in results[run].items():
+                if not isinstance(r, dict):
+                    continue
+                peak = "-" if r["peak_extra_mib"] is None else f"{r['peak_extra_mib']:7.0f}MiB"
+                print(f"{run:12} {case:22} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms "
+                      f"{r['throughput_mp_s']:8.1f} {peak:>10}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 0 if compare(results, baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
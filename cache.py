@@ -0,0 +1,194 @@
+"""Caches for converted and rendered image data
+
+cache.py is imported by the GUI at startup; NumPy is imported where used.
+"""
+import contextlib
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class DisplayCache:
+    """Bounded LRU cache of finished display bitmaps, evicted by total bytes
+
+    Keys are tuples such as (image id, space, channel, mode, canvas size).
+    Each entry records its own size so that a few huge renders cannot push
+    the cache over max_bytes.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Store value under key, evicting least recently used entries"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            if nbytes > self.max_bytes:
+                # Larger than the whole cache, do not keep it
+                return value
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+            return value
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches predicate"""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self.total_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+# Bump when the cached arrays change meaning (decode or conversion changes)
+DISK_CACHE_VERSION = 1
+HASH_CHUNK = 1 << 20
+
+
+def file_digest(path):
+    """SHA-256 of the file contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_cache_dir():
+    """$COLORSPACE_CACHE_DIR, else the platform's user cache directory"""
+    if os.environ.get("COLORSPACE_CACHE_DIR"):
+        return os.environ["COLORSPACE_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "colorspace-converter")
+
+
+class DiskCache:
+    """Content-addressed LRU cache of arrays as memory-mappable .npy files
+
+    Keys are tuples such as (file digest, space); they are hashed into file
+    names, so an entry is found again whatever the path of the image was.
+    get() returns a read-only np.memmap, so a hit costs page-ins of the
+    parts actually read instead of a decode or conversion. Recency is the
+    file modification time, touched on every hit, so the LRU order
+    survives restarts. Files are written under a temporary name and
+    renamed, so concurrent readers never see a partial entry.
+    """
+
+    def __init__(self, directory=None, max_bytes=4 * 1024 ** 3):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._sizes = None  # name -> bytes, scanned on first put
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        name = hashlib.sha256(repr((DISK_CACHE_VERSION,) + tuple(key)).encode()).hexdigest()
+        return os.path.join(self.directory, name + ".npy")
+
+    def get(self, key):
+        """The cached array for key, memory-mapped read-only, or None"""
+        import numpy as np
+
+        path = self.path(key)
+        try:
+            # Plain ndarray view of the map, so results derived from it are not memmaps
+            array = np.asarray(np.load(path, mmap_mode="r"))
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted meanwhile or unreadable
+            self.misses += 1
+            return None
+        self.hits += 1
+        return array
+
+    def put(self, key, array):
+        """Store array under key, then evict least recently used entries over max_bytes
+
+        Failures to write (full disk, read-only cache directory) are ignored:
+        the cache only ever saves work.
+        """
+        import numpy as np
+
+        path = self.path(key)
+        if array.nbytes > self.max_bytes:
+            return
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            return
+        with self._lock:
+            sizes = self._scan() if self._sizes is None else self._sizes
+            sizes[os.path.basename(path)] = os.path.getsize(path)
+            self._evict(sizes)
+
+    def _scan(self):
+        self._sizes = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                self._sizes[entry.name] = entry.stat().st_size
+        return self._sizes
+
+    def _evict(self, sizes):
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for name in sizes:
+            with contextlib.suppress(OSError):
+                by_age.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+        for _, name in sorted(by_age):
+            if total <= self.max_bytes:
+                break
+            # Open memory maps of the file stay valid after the unlink
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(self.directory, name))
+            total -= sizes.pop(name)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            sizes = self._scan() if os.path.isdir(self.directory) else {}
+            return sum(sizes.values())
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._scan() if os.path.isdir(self.directory) else {}):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.directory, name))
+            self._sizes = {}
@@ -0,0 +1,235 @@
+"""Per-pixel color differences (ΔE) between a reference and a test image
+
+Both images go through the engine's float Lab conversion (L 0-100, signed
+a/b) and are compared with CIE76, CIE94 (graphic arts weights) or
+CIEDE2000, vectorized over whole strips of rows. Strips of CHUNK_PIXELS
+bound the float temporaries whatever the image size; only the float32
+ΔE map is full size.
+
+Usage:
+    python main.py compare reference.png output.png --metric 2000 --heatmaps maps/
+    python main.py compare references/ outputs/ --jobs 8 --json drift.json
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import batch
+import engine
+
+METRICS = ("76", "94", "2000")
+CHUNK_PIXELS = 1 << 20
+# Thresholds reported as the fraction of pixels above them: just noticeable,
+# noticeable to most observers, clearly different
+THRESHOLDS = (1.0, 2.3, 5.0)
+# Heatmaps use a fixed scale so maps of different pairs are comparable
+HEATMAP_MAX = 10.0
+
+
+def _split(lab):
+    return lab[..., 0], lab[..., 1], lab[..., 2]
+
+
+def delta_e_76(lab1, lab2):
+    """Euclidean distance in Lab"""
+    diff = lab1 - lab2
+    return np.sqrt(np.einsum("...i,...i->...", diff, diff))
+
+
+def delta_e_94(lab1, lab2):
+    """CIE94 with graphic arts weights; lab1 is the reference"""
+    L1, a1, b1 = _split(lab1)
+    L2, a2, b2 = _split(lab2)
+    C1 = np.hypot(a1, b1)
+    dC = C1 - np.hypot(a2, b2)
+    dL = L1 - L2
+    # dH² = da² + db² - dC², negative only through rounding
+    dH2 = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - dC * dC, 0)
+    SC = 1 + 0.045 * C1
+    SH = 1 + 0.015 * C1
+    return np.sqrt(dL * dL + (dC / SC) ** 2 + dH2 / (SH * SH))
+
+
+def delta_e_2000(lab1, lab2):
+    """CIEDE2000 (Sharma, Wu and Dalal 2005 formulation), kL = kC = kH = 1"""
+    L1, a1, b1 = _split(lab1)
+    L2, a2, b2 = _split(lab2)
+    C_mean7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(C_mean7 / (C_mean7 + 25.0 ** 7)))
+    a1p = (1 + G) * a1
+    a2p = (1 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+    chroma = C1p * C2p
+    achromatic = chroma == 0
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp[achromatic] = 0
+    dHp = 2 * np.sqrt(chroma) * np.sin(np.radians(dhp / 2))
+
+    Lp_mean = (L1 + L2) / 2
+    Cp_mean = (C1p + C2p) / 2
+    h_sum = h1p + h2p
+    hp_mean = np.where(np.abs(h1p - h2p) <= 180, h_sum / 2,
+                       np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2))
+    hp_mean[achromatic] = h_sum[achromatic]
+
+    T = (1 - 0.17 * np.cos(np.radians(hp_mean - 30)) + 0.24 * np.cos(np.radians(2 * hp_mean))
+         + 0.32 * np.cos(np.radians(3 * hp_mean + 6)) - 0.20 * np.cos(np.radians(4 * hp_mean - 63)))
+    d_theta = 30 * np.exp(-(((hp_mean - 275) / 25) ** 2))
+    Cp_mean7 = Cp_mean ** 7
+    RC = 2 * np.sqrt(Cp_mean7 / (Cp_mean7 + 25.0 ** 7))
+    L50 = (Lp_mean - 50) ** 2
+    SL = 1 + 0.015 * L50 / np.sqrt(20 + L50)
+    SC = 1 + 0.045 * Cp_mean
+    SH = 1 + 0.015 * Cp_mean * T
+    RT = -np.sin(np.radians(2 * d_theta)) * RC
+
+    tL, tC, tH = dLp / SL, dCp / SC, dHp / SH
+    return np.sqrt(tL * tL + tC * tC + tH * tH + RT * tC * tH)
+
+
+DELTA_E = {"76": delta_e_76, "94": delta_e_94, "2000": delta_e_2000}
+
+
+def to_lab(img):
+    """Float Lab (L 0-100) of an RGB image of any depth, through the engine"""
+    return engine.convert(engine.to_float(img), "rgb", "lab")
+
+
+def delta_e_map(reference, test, metric="2000", chunk_pixels=CHUNK_PIXELS):
+    """(H,W) float32 ΔE of test against reference, both RGB of the same size"""
+    if metric not in DELTA_E:
+        raise ValueError(f"Unknown ΔE metric {metric!r}, choose from {', '.join(METRICS)}")
+    if reference.shape[:2] != test.shape[:2]:
+        raise ValueError(f"Image sizes differ: {reference.shape[1]}x{reference.shape[0]} "
+                         f"vs {test.shape[1]}x{test.shape[0]}")
+    height, width = reference.shape[:2]
+    rows = max(1, chunk_pixels // width)
+    result = np.empty((height, width), np.float32)
+    for top in range(0, height, rows):
+        strip = slice(top, min(height, top + rows))
+        result[strip] = DELTA_E[metric](to_lab(reference[strip]), to_lab(test[strip]))
+    return result
+
+
+def summarize(de_map):
+    """Mean/median/p95/p99/max of a ΔE map and the fraction of pixels above THRESHOLDS"""
+    p50, p95, p99 = np.percentile(de_map, (50, 95, 99)).tolist()
+    n = de_map.size
+    return {
+        "mean": float(de_map.mean(dtype=np.float64)),
+        "median": p50,
+        "p95": p95,
+        "p99": p99,
+        "max": float(de_map.max()),
+        "above": {str(t): int(np.count_nonzero(de_map > t)) / n for t in THRESHOLDS},
+    }
+
+
+def heatmap(de_map, max_value=HEATMAP_MAX):
+    """RGB uint8 viridis rendering of a ΔE map, 0 to max_value"""
+    return engine.apply_lut(de_map, (0.0, max_value), "viridis")
+
+
+def compare_files(reference_path, test_path, metric="2000", heatmap_path=None):
+    """ΔE summary of one file pair, optionally writing the heatmap"""
+    de_map = delta_e_map(engine.read_image(reference_path), engine.read_image(test_path), metric)
+    if heatmap_path:
+        engine.save_image(heatmap_path, heatmap(de_map), "rgb")
+    return summarize(de_map)
+
+
+def find_pairs(reference, test):
+    """(reference, test) file pairs: the two files, or same-named files of two directories"""
+    if not os.path.isdir(reference):
+        return [(reference, test)]
+    names = {os.path.basename(p): p for p in batch.find_images(test)}
+    return [(path, names[os.path.basename(path)]) for path in batch.find_images(reference)
+            if os.path.basename(path) in names]
+
+
+def _compare_job(job):
+    reference_path, test_path, metric, heatmap_path = job
+    try:
+        return reference_path, test_path, compare_files(reference_path, test_path, metric, heatmap_path), None
+    except Exception as e:
+        return reference_path, test_path, None, str(e)
+
+
+def run_compare(reference, test, metric="2000", heatmap_dir=None, jobs=None):
+    """Compare every pair on a process pool; returns {"pairs": [...], "failures": [...]}"""
+    work = []
+    for reference_path, test_path in find_pairs(reference, test):
+        heatmap_path = None
+        if heatmap_dir:
+            stem = os.path.splitext(os.path.basename(test_path))[0]
+            heatmap_path = os.path.join(heatmap_dir, f"{stem}_de{metric}.png")
+        work.append((reference_path, test_path, metric, heatmap_path))
+    if heatmap_dir:
+        os.makedirs(heatmap_dir, exist_ok=True)
+
+    jobs = min(jobs or os.cpu_count() or 1, max(1, len(work)))
+    if jobs == 1:
+        batch._init_worker()
+        results = list(map(_compare_job, work))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=batch._init_worker) as executor:
+            results = list(executor.map(_compare_job, work))
+
+    report = {"metric": metric, "pairs": [], "failures": []}
+    for reference_path, test_path, summary, error in results:
+        if error:
+            report["failures"].append({"reference": reference_path, "test": test_path, "error": error})
+        else:
+            report["pairs"].append({"reference": reference_path, "test": test_path, **summary})
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py compare",
+                                     description="Per-pixel ΔE between reference and test images")
+    parser.add_argument("reference", help="Reference image, or directory of references")
+    parser.add_argument("test", help="Test image, or directory with same-named test images")
+    parser.add_argument("--metric", choices=METRICS, default="2000",
+                        help="CIE76, CIE94 or CIEDE2000 (default: 2000)")
+    parser.add_argument("--heatmaps", metavar="DIR",
+                        help=f"Write viridis ΔE heatmaps (0-{HEATMAP_MAX:g}) to DIR")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--json", metavar="FILE", help="Write the full report to FILE")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if os.path.isdir(args.reference) != os.path.isdir(args.test):
+        print("Error: give two images or two directories", file=sys.stderr)
+        return 2
+    report = run_compare(args.reference, args.test, args.metric, args.heatmaps, args.jobs)
+
+    print(f"{'test':32} {'mean':>7} {'median':>7} {'p95':>7} {'max':>7} {'>2.3':>7}")
+    for pair in report["pairs"]:
+        print(f"{os.path.basename(pair['test'])[:32]:32} {pair['mean']:7.2f} {pair['median']:7.2f} "
+              f"{pair['p95']:7.2f} {pair['max']:7.2f} {pair['above']['2.3']:7.1%}")
+    for failure in report["failures"]:
+        print(f"Failed: {failure['test']}: {failure['error']}", file=sys.stderr)
+    if not report["pairs"] and not report["failures"]:
+        print("No image pairs found", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,513 @@
+"""Color space conversion engine
+
+GUI-independent conversion, channel extraction and normalization. Images are
+NumPy arrays in RGB channel order unless the space says otherwise. The Tk
+application and the headless tools are thin clients of these functions; the
+supported spaces are declared in spaces.SPACES.
+"""
+import functools
+import os
+
+import cv2
+import numpy as np
+
+import lut3d
+import profiling
+import spaces
+
+# Display modes for channel extraction
+MODES = ("rgb", "raw")
+
+# How stretched channels are mapped to 0-255: min/max of the whole image,
+# the nominal range of the encoding, or 1st-99th percentile clipping
+NORMALIZATIONS = ("image", "fixed", "percentile")
+PERCENTILES = (1, 99)
+
+# Lookup tables for single-channel views; "auto" picks the space's colormap
+# for the channel (e.g. green-red for a, hue for H) and gray otherwise
+COLORMAPS = ("gray", "auto", "viridis", "hue", "green-red", "blue-yellow")
+
+# Containers that store raw converted values of any depth losslessly
+RAW_EXTENSIONS = (".npy", ".npz", ".tif", ".tiff")
+
+# Formats that keep 16 bits per channel
+DEEP_EXTENSIONS = (".png", ".tif", ".tiff")
+
+
+def read_image(path):
+    """Load an image file as an RGB array, raising ValueError on failure
+
+    The bit depth of the file is kept (8/16-bit integer or float).
+    Grayscale is expanded to three channels and alpha is dropped.
+    """
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Failed to load image: {path}")
+    return _decoded_to_rgb(image)
+
+
+def decode_image(data):
+    """Decode an encoded image (PNG, JPEG, TIFF...) from a bytes-like object, as read_image
+
+    data is wrapped, not copied, so a request buffer can be decoded directly.
+    """
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("Failed to decode image data")
+    return _decoded_to_rgb(image)
+
+
+def _decoded_to_rgb(image):
+    """Three-channel RGB of a cv2 decode result, keeping its depth"""
+    if image.dtype not in (np.uint8, np.uint16, np.float32):
+        image = to_float(image)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2RGB)
+    # Swap channels in place, no second full-size array
+    return convert(image, "bgr", "rgb", out=image)
+
+
+def to_float(img):
+    """Return img as float32, integers scaled to 0-1 as cvtColor expects"""
+    if img.dtype == np.float32:
+        return img
+    if img.dtype == np.uint8:
+        return img.astype(np.float32) * np.float32(1 / 255)
+    if img.dtype == np.uint16:
+        return img.astype(np.float32) * np.float32(1 / 65535)
+    return img.astype(np.float32)
+
+
+def _to_file_depth(img, ext):
+    """Reduce float/16-bit RGB data to what the file format can hold"""
+    deep = ext in DEEP_EXTENSIONS
+    if img.dtype == np.uint8 or (img.dtype == np.uint16 and deep):
+        return img
+    if img.dtype == np.uint16:
+        return cv2.convertScaleAbs(img, alpha=255 / 65535)
+    img = np.clip(img, 0, 1)
+    if deep:
+        return (img * 65535 + 0.5).astype(np.uint16)
+    return cv2.convertScaleAbs(img, alpha=255)
+
+
+def save_image(path, img, space, raw=False):
+    """Write img (in space) to path
+
+    raw=True writes the stored values unchanged (see save_raw), otherwise the
+    image is converted back to RGB first, keeping 16 bits where the format
+    allows it.
+    """
+    if raw:
+        save_raw(path, img, space)
+        return
+    ext = os.path.splitext(path)[1].lower()
+    data = _to_file_depth(convert(img, space, "bgr"), ext)
+    if not cv2.imwrite(path, data):
+        raise ValueError(f"Failed to write image: {path}")
+
+
+def save_raw(path, img, space):
+    """Export converted values without loss
+
+    .npy stores the array, .npz also records the color space and channel
+    names, TIFF keeps float32/uint16 samples. Channels are written in the
+    space's own order (L, a, b / H, S, V), not swapped as BGR. Other formats
+    only accept 8/16-bit data.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        np.save(path, img)
+        return
+    if ext == ".npz":
+        np.savez(path, data=img, space=space, channels=np.array(spaces.get(space).channels))
+        return
+    if img.dtype not in (np.uint8, np.uint16) and ext not in RAW_EXTENSIONS:
+        raise ValueError(f"{img.dtype} data can only be exported losslessly as "
+                         f"{', '.join(RAW_EXTENSIONS)}")
+    # imwrite treats the first channel as blue, reverse so files hold channel 0 first
+    if not cv2.imwrite(path, np.ascontiguousarray(img[:, :, ::-1])):
+        raise ValueError(f"Failed to write image: {path}")
+
+
+def load_raw(path):
+    """Read an export of save_raw, returns (array, space or None)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return np.load(path), None
+    if ext == ".npz":
+        with np.load(path) as data:
+            return data["data"], str(data["space"])
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Failed to load image: {path}")
+    return np.ascontiguousarray(image[:, :, ::-1]), None
+
+
+def _conversion_code(src, dst):
+    """cvtColor code for src -> dst, None when no single cvtColor call does it"""
+    if {src, dst} == {"rgb", "bgr"}:
+        return cv2.COLOR_RGB2BGR
+    if src in ("rgb", "bgr"):
+        name = getattr(spaces.get(dst), "from_" + src)
+    elif dst in ("rgb", "bgr"):
+        name = getattr(spaces.get(src), "to_" + dst)
+    else:
+        return None
+    return getattr(cv2, name) if isinstance(name, str) else None
+
+
+def channel_index(space, ch):
+    """Return the array index of channel ch in space"""
+    return spaces.get(space).channel_index(ch)
+
+
+def convert(img, src, dst, out=None, use_table=True):
+    """Convert an (H,W,3) image from color space src to dst
+
+    out, a preallocated array of the right shape and dtype, receives the
+    result instead of a new allocation. 8-bit input gives OpenCV's 8-bit
+    encoding; 16-bit input is promoted to float32, where L is 0-100, a/b
+    are signed and H is 0-360. Spaces implemented in NumPy always return
+    float32. Pairs without a direct conversion go through RGB.
+    use_table=False never routes through a 3D lookup table (see lut3d),
+    for callers with a memory budget the table would not fit.
+    """
+    src_space, dst_space = spaces.get(src), spaces.get(dst)
+    if img.dtype not in (np.uint8, np.float32) and {src, dst} - {"rgb", "bgr"}:
+        img = to_float(img)
+    if src == dst:
+        if out is None:
+            return img
+        np.copyto(out, img)
+        return out
+    code = _conversion_code(src, dst)
+    if code is not None:
+        return cv2.cvtColor(img, code, dst=out)
+    if src == "rgb" and dst_space.float_only:
+        if use_table and lut3d.use_table(img, dst):
+            return lut3d.convert(img, dst, out)
+        return dst_space.from_rgb(img, out)
+    if dst == "rgb" and src_space.float_only:
+        return src_space.to_rgb(img, out)
+    if "rgb" in (src, dst):
+        raise ValueError(f"Unsupported conversion: {src} -> {dst}")
+    return convert(convert(img, src, "rgb"), "rgb", dst, out, use_table)
+
+
+def converted_dtype(dtype, src, dst):
+    """dtype of convert(img, src, dst) for img of dtype, to preallocate out"""
+    dtype = np.dtype(dtype)
+    if {src, dst} <= {"rgb", "bgr"} or dtype == np.float32:
+        return dtype
+    if dtype != np.uint8:
+        return np.dtype(np.float32)
+    if src != dst and (spaces.get(src).float_only or spaces.get(dst).float_only):
+        return np.dtype(np.float32)
+    return dtype
+
+
+def convert_batch(stack, src, dst):
+    """Convert an (N,H,W,3) stack in a single cvtColor call
+
+    The conversions are per pixel, so the stack is viewed as one tall
+    (N*H,W,3) image and no Python loop runs over the images.
+    """
+    if stack.ndim != 4 or stack.shape[-1] != 3:
+        raise ValueError(f"Expected an (N,H,W,3) stack, got shape {stack.shape}")
+    if src == dst:
+        return convert(stack, src, dst)
+    n, h, w, _ = stack.shape
+    flat = np.ascontiguousarray(stack).reshape(n * h, w, 3)
+    return convert(flat, src, dst).reshape(n, h, w, 3)
+
+
+def normalize(plane, value_range=None):
+    """Stretch a plane (or whole image) to the full 0-255 range
+
+    By default the plane's own min/max are used. Passing value_range=(lo, hi)
+    stretches with known statistics instead, e.g. those of the full image
+    when plane is only a downscaled preview.
+    """
+    if value_range is None:
+        return cv2.normalize(plane, None, 0, 255, cv2.NORM_MINMAX)
+    lo, hi = value_range
+    alpha = 255.0 / (hi - lo) if hi > lo else 0.0
+    if plane.dtype != np.uint8 or lo > 0:
+        # convertScaleAbs would mirror values below lo instead of clipping
+        plane = np.maximum(plane, plane.dtype.type(lo))
+    return cv2.convertScaleAbs(plane, alpha=alpha, beta=-lo * alpha)
+
+
+def channel_ranges(img):
+    """Return ((lo, hi), ...) per channel of img, for use with normalize"""
+    ranges = []
+    for i in range(img.shape[2]):
+        lo, hi, _, _ = cv2.minMaxLoc(img[:, :, i])
+        ranges.append((lo, hi))
+    return tuple(ranges)
+
+
+def fixed_ranges(space, dtype):
+    """Nominal ((lo, hi), ...) of the encoding, the same for every image"""
+    space = spaces.get(space)
+    return tuple(space.channel_range(ch, np.dtype(dtype).name) for ch in space.channels)
+
+
+def percentile_ranges(img, percentiles=PERCENTILES, max_samples=1 << 20):
+    """Per-channel percentile ranges of img, ignoring outliers
+
+    8-bit channels use a full histogram, other depths a strided sample of
+    about max_samples pixels.
+    """
+    low, high = percentiles
+    if img.dtype != np.uint8:
+        step = max(1, int((img.shape[0] * img.shape[1] / max_samples) ** 0.5))
+        sample = img[::step, ::step].reshape(-1, img.shape[2])
+        lo, hi = np.percentile(sample, (low, high), axis=0)
+        return tuple(zip(lo.tolist(), hi.tolist()))
+    ranges = []
+    for i in range(img.shape[2]):
+        hist = cv2.calcHist([img], [i], None, [256], [0, 256]).ravel()
+        cdf = np.cumsum(hist) / hist.sum()
+        ranges.append((float(np.searchsorted(cdf, low / 100)), float(np.searchsorted(cdf, high / 100))))
+    return tuple(ranges)
+
+
+def normalization_ranges(img, space, how="image"):
+    """Channel ranges of img for normalization mode how, see NORMALIZATIONS"""
+    if how == "fixed":
+        return fixed_ranges(space, img.dtype)
+    if how == "percentile":
+        return percentile_ranges(img)
+    if how == "image":
+        return channel_ranges(img)
+    raise ValueError(f"Unknown normalization {how!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def colormap_table(name):
+    """(256, 3) RGB uint8 table of a colormap"""
+    ramp = np.arange(256, dtype=np.uint8)
+    if name == "gray":
+        return np.repeat(ramp[:, None], 3, axis=1)
+    if name == "viridis":
+        return cv2.applyColorMap(ramp[:, None], cv2.COLORMAP_VIRIDIS)[:, 0, ::-1].copy()
+    if name == "hue":
+        # 0-255 spans the hue circle at full saturation and value
+        hsv = np.stack([np.rint(ramp * (179 / 255)), np.full(256, 255), np.full(256, 255)], axis=1)
+        return cv2.cvtColor(hsv.astype(np.uint8)[:, None], cv2.COLOR_HSV2RGB)[:, 0]
+    ends = {"green-red": ((0, 150, 70), (220, 30, 40)),
+            "blue-yellow": ((40, 80, 220), (230, 200, 30))}
+    if name not in ends:
+        raise ValueError(f"Unknown colormap {name!r}")
+    # Diverging: first color through neutral gray at the midpoint to the second
+    x = np.arange(256)
+    return np.stack([np.rint(np.interp(x, (0, 128, 255), (lo, 128, hi)))
+                     for lo, hi in zip(*ends[name])], axis=1).astype(np.uint8)
+
+
+def resolve_colormap(space, ch, colormap):
+    """Concrete colormap name for channel ch, resolving "auto" through the registry"""
+    if colormap == "auto":
+        return spaces.get(space).colormaps.get(ch, "gray")
+    return colormap
+
+
+@functools.lru_cache(maxsize=256)
+def display_lut(value_range, colormap="gray"):
+    """(256, 1, 3) LUT: 8-bit values in value_range stretched, clipped and colored"""
+    lo, hi = value_range
+    x = np.arange(256, dtype=np.float32)
+    scale = 255.0 / (hi - lo) if hi > lo else 0.0
+    index = np.rint(np.clip((x - lo) * scale, 0, 255)).astype(np.uint8)
+    return colormap_table(colormap)[index][:, None, :]
+
+
+def apply_lut(plane, value_range=None, colormap="gray"):
+    """Map a single-channel plane to an RGB display image through display_lut
+
+    value_range defaults to the plane's min/max. Planes other than 8-bit are
+    first quantized with the range, then looked up with the identity range.
+    """
+    if value_range is None:
+        lo, hi, _, _ = cv2.minMaxLoc(plane)
+        value_range = (lo, hi)
+    if plane.dtype != np.uint8:
+        plane = normalize(plane, value_range)
+        value_range = (0, 255)
+    lut = display_lut(tuple(float(v) for v in value_range), colormap)
+    if colormap == "gray":
+        # Single-channel lookup plus expansion is cheaper than a 3-channel map
+        return cv2.cvtColor(cv2.LUT(plane, np.ascontiguousarray(lut[:, 0, 0])), cv2.COLOR_GRAY2RGB)
+    return cv2.applyColorMap(plane, lut)
+
+
+def _select_range(ranges, index):
+    if ranges is None:
+        return None
+    if index is None:
+        return min(r[0] for r in ranges), max(r[1] for r in ranges)
+    return ranges[index]
+
+
+def make_proxy(img, max_width, max_height):
+    """Downscale img with INTER_AREA so it fits max_width x max_height
+
+    Images that already fit are returned unchanged. Used to run previews at
+    display resolution instead of on the full image.
+    """
+    img_height, img_width = img.shape[:2]
+    if img_width <= max_width and img_height <= max_height:
+        return img
+    size = fit_size(img_width, img_height, max_width, max_height)
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def as_display(img, space="rgb", ch=None):
+    """Map unnormalized RGB values or a display channel of any depth to uint8"""
+    if img.dtype == np.uint8:
+        return img
+    if img.dtype == np.uint16:
+        alpha = 255 / 65535
+    else:
+        # Float: scaled by the nominal top of the channel, e.g. RGB 1, L 100
+        alpha = 255 / spaces.get(space).channel_range(ch)[1] if ch is not None else 255
+        img = np.clip(img, 0, None)
+    # Flattened to 2-D so stacks of any rank go through OpenCV
+    flat = img.reshape(img.shape[0], -1)
+    return cv2.convertScaleAbs(flat, alpha=alpha).reshape(img.shape)
+
+
+def physical_values(pixel, space):
+    """Values of one pixel in the natural units of its space
+
+    Lab as L 0-100 with signed a/b, HSV as H in degrees with S/V 0-1. The
+    packed 8-bit OpenCV encodings are unpacked; RGB is returned as stored.
+    """
+    values = tuple(float(v) for v in pixel)
+    if pixel.dtype == np.uint8 and space == "lab":
+        return values[0] * 100 / 255, values[1] - 128, values[2] - 128
+    if pixel.dtype == np.uint8 and space == "hsv":
+        return values[0] * 2, values[1] / 255, values[2] / 255
+    return values
+
+
+def build_pyramid(img, min_size=512):
+    """Return [img, img/2, img/4, ...] down to about min_size pixels
+
+    Each level is an INTER_AREA half of the previous one; level 0 is img
+    itself, not a copy.
+    """
+    levels = [img]
+    while max(levels[-1].shape[:2]) > min_size:
+        height, width = levels[-1].shape[:2]
+        size = ((width + 1) // 2, (height + 1) // 2)
+        levels.append(cv2.resize(levels[-1], size, interpolation=cv2.INTER_AREA))
+    return levels
+
+
+def convert_pyramid(levels, full_image, src, dst):
+    """Pyramid of a converted image from the pyramid of its source
+
+    Coarse levels are converted from the source levels (cheap, and averages
+    are taken in the source space so hue does not wrap); level 0 is the
+    full-resolution conversion.
+    """
+    return [full_image] + [convert(level, src, dst) for level in levels[1:]]
+
+
+def _needs_normalize(space, ch, mode):
+    # RGB planes and the display channels (e.g. L) in RGB view are already
+    # display values, every other channel is stretched for better visualization
+    if space in ("rgb", "bgr"):
+        return False
+    return not (mode == "rgb" and ch in spaces.get(space).display_channels)
+
+
+def extract_channel(img, space, ch, mode="rgb", ranges=None, colormap="gray"):
+    """Return an RGB uint8 display image for one channel (or "all") of img
+
+    mode "rgb" converts "all" back to RGB, mode "raw" shows the stored
+    values stretched to 0-255. ranges, as returned by channel_ranges or
+    normalization_ranges, replaces the min/max scan of img. Single channels
+    go through a 256-entry LUT that also applies colormap.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown display mode {mode!r}")
+
+    if ch == "all":
+        if space in ("rgb", "bgr") or mode == "rgb":
+            return as_display(convert(img, space, "rgb"))
+        return normalize(img, _select_range(ranges, None))
+
+    index = channel_index(space, ch)
+    plane = img[:, :, index]
+    colormap = resolve_colormap(space, ch, colormap)
+    if _needs_normalize(space, ch, mode):
+        return apply_lut(plane, _select_range(ranges, index), colormap)
+    plane = as_display(plane, space, ch)
+    if colormap != "gray":
+        return apply_lut(plane, (0, 255), colormap)
+    return cv2.cvtColor(plane, cv2.COLOR_GRAY2RGB)
+
+
+def render_channel(img, space, ch, mode, size, ranges=None, interpolation=cv2.INTER_AREA,
+                   colormap="gray"):
+    """extract_channel at display size (width, height)
+
+    The image is resized first, so channel selection, normalization and the
+    gray to RGB expansion only touch display-sized arrays and img is never
+    copied at full size. Normalization ranges are taken from img before the
+    resize unless given.
+    """
+    if ranges is None and space not in ("rgb", "bgr"):
+        ranges = channel_ranges(img)
+    img_height, img_width = img.shape[:2]
+    if (img_width, img_height) != tuple(size):
+        with profiling.stage("display/resize"):
+            img = cv2.resize(img, tuple(size), interpolation=interpolation)
+    with profiling.stage("display/channel"):
+        return extract_channel(img, space, ch, mode, ranges, colormap)
+
+
+def normalize_batch(stack):
+    """Per-image min/max stretch of an (N,...) stack to uint8 0-255"""
+    axes = tuple(range(1, stack.ndim))
+    lo = stack.min(axis=axes, keepdims=True).astype(np.float32)
+    hi = stack.max(axis=axes, keepdims=True).astype(np.float32)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    out = (stack.astype(np.float32) - lo) * (255.0 / span)
+    return np.rint(out, out=out).astype(np.uint8)
+
+
+def extract_channel_batch(stack, space, ch, mode="rgb"):
+    """Batched extract_channel for an (N,H,W,3) stack, returns (N,H,W,3)"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown display mode {mode!r}")
+
+    if ch == "all":
+        if space in ("rgb", "bgr") or mode == "rgb":
+            return as_display(convert_batch(stack, space, "rgb"))
+        return normalize_batch(stack)
+
+    planes = stack[..., channel_index(space, ch)]
+    if _needs_normalize(space, ch, mode):
+        planes = normalize_batch(planes)
+    else:
+        planes = as_display(planes, space, ch)
+    return np.repeat(planes[..., None], 3, axis=-1)
+
+
+def fit_size(img_width, img_height, canvas_width, canvas_height):
+    """Return (width, height) of the image scaled to fit the canvas"""
+    scale = min(canvas_width / img_width, canvas_height / img_height)
+    return max(1, int(img_width * scale)), max(1, int(img_height * scale))
+
+
+def resize_to_fit(img, canvas_width, canvas_height, interpolation=cv2.INTER_LINEAR):
+    img_height, img_width = img.shape[:2]
+    size = fit_size(img_width, img_height, canvas_width, canvas_height)
+    return cv2.resize(img, size, interpolation=interpolation)
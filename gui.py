@@ -0,0 +1,1326 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import os
+import sys
+import threading
+
+# cv2, PIL and engine are imported where they are used (and preloaded in the
+# background by main), so the window appears without waiting for them
+import profiling
+import spaces
+from cache import DiskCache, DisplayCache
+from inspector import HoverInspector, HINT
+from session import ImageSession, SessionEntry
+from statspanel import StatsPanel
+from tasks import TaskExecutor
+from viewport import Viewport
+
+IMAGE_SAVE_TYPES = [("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("TIFF files", "*.tiff"),
+                    ("All files", "*.*")]
+RAW_SAVE_TYPES = [("NumPy array", "*.npy"), ("NumPy archive with metadata", "*.npz"),
+                  ("TIFF (float/16-bit)", "*.tiff")]
+
+# Normalization modes and colormaps offered for stretched channels, as in
+# engine.NORMALIZATIONS/COLORMAPS (engine is not imported at startup)
+NORMALIZATION_CHOICES = [("Min/Max", "image"), ("Fixed Range", "fixed"), ("Percentile 1-99", "percentile")]
+COLORMAP_CHOICES = ("gray", "auto", "viridis", "hue", "green-red", "blue-yellow")
+# Spaces with threshold controls and the slider ranges, in natural units
+# (H degrees, S/V 0-1, L 0-100, signed a/b), as in threshold.SPACES/FULL_RANGES
+THRESHOLD_RANGES = {"hsv": ((0, 360), (0, 1), (0, 1)),
+                    "lab": ((0, 100), (-128, 127), (-128, 127))}
+THRESHOLD_VIEWS = [("Off", "off"), ("Mask", "mask"), ("Overlay", "overlay")]
+SETTINGS_TYPES = [("Threshold settings", "*.json")]
+# ΔE formulas of the compare tab, as in deltae.METRICS
+DELTA_E_CHOICES = [("CIE76", "76"), ("CIE94", "94"), ("CIEDE2000", "2000")]
+VIDEO_TYPES = [("Video files", "*.mp4 *.avi *.mkv *.mov *.m4v *.webm")]
+VIDEO_SAVE_TYPES = [("MP4 video", "*.mp4"), ("AVI video (Motion JPEG)", "*.avi")]
+
+# Quiet period after the last <Configure> event before a resized canvas is redrawn
+RESIZE_SETTLE_MS = 120
+
+class ImageColorSpaceConverter:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Image Color Space Converter")
+        self.root.geometry("1200x800")
+        self.root.minsize(1200, 800)  # Set minimum window size
+        
+        # Set application icon
+        self.set_application_icon()
+        
+        # Load custom fonts
+        try:
+            font_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "fonts")
+            self.regular_font = ("fccTYPO-Regular", 11)
+            self.bold_font = ("fccTYPO-Bold", 11)
+        except Exception as e:
+            print(f"Warning: Could not load custom fonts: {e}")
+            self.regular_font = ("Arial", 11)
+            self.bold_font = ("Arial", 11)
+        
+        # Variables
+        self.original_image = None
+        self.current_image = None
+        self.image_path = None
+        
+        # Rendered display tiles, keyed by image, space, view settings, level, zoom and position
+        self.image_id = 0
+        self.display_cache = DisplayCache()
+        # Decoded and converted full-resolution images by file content, on
+        # disk across sessions; image_digest identifies the loaded file
+        self.disk_cache = DiskCache()
+        self.image_digest = None
+        
+        # Image pyramids per space: (levels, full-image channel ranges per
+        # normalization mode), and the zoom/pan state of each canvas
+        self.pyramids = {}
+        self.viewports = {}
+        self.pending_redraws = set()
+        self.drag_origin = None
+        # Spaces drawn from a coarser level while the wheel is turning, and
+        # the pending full-quality redraw for them
+        self.draft_spaces = set()
+        self.refine_job = None
+        
+        # Canvas sizes reported by <Configure>, and spaces whose canvas
+        # changed size and still need a redraw once visible and settled
+        self.canvas_sizes = {}
+        self.stale_spaces = set()
+        self.resize_job = None
+        
+        # Worker pool for load/convert/save, results come back via root.after
+        self.idle_status = "Ready to load image"
+        self.tasks = TaskExecutor(root, on_status=self.show_task_status)
+        # Review session over a folder: the next files are loaded on a
+        # separate one-thread executor, so navigating does not cancel them
+        self.session = None
+        self.session_waiting = None
+        self.prefetcher = TaskExecutor(root, max_workers=1)
+        # Open video (a stream.FrameSource), the frame wanted by the scrubber
+        # and the read in flight; one frame is read at a time and the read
+        # that finishes fetches the latest wanted frame, so dragging never
+        # queues up decodes
+        self.video = None
+        self.video_index = 0
+        self.video_task = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind("<Escape>", lambda event: self.cancel_tasks())
+        self.root.bind("<Prior>", lambda event: self.step_session(-1))
+        self.root.bind("<Next>", lambda event: self.step_session(1))
+        
+        # Color information bar shared by all tabs
+        color_frame = ttk.LabelFrame(root, text="Color Information", style='Custom.TLabelframe')
+        color_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+        self.color_label = ttk.Label(color_frame, text=HINT,
+                                   font=self.regular_font, foreground='blue')
+        self.color_label.pack(side=tk.LEFT, padx=10)
+        self.inspector = HoverInspector(root, self.color_label)
+        if profiling.enabled():
+            self.profile_label = ttk.Label(color_frame, font=self.regular_font, foreground='gray')
+            self.profile_label.pack(side=tk.RIGHT, padx=10)
+            self.refresh_profile()
+        
+        # Create notebook for tabs
+        self.notebook = ttk.Notebook(root)
+        self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        
+        # Frame scrubber shared by all tabs, shown while a video is open
+        self.scrub_frame = ttk.Frame(root)
+        self.scrubber = ttk.Scale(self.scrub_frame, from_=0, to=1, orient=tk.HORIZONTAL,
+                                  command=self.on_scrub)
+        self.scrubber.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 0))
+        self.scrub_label = ttk.Label(self.scrub_frame, font=self.regular_font, width=16)
+        self.scrub_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.scrub_frame, text="🎬 Export Video", command=self.export_video,
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        
+        # Create tabs, one per registered color space
+        self.converted = {}
+        self.canvases = {}
+        self.channel_vars = {}
+        self.display_modes = {}
+        self.normalizations = {}
+        self.colormaps = {}
+        self.photos = {}
+        # Histogram/statistics per space, computed once per load or conversion
+        self.stats = {}
+        self.stats_panels = {}
+        # Threshold sliders per space, and the full-resolution mask pyramid
+        # (thresholds, levels, coverage) and pending mask request of each
+        self.threshold_vars = {}
+        self.threshold_views = {}
+        self.threshold_labels = {}
+        self.masks = {}
+        self.mask_requests = {}
+        self.create_rgb_tab()
+        for name in spaces.target_names():
+            self.create_space_tab(spaces.get(name))
+        # ΔE of the loaded image against a reference image
+        self.compare_reference = None
+        # The heatmap is kept at screen size, resizes only rescale that
+        self.compare_heatmap = None
+        self.compare_photo = None
+        self.compare_resize_job = None
+        self.create_compare_tab()
+        
+        # Apply styling
+        self.apply_styling()
+        
+    def set_application_icon(self):
+        """Set the application icon based on platform"""
+        try:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            icon_path = os.path.join(current_dir, "assets", "icons")
+            if sys.platform == "darwin":
+                icon_file = os.path.join(icon_path, "icon.png")
+                if os.path.exists(icon_file):
+                    icon = tk.PhotoImage(file=icon_file)
+                    self.root.iconphoto(True, icon)
+            elif sys.platform == "win32":
+                icon_file = os.path.join(icon_path, "icon.ico")
+                if os.path.exists(icon_file):
+                    self.root.iconbitmap(icon_file)
+            else:
+                icon_file = os.path.join(icon_path, "icon.png")
+                if os.path.exists(icon_file):
+                    icon = tk.PhotoImage(file=icon_file)
+                    self.root.iconphoto(True, icon)
+        except Exception as e:
+            print(f"Error loading application icon: {str(e)}")
+        
+    def create_rgb_tab(self):
+        rgb_frame = ttk.Frame(self.notebook)
+        self.notebook.add(rgb_frame, text="RGB Preview")
+        
+        # Control panel
+        control_frame = ttk.Frame(rgb_frame)
+        control_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        ttk.Button(control_frame, text="📁 Load Image", command=self.load_image, 
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        ttk.Button(control_frame, text="📂 Open Folder", command=self.open_folder, 
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        ttk.Button(control_frame, text="🎞 Open Video", command=self.open_video,
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        ttk.Button(control_frame, text="◀", width=3, command=lambda: self.step_session(-1),
+                  style='Large.TButton').pack(side=tk.LEFT)
+        ttk.Button(control_frame, text="▶", width=3, command=lambda: self.step_session(1),
+                  style='Large.TButton').pack(side=tk.LEFT)
+        ttk.Button(control_frame, text="💾 Save Image", command=self.save_image, 
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        
+        # Channel selection
+        channel_frame = ttk.LabelFrame(control_frame, text="Display Channel", style='Custom.TLabelframe')
+        channel_frame.pack(side=tk.LEFT, padx=20)
+        
+        self.rgb_channel_var = tk.StringVar(value="all")
+        ttk.Radiobutton(channel_frame, text="All", variable=self.rgb_channel_var, 
+                       value="all", command=self.update_rgb_display, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(channel_frame, text="R", variable=self.rgb_channel_var, 
+                       value="R", command=self.update_rgb_display, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(channel_frame, text="G", variable=self.rgb_channel_var, 
+                       value="G", command=self.update_rgb_display, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(channel_frame, text="B", variable=self.rgb_channel_var, 
+                       value="B", command=self.update_rgb_display, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        
+        # Status label
+        ttk.Button(control_frame, text="✖ Cancel", command=self.cancel_tasks,
+                  style='Large.TButton').pack(side=tk.RIGHT, padx=10)
+        self.status_label = ttk.Label(control_frame, text=self.idle_status, font=self.bold_font)
+        self.status_label.pack(side=tk.RIGHT, padx=20)
+        
+        # Image display area
+        self.canvas_frame = ttk.Frame(rgb_frame)
+        self.canvas_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        self.stats_panels["rgb"] = StatsPanel(self.canvas_frame, self.regular_font)
+        self.stats_panels["rgb"].pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+        
+        self.canvas = tk.Canvas(self.canvas_frame, bg="white")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        self.bind_viewport(self.canvas, "rgb")
+        
+    def create_space_tab(self, space):
+        """Convert/save controls, channel and mode selection and canvas for one space"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=space.label)
+        
+        # Control panel
+        control_frame = ttk.Frame(frame)
+        control_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        ttk.Button(control_frame, text=f"🔄 Convert to {space.label}",
+                  command=lambda: self.convert_space(space.name),
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        ttk.Button(control_frame, text=f"💾 Save {space.label}",
+                  command=lambda: self.save_space(space.name),
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        
+        redraw = lambda: self.update_space_display(space.name)
+        
+        # Channel selection
+        channel_frame = ttk.LabelFrame(control_frame, text="Display Channel", style='Custom.TLabelframe')
+        channel_frame.pack(side=tk.LEFT, padx=20)
+        
+        self.channel_vars[space.name] = tk.StringVar(value="all")
+        for text, value in [("All", "all")] + [(ch, ch) for ch in space.channels]:
+            ttk.Radiobutton(channel_frame, text=text, variable=self.channel_vars[space.name],
+                           value=value, command=redraw, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        
+        # Display mode toggle
+        display_frame = ttk.LabelFrame(control_frame, text="Display Mode", style='Custom.TLabelframe')
+        display_frame.pack(side=tk.LEFT, padx=20)
+        
+        self.display_modes[space.name] = tk.StringVar(value="rgb")
+        ttk.Radiobutton(display_frame, text="RGB View", variable=self.display_modes[space.name],
+                       value="rgb", command=redraw, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(display_frame, text="Raw Data", variable=self.display_modes[space.name],
+                       value="raw", command=redraw, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        
+        # Normalization and colormap of stretched channels
+        view_frame = ttk.Frame(frame)
+        view_frame.pack(fill=tk.X, padx=20)
+        
+        norm_frame = ttk.LabelFrame(view_frame, text="Normalization", style='Custom.TLabelframe')
+        norm_frame.pack(side=tk.LEFT, padx=10)
+        
+        self.normalizations[space.name] = tk.StringVar(value="image")
+        for text, value in NORMALIZATION_CHOICES:
+            ttk.Radiobutton(norm_frame, text=text, variable=self.normalizations[space.name],
+                           value=value, command=redraw, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        
+        colormap_frame = ttk.LabelFrame(view_frame, text="Colormap", style='Custom.TLabelframe')
+        colormap_frame.pack(side=tk.LEFT, padx=20)
+        
+        self.colormaps[space.name] = tk.StringVar(value="gray")
+        colormap_box = ttk.Combobox(colormap_frame, textvariable=self.colormaps[space.name],
+                                    values=COLORMAP_CHOICES, state="readonly", width=12)
+        colormap_box.pack(side=tk.LEFT, padx=5, pady=2)
+        colormap_box.bind("<<ComboboxSelected>>", lambda e: redraw())
+        
+        if space.name in THRESHOLD_RANGES:
+            self.create_threshold_controls(frame, space)
+        
+        # Image display
+        self.stats_panels[space.name] = StatsPanel(frame, self.regular_font)
+        self.stats_panels[space.name].pack(side=tk.RIGHT, fill=tk.Y, padx=(0, 20), pady=10)
+        
+        canvas = tk.Canvas(frame, bg="white")
+        canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        self.canvases[space.name] = canvas
+        self.bind_viewport(canvas, space.name)
+        
+    def create_threshold_controls(self, frame, space):
+        """Range sliders per channel, mask/overlay view and settings export for one space"""
+        name = space.name
+        threshold_frame = ttk.LabelFrame(frame, text="Threshold", style='Custom.TLabelframe')
+        threshold_frame.pack(fill=tk.X, padx=30, pady=(10, 0))
+        
+        slider_frame = ttk.Frame(threshold_frame)
+        slider_frame.pack(fill=tk.X)
+        self.threshold_views[name] = tk.StringVar(value="off")
+        for text, value in THRESHOLD_VIEWS:
+            ttk.Radiobutton(slider_frame, text=text, variable=self.threshold_views[name], value=value,
+                           command=lambda: self.schedule_redraw(name),
+                           style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        
+        # A low and a high slider per channel; a hue range with low > high wraps through 0
+        self.threshold_vars[name] = []
+        for ch, (lo, hi) in zip(space.channels, THRESHOLD_RANGES[name]):
+            ttk.Label(slider_frame, text=ch, font=self.bold_font).pack(side=tk.LEFT, padx=(15, 5))
+            pair = (tk.DoubleVar(value=lo), tk.DoubleVar(value=hi))
+            for var in pair:
+                scale = ttk.Scale(slider_frame, from_=lo, to=hi, variable=var, length=100,
+                                  command=lambda value: self.on_threshold_drag(name))
+                scale.pack(side=tk.LEFT, padx=2)
+                scale.bind("<ButtonRelease-1>", lambda e: self.on_threshold_release(name))
+            self.threshold_vars[name].append(pair)
+        
+        action_frame = ttk.Frame(threshold_frame)
+        action_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(action_frame, text="💾 Export Mask", command=lambda: self.export_mask(name)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(action_frame, text="Save Settings", command=lambda: self.save_thresholds(name)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(action_frame, text="Load Settings", command=lambda: self.load_thresholds(name)).pack(side=tk.LEFT, padx=5)
+        self.threshold_labels[name] = ttk.Label(action_frame, font=self.regular_font,
+                                                text="Pick Mask or Overlay, then drag the sliders")
+        self.threshold_labels[name].pack(side=tk.LEFT, padx=15)
+        
+    def current_thresholds(self, name):
+        """The slider settings of a space as threshold.Thresholds"""
+        import threshold
+        
+        ranges = []
+        for (lo_var, hi_var), (bottom, top) in zip(self.threshold_vars[name], THRESHOLD_RANGES[name]):
+            digits = 2 if top - bottom <= 1 else 0
+            ranges.append((round(lo_var.get(), digits), round(hi_var.get(), digits)))
+        return threshold.Thresholds(name, ranges)
+        
+    def threshold_key(self, name):
+        """(view, thresholds, full-resolution mask ready) of a space, None when not thresholding"""
+        view = self.threshold_views.get(name)
+        if view is None or view.get() == "off":
+            return None
+        thresholds = self.current_thresholds(name)
+        mask = self.masks.get(name)
+        return view.get(), thresholds, mask is not None and mask[0] == thresholds
+        
+    def show_threshold_readout(self, name):
+        text = self.current_thresholds(name).describe()
+        mask = self.masks.get(name)
+        if mask is not None and mask[0] == self.current_thresholds(name):
+            text += f"  |  {mask[2]:.1%} of pixels"
+        self.threshold_labels[name].config(text=text)
+        
+    def on_threshold_drag(self, name):
+        """Redraw from the display pyramid while a slider moves"""
+        self.show_threshold_readout(name)
+        if self.threshold_views[name].get() != "off":
+            self.draft_spaces.add(name)
+            self.schedule_redraw(name)
+            
+    def on_threshold_release(self, name):
+        # The full-resolution mask is requested by the redraw
+        self.draft_spaces.discard(name)
+        self.schedule_redraw(name)
+        
+    def request_mask(self, name):
+        """Threshold the full-resolution planes of a space once its sliders have settled"""
+        key = self.threshold_key(name)
+        if key is None or key[2] or name in self.draft_spaces or name not in self.converted:
+            return
+        thresholds = key[1]
+        # A cancelled request (Esc, or a new generation) never reports back
+        request = self.mask_requests.get(name)
+        if request is not None and request[0] == thresholds and not request[1].cancelled:
+            return
+        source = self.converted[name]
+        task = self.tasks.submit(mask_task, source, thresholds,
+                                 description=f"Thresholding {spaces.get(name).label}",
+                                 on_done=lambda result: self.on_mask_ready(name, source, thresholds, *result),
+                                 on_error=lambda e: self.on_mask_failed(name, thresholds, e))
+        self.mask_requests[name] = (thresholds, task)
+        
+    def forget_mask_request(self, name, thresholds):
+        request = self.mask_requests.get(name)
+        if request is not None and request[0] == thresholds:
+            del self.mask_requests[name]
+            
+    def on_mask_ready(self, name, source, thresholds, levels, coverage):
+        if source is not self.converted.get(name):
+            return  # Another image was loaded meanwhile
+        self.forget_mask_request(name, thresholds)
+        self.masks[name] = (thresholds, levels, coverage)
+        self.show_threshold_readout(name)
+        self.schedule_redraw(name)
+        
+    def on_mask_failed(self, name, thresholds, error):
+        # Settling the sliders again retries
+        self.forget_mask_request(name, thresholds)
+        messagebox.showerror("Error", f"Failed to threshold: {str(error)}")
+        
+    def export_mask(self, name):
+        image = self.converted.get(name)
+        if image is None:
+            messagebox.showwarning("Warning", f"Convert to {spaces.get(name).label} first")
+            return
+        
+        file_path = filedialog.asksaveasfilename(defaultextension=".png",
+                                                 filetypes=[("PNG files", "*.png")])
+        if file_path:
+            thresholds = self.current_thresholds(name)
+            settings_path = os.path.splitext(file_path)[0] + ".json"
+            self.tasks.submit(export_mask_task, file_path, settings_path, image, thresholds,
+                              description="Exporting mask", scoped=False,
+                              on_done=lambda _: messagebox.showinfo(
+                                  "Success", f"Mask and settings saved ({os.path.basename(settings_path)})"),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to export mask: {str(e)}"))
+            
+    def save_thresholds(self, name):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=SETTINGS_TYPES)
+        if file_path:
+            try:
+                self.current_thresholds(name).save(file_path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
+                
+    def load_thresholds(self, name):
+        import threshold
+        
+        file_path = filedialog.askopenfilename(filetypes=SETTINGS_TYPES)
+        if not file_path:
+            return
+        try:
+            thresholds = threshold.Thresholds.load(file_path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Failed to load settings: {str(e)}")
+            return
+        if thresholds.space != name:
+            messagebox.showerror("Error", f"These settings are for {spaces.get(thresholds.space).label}")
+            return
+        for (lo_var, hi_var), (lo, hi) in zip(self.threshold_vars[name], thresholds.ranges):
+            lo_var.set(lo)
+            hi_var.set(hi)
+        self.show_threshold_readout(name)
+        self.schedule_redraw(name)
+        
+    def create_compare_tab(self):
+        """Reference loading, metric selection, ΔE summary and heatmap canvas"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="ΔE Compare")
+        
+        # Control panel
+        control_frame = ttk.Frame(frame)
+        control_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        ttk.Button(control_frame, text="📁 Load Reference", command=self.load_reference,
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        ttk.Button(control_frame, text="⚖ Compare", command=self.compare_images,
+                  style='Large.TButton').pack(side=tk.LEFT, padx=10)
+        
+        metric_frame = ttk.LabelFrame(control_frame, text="ΔE Formula", style='Custom.TLabelframe')
+        metric_frame.pack(side=tk.LEFT, padx=20)
+        
+        self.delta_e_metric = tk.StringVar(value="2000")
+        for text, value in DELTA_E_CHOICES:
+            ttk.Radiobutton(metric_frame, text=text, variable=self.delta_e_metric,
+                           value=value, style='Custom.TRadiobutton').pack(side=tk.LEFT, padx=5)
+        
+        self.compare_label = ttk.Label(frame, text="Load a reference image to compare the loaded image against",
+                                       font=self.regular_font)
+        self.compare_label.pack(fill=tk.X, padx=30)
+        
+        # Heatmap, fit to the canvas
+        self.compare_canvas = tk.Canvas(frame, bg="white")
+        self.compare_canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        self.compare_canvas.bind("<Configure>", lambda e: self.on_compare_configure())
+        
+    def load_image(self):
+        file_path = filedialog.askopenfilename(
+            title="Select Image",
+            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.tif *.tiff *.webp *.exr")]
+        )
+        if file_path:
+            # A single file ends the review session
+            self.end_session()
+            # Results of work on the previous image are no longer wanted
+            self.tasks.new_generation()
+            self.tasks.submit(read_image_task, file_path, self.disk_cache,
+                              description=f"Loading {os.path.basename(file_path)}",
+                              on_done=lambda result: self.on_image_loaded(file_path, *result),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to load image: {str(e)}"))
+                
+    def open_folder(self):
+        directory = filedialog.askdirectory(title="Select Folder to Review")
+        if directory:
+            self.start_session([directory])
+            
+    def start_session(self, inputs):
+        """Review the images in inputs (files and folders) one by one"""
+        try:
+            session = ImageSession.from_inputs(inputs)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to open images: {str(e)}")
+            return
+        self.end_session()
+        self.session = session
+        self.show_session_image()
+        
+    def end_session(self):
+        """Leave the folder review session or video, if any"""
+        self.prefetcher.new_generation()
+        self.session = None
+        self.session_waiting = None
+        self.close_video()
+        
+    def step_session(self, step):
+        if self.video is not None:
+            self.show_video_frame(min(max(self.video_index + step, 0), self.video.count - 1))
+        elif self.session is not None and self.session.move(step):
+            self.show_session_image()
+            
+    def show_session_image(self):
+        """Show the current session file: from memory, from a running prefetch or loaded now"""
+        path = self.session.current
+        # Spaces converted on the previous image are converted ahead too
+        targets = tuple(self.converted)
+        self.tasks.new_generation()
+        self.session_waiting = None
+        # Prefetches of files stepped past would only delay the ones wanted now
+        for task in self.session.stale_prefetches():
+            task.cancel()
+        entry = self.session.get(path)
+        if entry is not None:
+            self.show_session_entry(path, entry)
+        elif path in self.session.inflight:
+            self.session_waiting = path
+            self.set_idle_status(f"Loading {self.session.title()}")
+        else:
+            self.tasks.submit(read_image_task, path, self.disk_cache,
+                              description=f"Loading {os.path.basename(path)}",
+                              on_done=lambda result: self.on_session_loaded(path, result),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to load image: {str(e)}"))
+        self.prefetch_neighbours(targets)
+        
+    def on_session_loaded(self, path, loaded):
+        entry = SessionEntry(loaded)
+        self.session.store(path, entry)
+        self.show_session_entry(path, entry)
+        
+    def show_session_entry(self, path, entry):
+        self.on_image_loaded(path, *entry.loaded)
+        for name, result in entry.converted.items():
+            self.apply_conversion(name, *result)
+            self.update_space_display(name)
+        self.set_idle_status(self.session.title())
+        
+    def prefetch_neighbours(self, targets):
+        """Load the files around the current one and convert them to targets"""
+        session = self.session
+        for path, entry, missing in session.to_prefetch(targets):
+            loaded = entry.loaded if entry is not None else None
+            session.inflight[path] = self.prefetcher.submit(
+                prefetch_task, path, self.disk_cache, missing, loaded, pass_task=True,
+                on_done=lambda result, path=path: self.on_prefetched(session, path, result),
+                on_error=lambda e, path=path: session.inflight.pop(path, None))
+            
+    def on_prefetched(self, session, path, result):
+        session.inflight.pop(path, None)
+        if session is not self.session:
+            return
+        loaded, converted = result
+        entry = session.get(path) or SessionEntry(loaded)
+        entry.converted.update(converted)
+        session.store(path, entry)
+        if self.session_waiting == path and session.current == path:
+            self.session_waiting = None
+            self.show_session_entry(path, entry)
+            
+    def open_video(self):
+        file_path = filedialog.askopenfilename(title="Select Video", filetypes=VIDEO_TYPES)
+        if file_path:
+            self.tasks.submit(open_video_task, file_path,
+                              description=f"Opening {os.path.basename(file_path)}",
+                              on_done=self.on_video_opened,
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to open video: {str(e)}"))
+            
+    def on_video_opened(self, source):
+        self.end_session()
+        self.tasks.new_generation()
+        self.video = source
+        self.video_index = 0
+        self.scrubber.config(to=max(1, source.count - 1))
+        self.scrubber.set(0)
+        self.scrub_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, before=self.notebook)
+        self.show_video_frame(0)
+        
+    def close_video(self):
+        if self.video is None:
+            return
+        self.video.close()
+        self.video = None
+        self.video_task = None
+        self.scrub_frame.pack_forget()
+        
+    def on_scrub(self, value):
+        index = int(float(value) + 0.5)
+        if self.video is not None and index != self.video_index:
+            self.show_video_frame(index)
+            
+    def show_video_frame(self, index):
+        self.video_index = index
+        self.scrubber.set(index)
+        self.scrub_label.config(text=f"Frame {index + 1} / {self.video.count}")
+        task = self.video_task
+        if task is not None and not task.cancelled:
+            return  # on_frame_loaded reads the latest wanted frame next
+        self.read_video_frame()
+        
+    def read_video_frame(self):
+        video, index = self.video, self.video_index
+        # Spaces converted on the previous frame are converted along
+        targets = tuple(self.converted)
+        self.video_task = self.tasks.submit(
+            read_frame_task, video, index, targets,
+            description=f"Decoding frame {index + 1}",
+            on_done=lambda result: self.on_frame_loaded(video, index, *result),
+            on_error=lambda e: self.on_frame_failed(video, e))
+        
+    def on_frame_loaded(self, video, index, loaded, converted):
+        if video is not self.video:
+            return  # Closed meanwhile
+        self.video_task = None
+        # Frames share a size, so zoom and pan carry over
+        same_size = self.original_image is not None and self.original_image.shape == loaded[0].shape
+        self.on_image_loaded(video.path, *loaded, keep_view=same_size)
+        for name, result in converted.items():
+            self.apply_conversion(name, *result)
+            self.update_space_display(name)
+        self.set_idle_status(f"{os.path.basename(video.path)}: frame {index + 1} / {video.count}")
+        if index != self.video_index:
+            self.read_video_frame()
+            
+    def on_frame_failed(self, video, error):
+        if video is self.video:
+            self.video_task = None
+        messagebox.showerror("Error", f"Failed to decode frame: {str(error)}")
+        
+    def export_video(self):
+        """Stream every frame of the open video through the visible tab's view settings"""
+        if self.video is None:
+            messagebox.showwarning("Warning", "Please open a video first")
+            return
+        name = self.visible_space()
+        if name in (None, "rgb"):
+            settings = ("rgb", self.rgb_channel_var.get(), "rgb", "fixed", "gray")
+        else:
+            settings = (name, self.channel_vars[name].get(), self.display_modes[name].get(),
+                        self.normalizations[name].get(), self.colormaps[name].get())
+        file_path = filedialog.asksaveasfilename(defaultextension=".mp4", filetypes=VIDEO_SAVE_TYPES)
+        if file_path:
+            label = spaces.get(settings[0]).label
+            self.tasks.submit(export_video_task, self.video.path, file_path, *settings,
+                              description=f"Exporting {label} video", pass_task=True, scoped=False,
+                              on_done=lambda summary: messagebox.showinfo("Success", f"Video exported\n\n{summary}"),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to export video: {str(e)}"))
+            
+    def on_image_loaded(self, file_path, image, levels, stats, digest, keep_view=False):
+        self.image_path = file_path
+        self.image_digest = digest
+        self.original_image = image
+        # Nothing modifies the loaded image, so no working copy is needed
+        self.current_image = self.original_image
+        
+        # New image identity, renders of the previous image are stale
+        self.image_id += 1
+        self.display_cache.clear()
+        self.pyramids = {"rgb": (levels, None)}
+        if not keep_view:
+            self.viewports.clear()
+        self.masks = {}
+        self.mask_requests = {}
+        
+        # Clear converted images
+        self.converted = {}
+        self.stats = {"rgb": stats}
+        for name in spaces.target_names():
+            self.stats_panels[name].show(None, None)
+        self.inspector.clear()
+        self.inspector.set_image("rgb", image)
+        # The heatmap was of the previous image
+        self.compare_heatmap = None
+        self.compare_canvas.delete("all")
+        
+        self.display_image()
+        self.set_idle_status(f"Loaded: {os.path.basename(file_path)}")
+        
+    def load_reference(self):
+        file_path = filedialog.askopenfilename(
+            title="Select Reference Image",
+            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.tif *.tiff *.webp *.exr")]
+        )
+        if file_path:
+            self.tasks.submit(read_reference_task, file_path,
+                              description=f"Loading {os.path.basename(file_path)}",
+                              on_done=lambda image: self.on_reference_loaded(file_path, image),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to load reference: {str(e)}"))
+            
+    def on_reference_loaded(self, file_path, image):
+        self.compare_reference = image
+        self.compare_label.config(text=f"Reference: {os.path.basename(file_path)}")
+        
+    def compare_images(self):
+        if self.original_image is None or self.compare_reference is None:
+            messagebox.showwarning("Warning", "Please load an image and a reference image first")
+            return
+            
+        metric = self.delta_e_metric.get()
+        source = self.original_image
+        self.tasks.submit(compare_task, self.compare_reference, source, metric,
+                          self.root.winfo_screenwidth(), self.root.winfo_screenheight(),
+                          description="Computing ΔE",
+                          on_done=lambda result: self.on_compared(source, metric, *result),
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to compare: {str(e)}"))
+        
+    def on_compared(self, source, metric, heatmap, summary):
+        if source is not self.original_image:
+            return  # Another image was loaded meanwhile
+        self.compare_heatmap = heatmap
+        above = summary["above"]
+        self.compare_label.config(text=(
+            f"ΔE{metric}  mean {summary['mean']:.2f}  median {summary['median']:.2f}  "
+            f"p95 {summary['p95']:.2f}  p99 {summary['p99']:.2f}  max {summary['max']:.2f}  |  "
+            + "  ".join(f">{t}: {fraction:.1%}" for t, fraction in above.items())))
+        self.show_compare_heatmap()
+        
+    def on_compare_configure(self):
+        """Redraw the heatmap once resizing has settled"""
+        if self.compare_resize_job is not None:
+            self.root.after_cancel(self.compare_resize_job)
+        self.compare_resize_job = self.root.after(RESIZE_SETTLE_MS, self.on_compare_resize_settled)
+        
+    def on_compare_resize_settled(self):
+        self.compare_resize_job = None
+        self.show_compare_heatmap()
+        
+    def show_compare_heatmap(self):
+        """Draw the ΔE heatmap scaled to fit the compare canvas"""
+        if self.compare_heatmap is None:
+            return
+        from PIL import Image, ImageTk
+        import engine
+        
+        width, height = self.compare_canvas.winfo_width(), self.compare_canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            return  # Not mapped yet, <Configure> redraws
+        fitted = engine.resize_to_fit(self.compare_heatmap, width, height)
+        self.compare_photo = ImageTk.PhotoImage(Image.fromarray(fitted))
+        self.compare_canvas.delete("all")
+        self.compare_canvas.create_image(width // 2, height // 2, anchor=tk.CENTER,
+                                         image=self.compare_photo)
+        
+    def save_image(self):
+        if self.current_image is None:
+            messagebox.showwarning("Warning", "No image to save")
+            return
+            
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".png",
+            filetypes=IMAGE_SAVE_TYPES
+        )
+        
+        if file_path:
+            self.tasks.submit(save_image_task, file_path, self.current_image, "rgb",
+                              description="Saving image", scoped=False,
+                              on_done=lambda _: messagebox.showinfo("Success", "Image saved successfully"),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to save image: {str(e)}"))
+                
+    def ask_save_path(self, image, raw):
+        """Save dialog for a converted image
+        
+        Raw float data can only go to the lossless containers, 8-bit raw
+        data may also be written as PNG.
+        """
+        if raw and image.dtype != "uint8":
+            return filedialog.asksaveasfilename(defaultextension=".npy", filetypes=RAW_SAVE_TYPES)
+        if raw:
+            return filedialog.asksaveasfilename(defaultextension=".png",
+                                                filetypes=[("PNG files", "*.png")] + RAW_SAVE_TYPES)
+        return filedialog.asksaveasfilename(defaultextension=".png", filetypes=IMAGE_SAVE_TYPES)
+        
+    def show_task_status(self, text):
+        """Status callback of the task executor, None means idle"""
+        self.status_label.config(text=text or self.idle_status)
+        
+    def set_idle_status(self, text):
+        self.idle_status = text
+        if not self.tasks.busy:
+            self.status_label.config(text=text)
+            
+    def cancel_tasks(self):
+        if self.tasks.busy:
+            self.tasks.cancel_all()
+            self.status_label.config(text="Cancelled")
+            
+    def on_close(self):
+        self.tasks.shutdown()
+        self.prefetcher.shutdown()
+        self.root.destroy()
+        
+    def display_image(self):
+        if self.current_image is None:
+            return
+            
+        self.update_rgb_display()
+        
+    def bind_viewport(self, canvas, space):
+        """Mouse wheel zooms at the cursor, drag pans, double-click toggles fit and 1:1
+        
+        The hover inspector reads pixel values on every canvas.
+        """
+        self.inspector.bind(canvas, space)
+        canvas.bind("<Configure>", lambda e: self.on_canvas_configure(space, e))
+        canvas.bind("<MouseWheel>", lambda e: self.on_zoom(space, e, 1.25 if e.delta > 0 else 0.8))
+        canvas.bind("<Button-4>", lambda e: self.on_zoom(space, e, 1.25))
+        canvas.bind("<Button-5>", lambda e: self.on_zoom(space, e, 0.8))
+        canvas.bind("<ButtonPress-1>", self.on_pan_start)
+        canvas.bind("<B1-Motion>", lambda e: self.on_pan(space, e))
+        canvas.bind("<Double-Button-1>", lambda e: self.on_toggle_fit(space, e))
+        
+    def on_zoom(self, space, event, factor):
+        viewport = self.viewports.get(space)
+        if viewport is not None:
+            viewport.zoom_at(factor, event.x, event.y)
+            self.draft_spaces.add(space)
+            if self.refine_job is not None:
+                self.root.after_cancel(self.refine_job)
+            self.refine_job = self.root.after(150, self.refine_redraws)
+            self.schedule_redraw(space)
+            
+    def on_pan_start(self, event):
+        self.drag_origin = (event.x, event.y)
+        
+    def on_pan(self, space, event):
+        viewport = self.viewports.get(space)
+        if viewport is None or self.drag_origin is None:
+            return
+        viewport.pan(event.x - self.drag_origin[0], event.y - self.drag_origin[1])
+        self.drag_origin = (event.x, event.y)
+        self.schedule_redraw(space)
+        
+    def on_toggle_fit(self, space, event):
+        viewport = self.viewports.get(space)
+        if viewport is None:
+            return
+        if viewport.fitted:
+            viewport.actual_size(event.x, event.y)
+        else:
+            viewport.fit()
+        self.schedule_redraw(space)
+        
+    def schedule_redraw(self, space):
+        """Coalesce zoom/pan events into at most one redraw per frame"""
+        if not self.pending_redraws:
+            self.root.after(16, self.flush_redraws)
+        self.pending_redraws.add(space)
+        
+    def flush_redraws(self):
+        pending, self.pending_redraws = self.pending_redraws, set()
+        for space in pending:
+            if space == "rgb":
+                self.update_rgb_display()
+            else:
+                self.update_space_display(space)
+            
+    def refine_redraws(self):
+        """Redraw at full quality once zooming has paused"""
+        self.refine_job = None
+        for space in self.draft_spaces:
+            self.schedule_redraw(space)
+        self.draft_spaces = set()
+            
+    def on_canvas_configure(self, space, event):
+        """Record the new size, redraw once resizing has settled"""
+        if self.canvas_sizes.get(space) == (event.width, event.height):
+            return
+        self.canvas_sizes[space] = (event.width, event.height)
+        self.stale_spaces.add(space)
+        if self.resize_job is not None:
+            self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(RESIZE_SETTLE_MS, self.on_resize_settled)
+        
+    def on_resize_settled(self):
+        self.resize_job = None
+        self.redraw_if_stale(self.visible_space())
+        
+    def on_tab_changed(self, event):
+        # Hidden tabs are not redrawn while the window is resized
+        self.redraw_if_stale(self.visible_space())
+        
+    def visible_space(self):
+        """Space shown in the selected tab, None on the compare tab"""
+        names = ("rgb",) + spaces.target_names()
+        index = self.notebook.index(self.notebook.select())
+        return names[index] if index < len(names) else None
+        
+    def redraw_if_stale(self, space):
+        if space in self.stale_spaces:
+            self.stale_spaces.discard(space)
+            self.schedule_redraw(space)
+            
+    def get_viewport(self, space):
+        """Viewport of a canvas, created on first use and following canvas resizes
+        
+        Returns None while the canvas has not been mapped and sized yet; its
+        first <Configure> event triggers the redraw.
+        """
+        levels = self.pyramids[space][0]
+        img_height, img_width = levels[0].shape[:2]
+        if space not in self.canvas_sizes:
+            self.stale_spaces.add(space)
+            return None
+        canvas_width, canvas_height = self.canvas_sizes[space]
+        
+        viewport = self.viewports.get(space)
+        if viewport is None or (viewport.img_width, viewport.img_height) != (img_width, img_height):
+            viewport = Viewport(img_width, img_height, canvas_width, canvas_height)
+            self.viewports[space] = viewport
+        elif (viewport.canvas_width, viewport.canvas_height) != (canvas_width, canvas_height):
+            viewport.set_canvas_size(canvas_width, canvas_height)
+        return viewport
+        
+    def show_on_canvas(self, canvas, space, channel, mode="rgb", normalization="image", colormap="gray"):
+        """Draw the visible part of a channel view on canvas and return its PhotoImages
+        
+        Only tiles of the pyramid level matching the current zoom that
+        intersect the canvas are resampled. Finished tiles are cached per
+        (image, space, view settings, level, zoom, tile), so panning and
+        switching back to a channel only renders tiles not seen before.
+        While zooming, uncached draft tiles come from the next coarser level.
+        """
+        with profiling.stage("display"):
+            return self.render_tiles(canvas, space, channel, mode, normalization, colormap)
+        
+    def render_tiles(self, canvas, space, channel, mode, normalization, colormap):
+        import cv2
+        from PIL import Image, ImageTk
+        import engine
+        
+        levels, ranges = self.pyramids[space]
+        if ranges is not None:
+            ranges = ranges[normalization]
+        viewport = self.get_viewport(space)
+        if viewport is None:
+            return []
+        self.stale_spaces.discard(space)
+        draft = space in self.draft_spaces
+        level = viewport.level(len(levels), draft)
+        level_image = levels[level]
+        level_height, level_width = level_image.shape[:2]
+        # Beyond 1:1 pixels are shown as blocks for inspection
+        interpolation = cv2.INTER_NEAREST if viewport.zoom > 1 else cv2.INTER_AREA
+        
+        threshold_key = self.threshold_key(space)
+        
+        self.inspector.set_transform(space, viewport)
+        canvas.delete("all")
+        photos = []
+        for x0, y0, x1, y1, cx0, cy0, cx1, cy1 in viewport.visible_tiles(level_width, level_height):
+            key = (self.image_id, space, channel, mode, normalization, colormap, threshold_key,
+                   level, viewport.zoom, x0, y0)
+            photo = self.display_cache.get(key)
+            if photo is None:
+                if threshold_key is not None:
+                    tile = self.render_threshold_tile(space, threshold_key, level, (x0, y0, x1, y1),
+                                                      (cx1 - cx0, cy1 - cy0), interpolation)
+                else:
+                    tile = engine.render_channel(level_image[y0:y1, x0:x1], space, channel, mode,
+                                                 (cx1 - cx0, cy1 - cy0), ranges, interpolation,
+                                                 colormap)
+                
+                # Convert to PIL Image
+                with profiling.stage("display/photoimage"):
+                    photo = ImageTk.PhotoImage(Image.fromarray(tile))
+                if not draft:
+                    self.display_cache.put(key, photo, tile.nbytes)
+            with profiling.stage("display/canvas"):
+                canvas.create_image(cx0, cy0, anchor=tk.NW, image=photo)
+            photos.append(photo)
+        return photos
+        
+    def render_threshold_tile(self, space, threshold_key, level, box, size, interpolation):
+        """Mask or overlay tile: from the full-resolution mask pyramid once it is ready,
+        otherwise thresholded from the pyramid level itself
+        """
+        import threshold
+        
+        view, thresholds, full = threshold_key
+        x0, y0, x1, y1 = box
+        if full:
+            mask = self.masks[space][1][level][y0:y1, x0:x1]
+        else:
+            with profiling.stage("display/threshold"):
+                mask = threshold.mask(self.pyramids[space][0][level][y0:y1, x0:x1], thresholds)
+        rgb = self.pyramids["rgb"][0][level][y0:y1, x0:x1]
+        return threshold.render(mask, rgb, view, size, interpolation)
+        
+    def refresh_profile(self):
+        """Live readout of the display stages while profiling (see profiling.py)"""
+        self.profile_label.config(text=profiling.readout(
+            ("display", "display/resize", "display/channel", "display/photoimage", "display/canvas")))
+        self.root.after(500, self.refresh_profile)
+        
+    def update_rgb_display(self):
+        if self.current_image is None:
+            return
+            
+        self.photo = self.show_on_canvas(self.canvas, "rgb",
+                                         self.rgb_channel_var.get())
+        self.stats_panels["rgb"].show(self.stats.get("rgb"), self.rgb_channel_var.get())
+        
+    def convert_space(self, name):
+        if self.original_image is None:
+            messagebox.showwarning("Warning", "Please load an image first")
+            return
+            
+        # Convert once per loaded image
+        if name in self.converted:
+            self.update_space_display(name)
+            return
+        label = spaces.get(name).label
+        source = self.original_image
+        self.tasks.submit(convert_task, source, self.pyramids["rgb"][0], name,
+                          self.disk_cache, self.image_digest,
+                          description=f"Converting to {label}",
+                          on_done=lambda result: self.on_space_converted(name, source, *result),
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to convert to {label}: {str(e)}"))
+            
+    def on_space_converted(self, name, source, full_image, pyramid, stats):
+        if source is not self.original_image:
+            return  # Another image was loaded meanwhile
+        self.apply_conversion(name, full_image, pyramid, stats)
+        if self.session is not None and self.image_path == self.session.current:
+            self.session.add_conversion(self.image_path, name, (full_image, pyramid, stats))
+        self.update_space_display(name)
+        messagebox.showinfo("Success", f"Image converted to {spaces.get(name).label} color space")
+        
+    def apply_conversion(self, name, full_image, pyramid, stats):
+        self.converted[name] = full_image
+        self.pyramids[name] = pyramid
+        self.stats[name] = stats
+        self.inspector.set_image(name, full_image)
+            
+    def update_space_display(self, name):
+        if name not in self.converted:
+            return
+            
+        self.photos[name] = self.show_on_canvas(self.canvases[name], name,
+                                                self.channel_vars[name].get(),
+                                                self.display_modes[name].get(),
+                                                self.normalizations[name].get(),
+                                                self.colormaps[name].get())
+        self.stats_panels[name].show(self.stats.get(name), self.channel_vars[name].get())
+        self.request_mask(name)
+        
+    def save_space(self, name):
+        label = spaces.get(name).label
+        image = self.converted.get(name)
+        if image is None:
+            messagebox.showwarning("Warning", f"No {label} image to save")
+            return
+            
+        # Ask user which format to save
+        choice = messagebox.askyesno("Save Format", 
+                                   f"Save as raw {label} data (may not display correctly in other apps)?\n\n"
+                                   f"Yes = Raw {label} data\n"
+                                   "No = Converted to RGB")
+        
+        file_path = self.ask_save_path(image, choice)
+        
+        if file_path:
+            # choice: save the actual converted data, otherwise convert to RGB for saving
+            saved_as = f"raw {label} data" if choice else "converted to RGB"
+            self.tasks.submit(save_image_task, file_path, image, name, choice,
+                              description=f"Saving {label} image", scoped=False,
+                              on_done=lambda _: messagebox.showinfo("Success", f"{label} image saved successfully ({saved_as})"),
+                              on_error=lambda e: messagebox.showerror("Error", f"Failed to save {label} image: {str(e)}"))
+                
+    def apply_styling(self):
+        """Apply custom styling to the application"""
+        try:
+            # Configure styles
+            style = ttk.Style()
+            
+            # Configure button styles
+            style.configure('Large.TButton', 
+                          font=self.bold_font,
+                          padding=(10, 5))
+            
+            # Configure label styles
+            style.configure('Title.TLabel', 
+                          font=self.bold_font,
+                          foreground='#2c3e50')
+            
+            # Configure frame styles
+            style.configure('Card.TFrame', 
+                          relief='raised',
+                          borderwidth=1)
+            
+            # Configure LabelFrame styles
+            style.configure('Custom.TLabelframe', 
+                          font=self.regular_font)
+            style.configure('Custom.TLabelframe.Label', 
+                          font=self.regular_font)
+            
+            # Configure Radiobutton styles
+            style.configure('Custom.TRadiobutton', 
+                          font=self.regular_font)
+            
+        except Exception as e:
+            print(f"Warning: Could not apply custom styling: {e}")
+
+def preload_modules():
+    """Import the heavy modules in the background after the window is up"""
+    import engine
+    from PIL import ImageTk
+
+def read_image_task(file_path, disk_cache=None):
+    """Worker side of load_image: decode, build the display pyramid and statistics
+    
+    With a disk cache, a file loaded before (same content) is memory-mapped
+    from the cache instead of decoded. Returns the file's content digest
+    as well, the key of its conversions.
+    """
+    import engine
+    import stats
+    from cache import file_digest
+    
+    image = digest = None
+    if disk_cache is not None:
+        with profiling.stage("load/digest"):
+            digest = file_digest(file_path)
+        image = disk_cache.get((digest, "rgb"))
+    if image is None:
+        with profiling.stage("load/imread"):
+            image = engine.read_image(file_path)
+        if disk_cache is not None:
+            with profiling.stage("load/cache_write"):
+                disk_cache.put((digest, "rgb"), image)
+    with profiling.stage("load/pyramid"):
+        levels = engine.build_pyramid(image)
+    with profiling.stage("load/stats"):
+        image_stats = stats.image_stats(image, "rgb")
+    return image, levels, image_stats, digest
+
+def convert_task(image, rgb_levels, space, disk_cache=None, digest=None):
+    """Worker side of the convert buttons
+    
+    Returns the full-resolution conversion, its pyramid (the levels,
+    converted from the RGB pyramid, plus the channel ranges of the full
+    image for every normalization mode) and its statistics, all computed
+    once here. The full-resolution conversion is taken from / stored in
+    disk_cache under the source file's digest.
+    """
+    import engine
+    import stats
+    
+    full_image = None
+    if disk_cache is not None and digest is not None:
+        full_image = disk_cache.get((digest, space))
+    if full_image is None:
+        with profiling.stage("convert/cvtColor"):
+            full_image = engine.convert(image, "rgb", space)
+        if disk_cache is not None and digest is not None:
+            with profiling.stage("convert/cache_write"):
+                disk_cache.put((digest, space), full_image)
+    with profiling.stage("convert/pyramid"):
+        levels = engine.convert_pyramid(rgb_levels, full_image, "rgb", space)
+    with profiling.stage("convert/ranges"):
+        ranges = {how: engine.normalization_ranges(full_image, space, how)
+                  for how in engine.NORMALIZATIONS}
+    with profiling.stage("convert/stats"):
+        image_stats = stats.image_stats(full_image, space)
+    return full_image, (levels, ranges), image_stats
+
+def prefetch_task(file_path, disk_cache, targets, loaded=None, task=None):
+    """Worker side of session prefetching: load file_path (unless loaded) and convert it to targets
+    
+    Stops between the steps once the session has moved away from file_path.
+    """
+    if loaded is None:
+        loaded = read_image_task(file_path, disk_cache)
+    image, levels, _, digest = loaded
+    converted = {}
+    for space in targets:
+        if task is not None:
+            task.check_cancelled()
+        converted[space] = convert_task(image, levels, space, disk_cache, digest)
+    return loaded, converted
+
+def read_reference_task(file_path):
+    """Worker side of load_reference"""
+    import engine
+    
+    with profiling.stage("load/imread"):
+        return engine.read_image(file_path)
+
+def open_video_task(file_path):
+    """Worker side of open_video: the frame source, with its first frame decoded"""
+    import stream
+    
+    source = stream.open_source(file_path)
+    if source.count < 1:
+        source.close()
+        raise ValueError(f"No frames in {file_path}")
+    source.first_frame()
+    return source
+
+def read_frame_task(source, index, targets):
+    """Worker side of the video scrubber: decode frame index and convert it to targets"""
+    import engine
+    import stats
+    
+    with profiling.stage("load/video_frame"):
+        image = source.frame(index)
+    with profiling.stage("load/pyramid"):
+        levels = engine.build_pyramid(image)
+    with profiling.stage("load/stats"):
+        image_stats = stats.image_stats(image, "rgb")
+    converted = {space: convert_task(image, levels, space) for space in targets}
+    return (image, levels, image_stats, None), converted
+
+def export_video_task(source_path, file_path, space, channel, mode, normalization, colormap, task):
+    """Worker side of Export Video: the stream pipeline over a second reader of the video"""
+    import stream
+    
+    source = stream.open_source(source_path)
+    try:
+        sink = stream.open_sink(file_path, source.fps, source.first_frame().shape[1::-1])
+        pipeline = stream.StreamPipeline(source, sink, space, channel, mode, normalization, colormap)
+        
+        def on_frame(index):
+            if task.cancelled:
+                pipeline.cancel()
+            task.report_progress((index + 1) / pipeline.end)
+            
+        result = pipeline.run(on_frame)
+    finally:
+        source.close()
+    task.check_cancelled()
+    return stream.format_summary(result)
+
+def compare_task(reference, image, metric, max_width, max_height):
+    """Worker side of the compare button: ΔE summary of image against reference
+    
+    The summary is of the full-resolution map, the heatmap is only shown
+    and is returned downscaled to fit max_width x max_height.
+    """
+    import deltae
+    import engine
+    
+    with profiling.stage("compare/delta_e"):
+        de_map = deltae.delta_e_map(reference, image, metric)
+    return deltae.heatmap(engine.make_proxy(de_map, max_width, max_height)), deltae.summarize(de_map)
+
+def mask_task(image, thresholds):
+    """Worker side of thresholding: full-resolution mask, its display pyramid and coverage"""
+    import engine
+    import threshold
+    
+    with profiling.stage("threshold/inRange"):
+        mask = threshold.mask(image, thresholds)
+    with profiling.stage("threshold/pyramid"):
+        levels = engine.build_pyramid(mask)
+    return levels, threshold.coverage(mask)
+
+def export_mask_task(file_path, settings_path, image, thresholds):
+    """Worker side of Export Mask: the full-resolution mask and the settings next to it"""
+    import cv2
+    import threshold
+    
+    with profiling.stage("save/imwrite"):
+        if not cv2.imwrite(file_path, threshold.mask(image, thresholds)):
+            raise ValueError(f"Failed to write image: {file_path}")
+    thresholds.save(settings_path)
+
+def save_image_task(file_path, image, space, raw=False):
+    """Worker side of the save buttons"""
+    import engine
+    
+    with profiling.stage("save/imwrite"):
+        engine.save_image(file_path, image, space, raw)
+
+def main(inputs=None):
+    """Start the GUI; inputs (image files and folders) open a review session"""
+    root = tk.Tk()
+    
+    app = ImageColorSpaceConverter(root)
+    threading.Thread(target=preload_modules, name="preload", daemon=True).start()
+    if inputs:
+        # After the window is up, from_inputs lists folders through batch
+        root.after_idle(app.start_session, inputs)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Hover inspector shared by the RGB, CIELab and HSV canvases
+
+Motion events only record the cursor position. The label is updated at
+most once per frame, and only when the pixel under the cursor changes.
+Values are read from full-resolution arrays: the loaded image, and the
+Lab and HSV planes once the convert buttons have produced them. Before
+that, the hovered pixel alone is converted and cached by position, so
+hovering never converts anything full-size.
+"""
+import math
+
+HINT = "Hover over image to see RGB, Lab and HSV values"
+
+# Minimum delay between label updates, about one frame at 60 Hz
+FRAME_MS = 16
+# Single-pixel conversions kept per image before the cache starts over
+PIXEL_CACHE_SIZE = 4096
+
+
+def format_value(value):
+    """Pixel value for the color label, floats with four decimals"""
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+class HoverInspector:
+    """Pixel readout for any number of canvases showing the same image"""
+
+    def __init__(self, root, label):
+        self.root = root
+        self.label = label
+        # Full-resolution arrays per space, and per space the canvas to
+        # image transform (x0, y0, zoom) of its last render
+        self.images = {}
+        self.transforms = {}
+        # (space, x, y) -> values of pixels converted one by one
+        self.pixels = {}
+        self.cursor = None
+        self.scheduled = False
+        self.last_pixel = None
+
+    def bind(self, canvas, space):
+        canvas.bind("<Motion>", lambda e: self.on_motion(space, e.x, e.y), add="+")
+        canvas.bind("<Leave>", lambda e: self.on_leave(), add="+")
+
+    def set_image(self, space, image):
+        """Make image the source of the readout for space"""
+        self.images[space] = image
+        if space == "rgb":
+            self.pixels.clear()
+        self.last_pixel = None
+        self._schedule()
+
+    def set_transform(self, space, viewport):
+        """Remember the mapping of a render; re-read the pixel if the view moved"""
+        transform = (viewport.x0, viewport.y0, viewport.zoom)
+        if self.transforms.get(space) != transform:
+            self.transforms[space] = transform
+            if self.cursor is not None and self.cursor[0] == space:
+                self._schedule()
+
+    def clear(self):
+        """Forget the current image, e.g. before another one is loaded"""
+        self.images.clear()
+        self.transforms.clear()
+        self.pixels.clear()
+        self.last_pixel = None
+        self.label.config(text=HINT)
+
+    def on_motion(self, space, x, y):
+        self.cursor = (space, x, y)
+        self._schedule()
+
+    def on_leave(self):
+        self.cursor = None
+        self.last_pixel = None
+        self.label.config(text=HINT)
+
+    def _schedule(self):
+        if not self.scheduled:
+            self.scheduled = True
+            self.root.after(FRAME_MS, self.flush)
+
+    def flush(self):
+        self.scheduled = False
+        if self.cursor is None:
+            return
+        space, x, y = self.cursor
+        transform = self.transforms.get(space)
+        rgb = self.images.get("rgb")
+        if transform is None or rgb is None:
+            return
+
+        x0, y0, zoom = transform
+        img_x = math.floor(x0 + x / zoom)
+        img_y = math.floor(y0 + y / zoom)
+        img_height, img_width = rgb.shape[:2]
+        pixel = (img_x, img_y) if 0 <= img_x < img_width and 0 <= img_y < img_height else None
+        if pixel == self.last_pixel:
+            return
+        self.last_pixel = pixel
+        self.label.config(text=HINT if pixel is None else self.describe(img_x, img_y))
+
+    def describe(self, x, y):
+        """Readout text for image pixel (x, y)"""
+        import engine
+
+        pixel = self.images["rgb"][y:y + 1, x:x + 1]
+        r, g, b = (format_value(v) for v in pixel[0, 0].tolist())
+        r8, g8, b8 = engine.as_display(pixel)[0, 0]
+        parts = [f"Position({x}, {y})", f"RGB({r}, {g}, {b})", f"Hex: #{r8:02x}{g8:02x}{b8:02x}"]
+
+        l, a, b = self.pixel_values("lab", x, y)
+        parts.append(f"Lab({l:.1f}, {a:.1f}, {b:.1f})")
+        h, s, v = self.pixel_values("hsv", x, y)
+        parts.append(f"HSV({h:.0f}°, {s:.2f}, {v:.2f})")
+        return " | ".join(parts)
+
+    def pixel_values(self, space, x, y):
+        """Physical values of image pixel (x, y) in space, from its plane or converted alone"""
+        import engine
+
+        plane = self.images.get(space)
+        if plane is not None:
+            return engine.physical_values(plane[y, x], space)
+        key = (space, x, y)
+        values = self.pixels.get(key)
+        if values is None:
+            pixel = self.images["rgb"][y:y + 1, x:x + 1]
+            values = engine.physical_values(engine.convert(pixel, "rgb", space)[0, 0], space)
+            if len(self.pixels) >= PIXEL_CACHE_SIZE:
+                self.pixels.clear()
+            self.pixels[key] = values
+        return values
@@ -0,0 +1,230 @@
+"""Packed 3D lookup tables for 8-bit RGB conversions
+
+There are only 2**24 distinct 8-bit RGB colors, so a conversion can be
+precomputed once for all of them and applied as a gather: one table row
+per color, indexed by R | G << 8 | B << 16. Tables are built with the
+space's own conversion, so results are identical to it, and stored in the
+cache directory as .npy files that later runs memory-map (48 MiB for
+8-bit outputs, 192 MiB for float32 ones).
+
+A gather is a random read into a table far larger than the CPU caches,
+so it only beats the direct conversion when that is expensive and the
+image is spatially coherent. engine.convert therefore only considers the
+spaces of auto_spaces() (the NumPy implemented ones; cvtColor is faster
+than the gather for its 8-bit spaces) and, per process, times both paths
+on a strip of the first large image before committing to one.
+
+Process pools call prepare() in the parent, which builds the table and
+decides once, and hand the decisions to every worker (set_decisions).
+Building is also guarded by a lock file in the cache directory, so
+processes that start with a cold cache build a table only once between
+them; the others wait and memory-map it.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import spaces
+from cache import default_cache_dir
+
+TABLE_VERSION = 1
+# Images smaller than this convert directly, deciding is not worth it
+MIN_PIXELS = 1 << 20
+# Pixels (whole rows) timed per method when deciding
+CALIBRATION_PIXELS = 1 << 18
+# A build lock older than this was left by a process that died
+STALE_LOCK_SECONDS = 300
+
+_tables = {}
+_decisions = {}
+_lock = threading.Lock()
+
+
+def auto_spaces():
+    """Spaces engine.convert may route through a table"""
+    return tuple(name for name in spaces.target_names() if spaces.get(name).float_only)
+
+
+def table_path(space, directory=None):
+    return os.path.join(directory or default_cache_dir(), "lut3d", f"{space}-v{TABLE_VERSION}.npy")
+
+
+def _reference(img, space):
+    """The space's own conversion of RGB uint8 data"""
+    from_rgb = spaces.get(space).from_rgb
+    if callable(from_rgb):
+        return from_rgb(img)
+    return cv2.cvtColor(img, getattr(cv2, from_rgb))
+
+
+def build_table(space):
+    """(2**24, 3) table of every RGB color converted to space, row R | G << 8 | B << 16"""
+    colors = np.arange(1 << 24, dtype=np.uint32)
+    if sys.byteorder == "little":
+        rgb = colors.view(np.uint8).reshape(-1, 4)[:, :3]
+    else:
+        rgb = colors.view(np.uint8).reshape(-1, 4)[:, :0:-1]
+    # cvtColor wants an image, 512 x 32768 pixels holds every color once
+    return _reference(np.ascontiguousarray(rgb).reshape(512, 32768, 3), space).reshape(-1, 3)
+
+
+def _open_table(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+
+@contextlib.contextmanager
+def _build_lock(path):
+    """Exclusive lock file next to path, held by one process at a time
+
+    Without a writable cache directory the lock is skipped, each process
+    then builds its own table in memory.
+    """
+    lock = path + ".lock"
+    fd = None
+    with contextlib.suppress(OSError):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            with contextlib.suppress(OSError):
+                if time.time() - os.path.getmtime(lock) > STALE_LOCK_SECONDS:
+                    os.remove(lock)
+                    continue
+            time.sleep(0.1)
+        except OSError:
+            break
+    try:
+        yield
+    finally:
+        if fd is not None:
+            os.close(fd)
+            with contextlib.suppress(OSError):
+                os.remove(lock)
+
+
+def load_table(space, directory=None):
+    """The table of space, memory-mapped from disk, built and stored the first time"""
+    with _lock:
+        table = _tables.get(space)
+        if table is not None:
+            return table
+        path = table_path(space, directory)
+        table = _open_table(path)
+        if table is None:
+            with _build_lock(path):
+                # Another process may have built it while this one waited
+                table = _open_table(path)
+                if table is None:
+                    table = build_table(space)
+                    try:
+                        tmp = f"{path}.{os.getpid()}.tmp"
+                        with open(tmp, "wb") as f:
+                            np.save(f, table)
+                        os.replace(tmp, path)
+                    except OSError:
+                        pass  # Read-only cache directory, keep the table in memory only
+                    else:
+                        # Map the stored copy, so the built array is freed
+                        mapped = _open_table(path)
+                        if mapped is not None:
+                            table = mapped
+        _tables[space] = table
+        return table
+
+
+def color_index(img):
+    """(H,W) uint32 table row of every pixel of an (H,W,3) uint8 RGB image"""
+    if sys.byteorder == "little":
+        # RGBA viewed as one little-endian uint32 is R | G << 8 | B << 16 | A << 24
+        rgba = cv2.cvtColor(img, cv2.COLOR_RGB2RGBA)
+        index = rgba.view(np.uint32)[:, :, 0]
+        np.bitwise_and(index, 0xFFFFFF, out=index)
+        return index
+    index = img[:, :, 2].astype(np.uint32)
+    index <<= 8
+    index |= img[:, :, 1]
+    index <<= 8
+    index |= img[:, :, 0]
+    return index
+
+
+def convert(img, space, out=None):
+    """Convert (H,W,3) uint8 RGB to space by table lookup"""
+    return lookup(img, load_table(space), out)
+
+
+def lookup(img, table, out=None):
+    """Gather the table row of every pixel of (H,W,3) uint8 RGB img"""
+    if out is None:
+        out = np.empty(img.shape[:2] + (3,), table.dtype)
+    # One 3-channel row per gather: view rows and output pixels as opaque records
+    row = np.dtype((np.void, 3 * table.dtype.itemsize))
+    records = np.ascontiguousarray(table).view(row).reshape(-1)
+    np.take(records, color_index(img), out=out.view(row).reshape(img.shape[:2]), mode="clip")
+    return out
+
+
+def _best_ms(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def calibrate(img, space):
+    """Time the direct conversion and the table on a strip of img, True if the table wins"""
+    rows = max(1, min(img.shape[0], CALIBRATION_PIXELS // img.shape[1]))
+    top = (img.shape[0] - rows) // 2
+    strip = np.ascontiguousarray(img[top:top + rows])
+    load_table(space)
+    convert(strip, space)  # page in the table rows this image uses
+    return _best_ms(lambda: convert(strip, space)) < _best_ms(lambda: _reference(strip, space))
+
+
+def use_table(img, space):
+    """True if engine.convert should look img up in the table of space
+
+    Decided once per process and space, on the first large enough image.
+    """
+    if img.dtype != np.uint8 or img.shape[0] * img.shape[1] < MIN_PIXELS \
+            or space not in auto_spaces():
+        return False
+    decision = _decisions.get(space)
+    if decision is None:
+        decision = _decisions[space] = calibrate(img, space)
+    return decision
+
+
+def prepare(space_names, samples):
+    """Build or load the tables of space_names and decide on them, before starting workers
+
+    samples yields RGB images; the first 8-bit one of at least MIN_PIXELS
+    is calibrated on. Returns the decisions made so far, for
+    set_decisions() in each worker. Spaces without a suitable sample stay
+    undecided, their workers decide on their own first large image.
+    """
+    names = [name for name in space_names if name in auto_spaces()]
+    if names:
+        for img in samples:
+            if img.dtype == np.uint8 and img.shape[0] * img.shape[1] >= MIN_PIXELS:
+                for name in names:
+                    use_table(img, name)
+                break
+    return dict(_decisions)
+
+
+def set_decisions(decisions):
+    """Adopt the decisions of prepare() (in a worker process)"""
+    _decisions.update(decisions)
@@ -0,0 +1,172 @@
+"""Opt-in timing of the load/convert/display/save stages
+
+Disabled by default: stage() then returns a shared no-op context manager,
+so the instrumented hot paths cost one function call. Enable with
+
+    python main.py --profile                 # trace to colorspace_trace.json
+    python main.py --profile=run.json batch ...
+    python main.py --profile=run.prof        # cProfile stats instead
+    COLORSPACE_PROFILE=run.json python main.py
+
+While enabled, every stage keeps a rolling window of its last durations
+(percentiles for the GUI readout and the exit summary) and appends a
+Chrome trace event, so the dump opens in chrome://tracing or Perfetto.
+Only the standard library is used, the GUI imports this at startup.
+"""
+import atexit
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "COLORSPACE_PROFILE"
+DEFAULT_TRACE = "colorspace_trace.json"
+WINDOW = 256           # durations kept per stage for percentiles
+MAX_EVENTS = 200_000   # trace events kept, oldest dropped first
+
+_enabled = False
+_windows = collections.defaultdict(lambda: collections.deque(maxlen=WINDOW))
+_counts = collections.Counter()
+_events = collections.deque(maxlen=MAX_EVENTS)
+_origin = time.perf_counter()
+_NULL = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        record(self.name, self.start, end)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def stage(name):
+    """Context manager timing the enclosed block as stage name"""
+    return _Stage(name) if _enabled else _NULL
+
+
+def record(name, start, end):
+    """Add a measured interval (perf_counter seconds)"""
+    _windows[name].append((end - start) * 1000)
+    _counts[name] += 1
+    _events.append((name, start, end, threading.get_ident()))
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def summary():
+    """{stage: {count, last_ms, p50_ms, p95_ms, max_ms}} over the rolling windows"""
+    result = {}
+    for name, window in list(_windows.items()):
+        values = list(window)
+        if values:
+            result[name] = {"count": _counts[name], "last_ms": values[-1],
+                            "p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95),
+                            "max_ms": max(values)}
+    return result
+
+
+def readout(names):
+    """One line of last/p95 times of the given stages, for a status bar"""
+    stats = summary()
+    parts = [f"{name} {stats[name]['last_ms']:.1f}/{stats[name]['p95_ms']:.1f}"
+             for name in names if name in stats]
+    return "ms last/p95: " + "  ".join(parts) if parts else ""
+
+
+def trace_events():
+    """The recorded intervals as Chrome trace-event dicts"""
+    pid = os.getpid()
+    return [{"name": name, "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - _origin) * 1e6, "dur": (end - start) * 1e6}
+            for name, start, end, tid in list(_events)]
+
+
+def dump_trace(path):
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+
+
+def print_summary(file=sys.stderr):
+    stats = summary()
+    if not stats:
+        return
+    print(f"{'stage':24} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}", file=file)
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]["p50_ms"] * item[1]["count"]):
+        print(f"{name:24} {s['count']:7} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['max_ms']:9.2f}",
+              file=file)
+
+
+def enable(path=DEFAULT_TRACE):
+    """Start recording; on exit print a summary and write path
+
+    A path ending in .prof runs cProfile over the main thread and writes
+    its stats there instead of the trace. Only this process writes, not
+    worker processes forked from it.
+    """
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    owner = os.getpid()
+    profiler = None
+    if path.endswith(".prof"):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        if os.getpid() != owner:
+            return
+        print_summary()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(path)
+        else:
+            dump_trace(path)
+        print(f"Profile written to {path}", file=sys.stderr)
+
+    atexit.register(finish)
+
+
+def configure(argv):
+    """Strip --profile[=FILE] from argv and enable profiling if given
+
+    Returns the remaining arguments.
+    """
+    path = None
+    rest = []
+    for arg in argv:
+        if arg == "--profile":
+            path = DEFAULT_TRACE
+        elif arg.startswith("--profile="):
+            path = arg.split("=", 1)[1] or DEFAULT_TRACE
+        else:
+            rest.append(arg)
+    if path:
+        enable(path)
+    return rest
+
+
+# Popped so spawned worker processes do not each start their own profile
+if os.environ.get(ENV_VAR):
+    _path = os.environ.pop(ENV_VAR)
+    enable(DEFAULT_TRACE if _path == "1" else _path)
@@ -0,0 +1,460 @@
+"""Local HTTP conversion service
+
+Usage:
+    python main.py serve                          # http://127.0.0.1:8765
+    python main.py serve --port 9000 --threads 4
+
+Endpoints:
+    GET  /health                     {"status": "ok", "spaces": [...]}
+    POST /convert?to=lab[&from=rgb]  the converted planes as raw bytes
+    POST /render?space=lab&channel=a a channel view as PNG, drawn as on the GUI tabs
+
+The request body is an encoded image (PNG, JPEG, TIFF...), or a raw
+buffer when ?shape=H,W,3 (one image) or ?shape=N,H,W,3 (a batch,
+converted in one call) is given, with ?dtype=uint8|uint16|float32
+(default uint8) and channels in RGB order. Array responses carry
+X-Shape, X-Dtype, X-Space and X-Channels headers; ?format=npy wraps them
+in an .npy header instead. /render also takes mode, normalization,
+colormap and width/height to fit the view into, with the GUI's defaults.
+
+    curl --data-binary @photo.png "http://127.0.0.1:8765/convert?to=lab" -o lab.raw
+
+One asyncio loop owns the sockets. Request bodies are received straight
+into pooled, preallocated buffers (a BufferedProtocol, so no chunk
+copies), raw bodies are wrapped with np.frombuffer and conversions write
+into pooled output buffers that are sent without a copy. cvtColor and
+decoding release the GIL, so they run on a thread pool while the loop
+keeps reading. Connections are kept alive (the HTTP/1.1 default) and
+pipelined requests are answered in order.
+"""
+import argparse
+import asyncio
+import collections
+import io
+import json
+import math
+import os
+import sys
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import engine
+import profiling
+import spaces
+
+DEFAULT_PORT = 8765
+MAX_HEADER = 64 * 1024
+# Requests received ahead of the one being answered before reading pauses
+MAX_PIPELINE = 8
+IDLE_TIMEOUT = 60.0
+RAW_DTYPES = ("uint8", "uint16", "float32")
+REASONS = {100: "Continue", 200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+
+class BufferPool:
+    """Reusable bytearrays in power-of-two size classes
+
+    Up to max_bytes of released buffers are kept for reuse, so steady
+    traffic of similar images does not allocate (and page-fault) a new
+    body and output buffer per request.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.free = collections.defaultdict(list)
+        self.idle_bytes = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, nbytes):
+        size = 1 << max(12, (nbytes - 1).bit_length())
+        with self.lock:
+            if self.free[size]:
+                self.idle_bytes -= size
+                return self.free[size].pop()
+        return bytearray(size)
+
+    def release(self, buffer):
+        with self.lock:
+            if self.idle_bytes + len(buffer) <= self.max_bytes:
+                self.free[len(buffer)].append(buffer)
+                self.idle_bytes += len(buffer)
+
+
+class Request:
+    """A parsed request head; body is a memoryview into a pooled buffer"""
+
+    def __init__(self, method, target, version, headers):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        url = urllib.parse.urlsplit(target)
+        self.path = url.path
+        self.params = dict(urllib.parse.parse_qsl(url.query))
+        self.body = memoryview(b"")
+
+    @classmethod
+    def parse(cls, head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise ValueError(f"Malformed request line {lines[0]!r}") from None
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise ValueError(f"Malformed header line {line!r}")
+            headers[name.strip().lower()] = value.strip()
+        return cls(method, target, version, headers)
+
+    @property
+    def content_length(self):
+        try:
+            return int(self.headers.get("content-length", 0))
+        except ValueError:
+            raise ValueError("Invalid Content-Length") from None
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class Response:
+    """Status, headers and a bytes-like payload; buffer goes back to the pool once sent
+
+    prefix is sent ahead of payload (an .npy header), so the payload is
+    never copied to prepend it.
+    """
+
+    def __init__(self, status=200, payload=b"", content_type="application/octet-stream",
+                 headers=None, buffer=None, prefix=b""):
+        self.status = status
+        self.payload = payload
+        self.prefix = prefix
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.buffer = buffer
+
+    @classmethod
+    def json(cls, data, status=200):
+        return cls(status, json.dumps(data).encode(), "application/json")
+
+    @classmethod
+    def error(cls, status, message):
+        return cls.json({"error": message}, status)
+
+    def head(self, keep_alive):
+        lines = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}",
+                 f"Content-Type: {self.content_type}",
+                 f"Content-Length: {len(self.prefix) + len(self.payload)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _choice(params, name, choices, default):
+    value = params.get(name, default)
+    if value not in choices:
+        raise ValueError(f"Unknown {name} {value!r}, choose from {', '.join(choices)}")
+    return value
+
+
+class ConversionService:
+    """Request handlers; the image work runs on a thread pool"""
+
+    def __init__(self, threads=None, max_body=1024 ** 3, pool_bytes=256 * 1024 ** 2):
+        self.executor = ThreadPoolExecutor(max_workers=threads or os.cpu_count() or 1,
+                                           thread_name_prefix="convert")
+        self.buffers = BufferPool(pool_bytes)
+        self.max_body = max_body
+        self.routes = {"/health": ("GET", None), "/convert": ("POST", self.convert),
+                       "/render": ("POST", self.render)}
+
+    async def handle(self, request):
+        route = self.routes.get(request.path)
+        if route is None:
+            return Response.error(404, f"No endpoint {request.path}")
+        method, handler = route
+        if request.method != method:
+            return Response.error(405, f"{request.path} takes {method}")
+        if handler is None:
+            return Response.json({"status": "ok", "spaces": list(spaces.SPACES)})
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, handler, request)
+        except ValueError as e:
+            return Response.error(400, str(e))
+        except Exception as e:
+            return Response.error(500, f"{type(e).__name__}: {e}")
+
+    def decode(self, request):
+        """The request image: a view of a raw body, or the decoded image"""
+        params = request.params
+        if "shape" not in params:
+            with profiling.stage("serve/decode"):
+                return engine.decode_image(request.body)
+        try:
+            shape = tuple(int(v) for v in params["shape"].split(","))
+        except ValueError:
+            raise ValueError(f"Invalid shape {params['shape']!r}") from None
+        if len(shape) not in (3, 4) or shape[-1] != 3 or min(shape) <= 0:
+            raise ValueError(f"Expected shape H,W,3 or N,H,W,3, got {params['shape']}")
+        dtype = np.dtype(_choice(params, "dtype", RAW_DTYPES, "uint8"))
+        expected = math.prod(shape) * dtype.itemsize
+        if len(request.body) != expected:
+            raise ValueError(f"Body has {len(request.body)} bytes, shape {params['shape']} "
+                             f"of {dtype.name} needs {expected}")
+        return np.frombuffer(request.body, dtype).reshape(shape)
+
+    def array_response(self, array, space, params, buffer=None):
+        headers = {"X-Shape": ",".join(map(str, array.shape)), "X-Dtype": array.dtype.name,
+                   "X-Space": space, "X-Channels": ",".join(spaces.get(space).channels)}
+        prefix = b""
+        if _choice(params, "format", ("raw", "npy"), "raw") == "npy":
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(array))
+            prefix = header.getvalue()
+        return Response(200, memoryview(array).cast("B"), headers=headers, buffer=buffer, prefix=prefix)
+
+    def convert(self, request):
+        """POST /convert: src -> dst of one image or an (N,H,W,3) batch, into a pooled buffer"""
+        params = request.params
+        src = spaces.get(params.get("from", "rgb")).name
+        if "to" not in params:
+            raise ValueError("Missing target space, e.g. ?to=lab")
+        dst = spaces.get(params["to"]).name
+        image = self.decode(request)
+        dtype = engine.converted_dtype(image.dtype, src, dst)
+        # A batch is converted as one tall image, as engine.convert_batch does
+        flat = image.reshape(-1, *image.shape[-2:])
+        buffer = self.buffers.acquire(flat.size * dtype.itemsize)
+        out = np.frombuffer(buffer, dtype, count=flat.size).reshape(flat.shape)
+        with profiling.stage("serve/convert"):
+            engine.convert(flat, src, dst, out=out)
+        return self.array_response(out.reshape(image.shape), dst, params, buffer)
+
+    def render(self, request):
+        """POST /render: one channel view, as update_space_display draws it"""
+        params = request.params
+        space = spaces.get(params.get("space", "lab")).name
+        channel = params.get("channel", "all")
+        mode = _choice(params, "mode", engine.MODES, "rgb")
+        normalization = _choice(params, "normalization", engine.NORMALIZATIONS, "image")
+        colormap = _choice(params, "colormap", engine.COLORMAPS, "gray")
+        image = self.decode(request)
+        if image.ndim != 3:
+            raise ValueError("/render takes one image, not a batch")
+        with profiling.stage("serve/convert"):
+            full_image = engine.convert(image, "rgb", space)
+        ranges = None
+        if space not in ("rgb", "bgr"):
+            ranges = engine.normalization_ranges(full_image, space, normalization)
+        height, width = image.shape[:2]
+        size = (width, height)
+        if "width" in params or "height" in params:
+            size = engine.fit_size(width, height, int(params.get("width", width)),
+                                   int(params.get("height", height)))
+        view = engine.render_channel(full_image, space, channel, mode, size, ranges, colormap=colormap)
+        if params.get("format") == "raw":
+            return self.array_response(view, "rgb", params)
+        with profiling.stage("serve/encode"):
+            ok, png = cv2.imencode(".png", cv2.cvtColor(view, cv2.COLOR_RGB2BGR))
+        if not ok:
+            raise ValueError("Failed to encode PNG")
+        return Response(200, memoryview(png).cast("B"), "image/png")
+
+
+class ConversionProtocol(asyncio.BufferedProtocol):
+    """One client connection: HTTP/1.1 parsing into pooled buffers, answers in order"""
+
+    def __init__(self, service):
+        self.service = service
+        self.loop = asyncio.get_running_loop()
+        self.head = bytearray(MAX_HEADER)
+        self.head_len = 0
+        # Request whose body is being received, into body[:body_len] of body_size
+        self.request = None
+        self.body = None
+        self.body_len = self.body_size = 0
+        self.queue = collections.deque()
+        self.task = None
+        self.transport = None
+        self.paused = False
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.idle_timer = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.reset_idle_timer()
+
+    def connection_lost(self, exc):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        self.writable.set()
+        if self.task is not None:
+            self.task.cancel()
+        if self.body is not None and self.body_size:
+            self.service.buffers.release(self.body)
+
+    def pause_writing(self):
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+    def reset_idle_timer(self):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        self.idle_timer = self.loop.call_later(IDLE_TIMEOUT, self.transport.close)
+
+    def get_buffer(self, sizehint):
+        if self.request is not None:
+            return memoryview(self.body)[self.body_len:self.body_size]
+        return memoryview(self.head)[self.head_len:]
+
+    def buffer_updated(self, nbytes):
+        self.reset_idle_timer()
+        if self.request is not None:
+            self.body_len += nbytes
+            if self.body_len == self.body_size:
+                self.finish_request()
+            return
+        self.head_len += nbytes
+        self.parse_heads()
+
+    def parse_heads(self):
+        """Parse every complete request head in the head buffer
+
+        Body bytes that arrived with the head are moved to the body
+        buffer; the rest of the body is then received into it directly.
+        """
+        while self.request is None and not self.transport.is_closing():
+            end = self.head.find(b"\r\n\r\n", 0, self.head_len)
+            if end < 0:
+                if self.head_len == len(self.head):
+                    self.fail(431, "Request head too large")
+                return
+            try:
+                request = Request.parse(bytes(self.head[:end]))
+                size = request.content_length
+            except ValueError as e:
+                self.fail(400, str(e))
+                return
+            if "chunked" in request.headers.get("transfer-encoding", ""):
+                self.fail(411, "Chunked bodies are not supported, send Content-Length")
+                return
+            if size > self.service.max_body:
+                self.fail(413, f"Body larger than {self.service.max_body} bytes")
+                return
+            if request.headers.get("expect", "").lower() == "100-continue":
+                self.transport.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            start = end + 4
+            body = self.service.buffers.acquire(size) if size else bytearray()
+            available = min(size, self.head_len - start)
+            body[:available] = self.head[start:start + available]
+            rest = self.head_len - start - available
+            self.head[:rest] = self.head[start + available:self.head_len]
+            self.head_len = rest
+            self.request, self.body, self.body_len, self.body_size = request, body, available, size
+            if available == size:
+                self.finish_request()
+
+    def finish_request(self):
+        request, body = self.request, self.body
+        request.body = memoryview(body)[:self.body_size]
+        self.queue.append((request, body))
+        self.request, self.body, self.body_len, self.body_size = None, None, 0, 0
+        if len(self.queue) >= MAX_PIPELINE and not self.paused:
+            self.paused = True
+            self.transport.pause_reading()
+        if self.task is None:
+            self.task = self.loop.create_task(self.process())
+
+    def fail(self, status, message):
+        """Answer a request that cannot be read and close the connection"""
+        response = Response.error(status, message)
+        self.transport.write(response.head(False))
+        self.transport.write(response.payload)
+        self.transport.close()
+
+    async def process(self):
+        try:
+            while self.queue:
+                request, body = self.queue.popleft()
+                try:
+                    response = await self.service.handle(request)
+                finally:
+                    # Handlers keep no views of the body once they returned
+                    request.body = None
+                    if len(body):
+                        self.service.buffers.release(body)
+                await self.send(response, request.keep_alive)
+                if not request.keep_alive:
+                    self.transport.close()
+                    return
+                if self.paused and len(self.queue) < MAX_PIPELINE:
+                    self.paused = False
+                    self.transport.resume_reading()
+        finally:
+            self.task = None
+
+    async def send(self, response, keep_alive):
+        await self.writable.wait()
+        if self.transport.is_closing():
+            return
+        self.transport.write(response.head(keep_alive) + response.prefix)
+        self.transport.write(response.payload)
+        # Unsent data is copied by the transport on Python <= 3.11 but only
+        # referenced on newer versions, so the buffer is reused only if it all went out
+        if response.buffer is not None and not self.transport.get_write_buffer_size():
+            self.service.buffers.release(response.buffer)
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, threads=None, max_body=1024 ** 3):
+    service = ConversionService(threads, max_body)
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: ConversionProtocol(service), host, port,
+                                      reuse_address=True)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Listening on http://{host}:{port}", file=sys.stderr, flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py serve",
+                                     description="Local HTTP service for color space conversions")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Port, 0 picks a free one (default: {DEFAULT_PORT})")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Conversion threads (default: CPU count)")
+    parser.add_argument("--max-body", type=int, default=1024, metavar="MIB",
+                        help="Largest accepted request body in MiB (default: 1024)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.threads, args.max_body * 1024 ** 2))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
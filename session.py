@@ -0,0 +1,118 @@
+"""Review sessions: step through a folder or file list with prefetching
+
+The session only keeps state; the GUI loads and converts on its task
+executors. Loaded images (with their pyramids, statistics and any
+conversions) are kept in a byte-bounded LRU, so stepping back and forth
+within the recent images needs no decode, and the next few files are
+loaded ahead of time. Imported by the GUI at startup, so NumPy/cv2 are
+not imported here.
+"""
+import os
+
+from cache import DisplayCache
+
+# Files loaded ahead of the current one, and behind it
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+
+
+class SessionEntry:
+    """One loaded file: the read_image_task result plus convert_task results by space"""
+
+    def __init__(self, loaded):
+        self.loaded = loaded
+        self.converted = {}
+
+    @property
+    def nbytes(self):
+        _, levels, _, _ = self.loaded
+        total = sum(level.nbytes for level in levels)
+        for _, (converted_levels, _), _ in self.converted.values():
+            total += sum(level.nbytes for level in converted_levels)
+        return total
+
+
+class ImageSession:
+    """Ordered list of files with a current position and an LRU of loaded entries"""
+
+    def __init__(self, paths, index=0, max_bytes=1024 ** 3, ahead=PREFETCH_AHEAD,
+                 behind=PREFETCH_BEHIND):
+        if not paths:
+            raise ValueError("No images to review")
+        self.paths = list(paths)
+        self.index = max(0, min(index, len(self.paths) - 1))
+        self.ahead = ahead
+        self.behind = behind
+        # The display cache's LRU works for any value with a known size
+        self.entries = DisplayCache(max_bytes)
+        # Paths being prefetched and their task handles, so they are not
+        # requested twice and can be cancelled once out of the window
+        self.inflight = {}
+
+    @classmethod
+    def from_inputs(cls, inputs, **kwargs):
+        """Session over image files and the images directly inside directories"""
+        import batch
+
+        paths = []
+        for item in inputs:
+            paths.extend(batch.find_images(item) if os.path.isdir(item) else [item])
+        return cls(paths, **kwargs)
+
+    @property
+    def current(self):
+        return self.paths[self.index]
+
+    def title(self):
+        return f"{self.index + 1}/{len(self.paths)} {os.path.basename(self.current)}"
+
+    def move(self, step):
+        """Step through the list; False at either end"""
+        index = self.index + step
+        if not 0 <= index < len(self.paths):
+            return False
+        self.index = index
+        return True
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def store(self, path, entry):
+        self.entries.put(path, entry, entry.nbytes)
+
+    def add_conversion(self, path, space, result):
+        """Remember a conversion done while path was shown"""
+        entry = self.entries.get(path)
+        if entry is not None:
+            entry.converted[space] = result
+            self.store(path, entry)
+
+    def neighbours(self):
+        """Paths of the files around the current one to load ahead, nearest first"""
+        indices = [self.index + i for i in range(1, self.ahead + 1)]
+        indices += [self.index - i for i in range(1, self.behind + 1)]
+        return [self.paths[i] for i in indices if 0 <= i < len(self.paths)]
+
+    def to_prefetch(self, targets=()):
+        """Neighbours of the current file to load ahead, nearest first
+
+        Returns (path, entry or None, spaces still to convert) for neighbours
+        not being loaded already that are not in memory or lack a conversion
+        to one of targets.
+        """
+        work = []
+        for path in self.neighbours():
+            if path in self.inflight:
+                continue
+            entry = self.entries.get(path)
+            missing = tuple(space for space in targets
+                            if entry is None or space not in entry.converted)
+            if entry is None or missing:
+                work.append((path, entry, missing))
+        return work
+
+    def stale_prefetches(self):
+        """Forget the prefetches of files no longer current or around it, returns their handles"""
+        window = set(self.neighbours())
+        window.add(self.current)
+        return [self.inflight.pop(path) for path in list(self.inflight) if path not in window]
@@ -0,0 +1,199 @@
+"""Registry of the color spaces the converter understands
+
+Each ColorSpace declares its channels, how to get there from RGB and back
+(a cvtColor code name, or a NumPy function for spaces OpenCV lacks), the
+nominal value ranges of its 8-bit and float encodings and which channels
+are shown as they are rather than stretched. The engine, the GUI tabs and
+the batch/tiled commands are all generated from SPACES, so a new space only
+needs a register() call.
+
+cv2 and NumPy are imported where used: the GUI builds its tabs from this
+module before the heavy modules are loaded.
+"""
+
+
+class ColorSpace:
+    """Declaration of one color space
+
+    from_rgb/to_rgb are either the name of a cv2 COLOR_* code or a function
+    f(img, out=None) taking (H,W,3) uint8 or float32 data and returning
+    float32. from_bgr/to_bgr are optional cv2 code names for converting
+    straight from OpenCV's channel order. ranges maps "uint8"/"float32" to
+    ((lo, hi), ...) per channel. display_channels are shown as stored in
+    the RGB view; every other channel is stretched (see engine.NORMALIZATIONS).
+    colormaps names the false-color map "auto" uses per channel.
+    """
+
+    def __init__(self, name, label, channels, from_rgb=None, to_rgb=None, from_bgr=None,
+                 to_bgr=None, ranges=None, display_channels=(), colormaps=None):
+        self.name = name
+        self.label = label
+        self.channels = tuple(channels)
+        self.from_rgb = from_rgb
+        self.to_rgb = to_rgb
+        self.from_bgr = from_bgr
+        self.to_bgr = to_bgr
+        self.ranges = ranges or {}
+        self.display_channels = tuple(display_channels)
+        self.colormaps = colormaps or {}
+
+    def __repr__(self):
+        return f"ColorSpace({self.name!r})"
+
+    @property
+    def float_only(self):
+        """True when there is no 8-bit encoding (NumPy implemented spaces)"""
+        return callable(self.from_rgb)
+
+    def channel_index(self, ch):
+        try:
+            return self.channels.index(ch)
+        except ValueError:
+            raise ValueError(f"Unknown channel {ch!r} for color space {self.name!r}") from None
+
+    def channel_range(self, ch, dtype="float32"):
+        """Nominal (lo, hi) of channel ch for data of dtype"""
+        ranges = self.ranges.get(str(dtype)) or self.ranges.get("float32")
+        return ranges[self.channel_index(ch)]
+
+
+# Registered spaces in tab order; "rgb" and "bgr" are the image spaces
+SPACES = {}
+
+
+def register(space):
+    """Add space to the registry, replacing one of the same name"""
+    SPACES[space.name] = space
+    return space
+
+
+def get(name):
+    try:
+        return SPACES[name]
+    except KeyError:
+        raise ValueError(f"Unknown color space {name!r}") from None
+
+
+def target_names():
+    """Names of the spaces images can be converted to, in registry order"""
+    return tuple(name for name in SPACES if name not in ("rgb", "bgr"))
+
+
+# OKLab (Björn Ottosson, 2020), not available in OpenCV
+
+_OKLAB_M1 = ((0.4122214708, 0.5363325363, 0.0514459929),
+             (0.2119034982, 0.6806995451, 0.1073969566),
+             (0.0883024619, 0.2817188376, 0.6299787005))
+_OKLAB_M2 = ((0.2104542553, 0.7936177850, -0.0040720468),
+             (1.9779984951, -2.4285922050, 0.4505937099),
+             (0.0259040371, 0.7827717662, -0.8086757660))
+_OKLAB_M2_INV = ((1.0, 0.3963377774, 0.2158037573),
+                 (1.0, -0.1055613458, -0.0638541728),
+                 (1.0, -0.0894841775, -1.2914855480))
+_OKLAB_M1_INV = ((4.0767416621, -3.3077115913, 0.2309699292),
+                 (-1.2684380046, 2.6097574011, -0.3413193965),
+                 (-0.0041960863, -0.7034186147, 1.7076147010))
+
+_srgb_lut = None
+
+
+def _transform(img, matrix, out=None):
+    """Per-pixel 3x3 matrix product of an (H,W,3) float32 image"""
+    import numpy as np
+
+    m = np.asarray(matrix, np.float32).T
+    flat = img.reshape(-1, 3)
+    if out is None:
+        return (flat @ m).reshape(img.shape)
+    np.matmul(flat, m, out=out.reshape(-1, 3))
+    return out
+
+
+def srgb_to_linear(img):
+    """sRGB gamma decode; uint8 data goes through a 256 entry table"""
+    import numpy as np
+
+    global _srgb_lut
+    if img.dtype == np.uint8:
+        if _srgb_lut is None:
+            _srgb_lut = srgb_to_linear(np.arange(256, dtype=np.float32) / np.float32(255))
+        return _srgb_lut[img]
+    img = img.astype(np.float32, copy=False)
+    # Whole-array power in one buffer, then the linear segment on top; cheaper
+    # than gathering the high values through a mask
+    linear = img + np.float32(0.055)
+    linear *= np.float32(1 / 1.055)
+    np.power(linear, np.float32(2.4), out=linear)
+    np.multiply(img, np.float32(1 / 12.92), out=linear, where=img <= 0.04045)
+    return linear
+
+
+def linear_to_srgb(img):
+    """sRGB gamma encode of float32 data, in place; negatives clip to 0"""
+    import numpy as np
+
+    np.maximum(img, 0, out=img)
+    low = img <= 0.0031308
+    low_values = img[low] * np.float32(12.92)
+    np.power(img, np.float32(1 / 2.4), out=img)
+    img *= np.float32(1.055)
+    img -= np.float32(0.055)
+    img[low] = low_values
+    return img
+
+
+def rgb_to_oklab(img, out=None):
+    """RGB (uint8, or float32 0-1) to float32 OKLab, L 0-1 and a/b about +-0.4"""
+    import numpy as np
+
+    lms = _transform(srgb_to_linear(img), _OKLAB_M1)
+    np.cbrt(lms, out=lms)
+    return _transform(lms, _OKLAB_M2, out)
+
+
+def oklab_to_rgb(img, out=None):
+    """float32 OKLab to float32 RGB 0-1"""
+    import numpy as np
+
+    lms = _transform(img.astype(np.float32, copy=False), _OKLAB_M2_INV)
+    np.power(lms, 3, out=lms)
+    return linear_to_srgb(_transform(lms, _OKLAB_M1_INV, out))
+
+
+_BYTE = ((0, 255),) * 3
+
+register(ColorSpace("rgb", "RGB", ("R", "G", "B"),
+                    ranges={"uint8": _BYTE, "float32": ((0, 1),) * 3},
+                    display_channels=("R", "G", "B")))
+register(ColorSpace("bgr", "BGR", ("B", "G", "R"),
+                    ranges={"uint8": _BYTE, "float32": ((0, 1),) * 3},
+                    display_channels=("B", "G", "R")))
+register(ColorSpace("lab", "CIELab", ("L", "a", "b"),
+                    "COLOR_RGB2LAB", "COLOR_LAB2RGB", "COLOR_BGR2LAB", "COLOR_LAB2BGR",
+                    ranges={"uint8": _BYTE, "float32": ((0, 100), (-127, 127), (-127, 127))},
+                    display_channels=("L",), colormaps={"a": "green-red", "b": "blue-yellow"}))
+register(ColorSpace("hsv", "HSV", ("H", "S", "V"),
+                    "COLOR_RGB2HSV", "COLOR_HSV2RGB", "COLOR_BGR2HSV", "COLOR_HSV2BGR",
+                    ranges={"uint8": ((0, 179), (0, 255), (0, 255)),
+                            "float32": ((0, 360), (0, 1), (0, 1))},
+                    colormaps={"H": "hue"}))
+register(ColorSpace("xyz", "XYZ", ("X", "Y", "Z"),
+                    "COLOR_RGB2XYZ", "COLOR_XYZ2RGB", "COLOR_BGR2XYZ", "COLOR_XYZ2BGR",
+                    ranges={"uint8": _BYTE, "float32": ((0, 0.9505), (0, 1), (0, 1.089))},
+                    display_channels=("Y",)))
+register(ColorSpace("ycrcb", "YCrCb", ("Y", "Cr", "Cb"),
+                    "COLOR_RGB2YCrCb", "COLOR_YCrCb2RGB", "COLOR_BGR2YCrCb", "COLOR_YCrCb2BGR",
+                    ranges={"uint8": _BYTE, "float32": ((0, 1),) * 3},
+                    display_channels=("Y",), colormaps={"Cr": "green-red", "Cb": "blue-yellow"}))
+register(ColorSpace("luv", "CIELuv", ("L", "u", "v"),
+                    "COLOR_RGB2Luv", "COLOR_Luv2RGB", "COLOR_BGR2Luv", "COLOR_Luv2BGR",
+                    ranges={"uint8": _BYTE, "float32": ((0, 100), (-134, 220), (-140, 122))},
+                    display_channels=("L",), colormaps={"u": "green-red", "v": "blue-yellow"}))
+register(ColorSpace("hls", "HLS", ("H", "L", "S"),
+                    "COLOR_RGB2HLS", "COLOR_HLS2RGB", "COLOR_BGR2HLS", "COLOR_HLS2BGR",
+                    ranges={"uint8": ((0, 179), (0, 255), (0, 255)),
+                            "float32": ((0, 360), (0, 1), (0, 1))},
+                    colormaps={"H": "hue"}))
+register(ColorSpace("oklab", "OKLab", ("L", "a", "b"), rgb_to_oklab, oklab_to_rgb,
+                    ranges={"float32": ((0, 1), (-0.4, 0.4), (-0.4, 0.4))},
+                    display_channels=("L",), colormaps={"a": "green-red", "b": "blue-yellow"}))
@@ -0,0 +1,217 @@
+"""Per-channel histograms and statistics, headless and JSON friendly
+
+Statistics are accumulated from 256-bin histograms plus running sums, so
+they can be built incrementally (strip by strip, or over a whole batch of
+images) and merged without keeping any pixels. For 8-bit data everything,
+percentiles included, is exact; for 16-bit and float data the bins span
+the nominal range of the encoding and percentiles have bin resolution.
+
+Usage:
+    python main.py stats --space rgb,lab,hsv photos/ --json stats.json
+"""
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+import engine
+import spaces
+
+BINS = 256
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def bin_range(space, ch, dtype):
+    """(lo, hi) covered by the histogram bins of a channel"""
+    dtype = np.dtype(dtype)
+    if dtype == np.uint8:
+        return 0.0, 256.0
+    if dtype == np.uint16:
+        return 0.0, 65536.0
+    lo, hi = spaces.get(space).channel_range(ch, "float32")
+    return float(lo), float(hi)
+
+
+class ChannelStats:
+    """Incremental statistics of the channels of images in one space"""
+
+    def __init__(self, space, dtype):
+        self.space = space
+        self.dtype = np.dtype(dtype)
+        self.channels = spaces.get(space).channels
+        self.ranges = [bin_range(space, ch, self.dtype) for ch in self.channels]
+        self.histograms = np.zeros((len(self.channels), BINS), np.float64)
+        self.count = 0
+        self.sums = np.zeros(len(self.channels), np.float64)
+        self.squares = np.zeros(len(self.channels), np.float64)
+        self.minimum = np.full(len(self.channels), np.inf)
+        self.maximum = np.full(len(self.channels), -np.inf)
+
+    def update(self, img):
+        """Add the pixels of an (H,W,3) image or strip"""
+        if img.dtype != self.dtype:
+            raise ValueError(f"Expected {self.dtype} data, got {img.dtype}")
+        for i, (lo, hi) in enumerate(self.ranges):
+            hist = cv2.calcHist([img], [i], None, [BINS], [lo, hi]).ravel()
+            self.histograms[i] += hist
+            if self.dtype == np.uint8:
+                # Exact from the histogram, no second pass over the pixels
+                values = np.arange(BINS, dtype=np.float64)
+                self.sums[i] += hist @ values
+                self.squares[i] += hist @ (values * values)
+                nonzero = np.flatnonzero(hist)
+                if nonzero.size:
+                    self.minimum[i] = min(self.minimum[i], nonzero[0])
+                    self.maximum[i] = max(self.maximum[i], nonzero[-1])
+            else:
+                plane = img[:, :, i]
+                lo_value, hi_value, _, _ = cv2.minMaxLoc(plane)
+                mean, std = cv2.meanStdDev(plane)
+                n = plane.size
+                self.sums[i] += mean[0, 0] * n
+                self.squares[i] += (std[0, 0] ** 2 + mean[0, 0] ** 2) * n
+                self.minimum[i] = min(self.minimum[i], lo_value)
+                self.maximum[i] = max(self.maximum[i], hi_value)
+        self.count += img.shape[0] * img.shape[1]
+        return self
+
+    def merge(self, other):
+        """Fold in the statistics of another accumulator of the same space and depth"""
+        if (other.space, other.dtype) != (self.space, self.dtype):
+            raise ValueError("Can only merge statistics of the same space and depth")
+        self.histograms += other.histograms
+        self.count += other.count
+        self.sums += other.sums
+        self.squares += other.squares
+        np.minimum(self.minimum, other.minimum, out=self.minimum)
+        np.maximum(self.maximum, other.maximum, out=self.maximum)
+        return self
+
+    def _percentile(self, index, q):
+        hist = self.histograms[index]
+        total = hist.sum()
+        if total == 0:
+            return None
+        lo, hi = self.ranges[index]
+        width = (hi - lo) / BINS
+        cdf = np.cumsum(hist)
+        b = min(BINS - 1, int(np.searchsorted(cdf, total * q / 100)))
+        if self.dtype == np.uint8:
+            return float(b)
+        # Linear within the bin
+        before = cdf[b - 1] if b else 0.0
+        fraction = (total * q / 100 - before) / hist[b] if hist[b] else 0.0
+        return lo + (b + fraction) * width
+
+    def result(self, histogram=True):
+        """Plain dict with min/max/mean/std/percentiles (and histogram) per channel"""
+        channels = {}
+        for i, ch in enumerate(self.channels):
+            n = self.count
+            mean = self.sums[i] / n if n else None
+            var = max(0.0, self.squares[i] / n - mean * mean) if n else None
+            entry = {
+                "min": float(self.minimum[i]) if n else None,
+                "max": float(self.maximum[i]) if n else None,
+                "mean": float(mean) if n else None,
+                "std": float(var ** 0.5) if n else None,
+                "percentiles": {str(q): self._percentile(i, q) for q in PERCENTILES},
+            }
+            if histogram:
+                entry["bin_range"] = list(self.ranges[i])
+                entry["histogram"] = self.histograms[i].astype(np.int64).tolist()
+            channels[ch] = entry
+        return {"space": self.space, "dtype": self.dtype.name, "pixels": self.count,
+                "channels": channels}
+
+
+def image_stats(img, space, histogram=True):
+    """Statistics dict of one image already in space"""
+    return ChannelStats(space, img.dtype).update(img).result(histogram)
+
+
+def file_stats(path, space_names, histogram=True):
+    """Load path and return {space: stats} plus the accumulators for aggregation"""
+    image = engine.read_image(path)
+    accumulators = {}
+    for name in space_names:
+        converted = engine.convert(image, "rgb", name)
+        accumulators[name] = ChannelStats(name, converted.dtype).update(converted)
+    return {name: acc.result(histogram) for name, acc in accumulators.items()}, accumulators
+
+
+def collect_paths(inputs):
+    import batch
+
+    paths = []
+    for item in inputs:
+        paths.extend(batch.find_images(item) if os.path.isdir(item) else [item])
+    return paths
+
+
+def run_stats(inputs, space_names=("rgb", "lab", "hsv"), histogram=True):
+    """Statistics of every image plus the aggregate over all of them
+
+    Images of different bit depth are aggregated separately per depth.
+    """
+    images = []
+    failures = []
+    totals = {}
+    for path in collect_paths(inputs):
+        try:
+            result, accumulators = file_stats(path, space_names, histogram)
+        except (OSError, ValueError) as e:
+            failures.append({"path": path, "error": str(e)})
+            continue
+        images.append({"path": path, "spaces": result})
+        for name, acc in accumulators.items():
+            key = (name, acc.dtype.name)
+            if key in totals:
+                totals[key].merge(acc)
+            else:
+                totals[key] = acc
+    aggregate = {}
+    for (name, dtype), acc in totals.items():
+        aggregate.setdefault(name, {})[dtype] = acc.result(histogram)
+    return {"images": images, "aggregate": aggregate, "failures": failures}
+
+
+def parse_spaces(value):
+    names = [s.strip().lower() for s in value.split(",") if s.strip()]
+    unknown = [s for s in names if s not in spaces.SPACES or s == "bgr"]
+    if not names or unknown:
+        raise argparse.ArgumentTypeError(f"unknown color space(s): {', '.join(unknown) or value!r}")
+    return names
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py stats",
+                                     description="Per-channel histograms and statistics as JSON")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories")
+    parser.add_argument("--space", dest="spaces", type=parse_spaces, default=["rgb", "lab", "hsv"],
+                        help="Comma separated spaces (default: rgb,lab,hsv)")
+    parser.add_argument("--json", metavar="FILE", help="Write to FILE instead of stdout")
+    parser.add_argument("--no-histogram", dest="histogram", action="store_false",
+                        help="Leave out the 256-bin histograms")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_stats(args.inputs, args.spaces, args.histogram)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    for failure in report["failures"]:
+        print(f"Failed: {failure['path']}: {failure['error']}", file=sys.stderr)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Histogram and statistics side panel for the image tabs
+
+The canvas items (one histogram line per channel, axis, labels) are created
+once and only their coordinates and text change when the channel or image
+changes, so a channel switch costs a few coords() calls instead of a new
+figure. Statistics dicts come from stats.image_stats, computed once per
+load or conversion on a worker thread.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+WIDTH = 260
+HEIGHT = 120
+PAD = 4
+
+# Line colors for the channels of "all", in channel order
+COLORS = ("#d62728", "#2ca02c", "#1f77b4")
+
+
+class StatsPanel:
+    def __init__(self, parent, font):
+        self.frame = ttk.LabelFrame(parent, text="Statistics", style='Custom.TLabelframe')
+        self.canvas = tk.Canvas(self.frame, width=WIDTH, height=HEIGHT, bg="white",
+                                highlightthickness=0)
+        self.canvas.pack(padx=5, pady=5)
+        self.lines = [self.canvas.create_line(0, 0, 0, 0, fill=color, width=1, state="hidden")
+                      for color in COLORS]
+        self.canvas.create_line(PAD, HEIGHT - PAD, WIDTH - PAD, HEIGHT - PAD, fill="gray")
+        self.range_labels = (self.canvas.create_text(PAD, HEIGHT - PAD - 2, anchor=tk.SW,
+                                                     text="", font=("Arial", 8)),
+                             self.canvas.create_text(WIDTH - PAD, HEIGHT - PAD - 2, anchor=tk.SE,
+                                                     text="", font=("Arial", 8)))
+        self.text = ttk.Label(self.frame, text="No statistics yet", font=font, justify=tk.LEFT)
+        self.text.pack(padx=5, pady=(0, 5), anchor=tk.W)
+        self.shown = None
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def show(self, stats, channel):
+        """Display stats (see stats.image_stats) for channel, or every channel for "all" """
+        if stats is None:
+            for line in self.lines:
+                self.canvas.itemconfigure(line, state="hidden")
+            self.text.config(text="No statistics yet")
+            self.shown = None
+            return
+        if self.shown == (id(stats), channel):
+            return
+        self.shown = (id(stats), channel)
+
+        names = list(stats["channels"])
+        selected = names if channel == "all" else [channel]
+        histograms = [stats["channels"][name]["histogram"] for name in selected]
+        # Common scale, ignoring the largest bin so one spike (e.g. a black
+        # border) does not flatten the rest
+        peak = max(sorted(h)[-2] if len(h) > 1 else h[0] for h in histograms) or 1
+        step = (WIDTH - 2 * PAD) / (len(histograms[0]) - 1)
+        scale = (HEIGHT - 2 * PAD) / peak
+        bottom = HEIGHT - PAD
+
+        for i, line in enumerate(self.lines):
+            if i >= len(histograms):
+                self.canvas.itemconfigure(line, state="hidden")
+                continue
+            coords = []
+            for b, count in enumerate(histograms[i]):
+                coords += (PAD + b * step, bottom - min(count, peak) * scale)
+            color = COLORS[names.index(selected[i])] if channel == "all" else "black"
+            self.canvas.coords(line, *coords)
+            self.canvas.itemconfigure(line, state="normal", fill=color)
+
+        lo, hi = stats["channels"][selected[0]]["bin_range"]
+        self.canvas.itemconfigure(self.range_labels[0], text=format_number(lo))
+        self.canvas.itemconfigure(self.range_labels[1], text=format_number(hi))
+        self.text.config(text="\n".join(describe(name, stats["channels"][name]) for name in selected))
+
+
+def format_number(value):
+    if value is None:
+        return "-"
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:.4g}"
+
+
+def describe(name, channel):
+    p = channel["percentiles"]
+    return (f"{name}  mean {format_number(channel['mean'])}  std {format_number(channel['std'])}\n"
+            f"    min {format_number(channel['min'])}  max {format_number(channel['max'])}\n"
+            f"    p1 {format_number(p['1'])}  p50 {format_number(p['50'])}  p99 {format_number(p['99'])}")
@@ -0,0 +1,454 @@
+"""Streaming conversion of videos and image sequences
+
+Usage:
+    python main.py stream inspection.mp4 lab_a.mp4 --to lab --channel a --mode raw
+    python main.py stream "frames/%04d.png" out_frames/ --to hsv --channel H --colormap hue
+    python main.py stream camera_dir/ out.avi --to lab --stats lab_means.csv
+
+Frames are read with cv2.VideoCapture (files and printf-style numbered
+sequences) or from a directory of images, and pass through four stages,
+each on its own thread: decode -> convert -> render -> encode. Stages are
+connected by bounded queues and work on a fixed set of frame slots whose
+buffers (RGB, converted planes, BGR output) are allocated once and reused,
+so memory stays at --depth frames whatever the length of the stream.
+Output is a video (.mp4, .avi, .mkv, .mov) or a directory of PNG frames.
+
+Channel views are normalized with the fixed range of the encoding by
+default, so brightness does not flicker from frame to frame as it would
+with per-frame min/max. Every stage is timed; the summary gives frames
+per second per stage (the slowest one bounds the pipeline) and overall.
+"""
+import argparse
+import csv
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import batch
+import engine
+import profiling
+import spaces
+from cache import DisplayCache
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".webm")
+# Codec written per output container
+FOURCC = {".mp4": "mp4v", ".m4v": "mp4v", ".mov": "mp4v", ".avi": "MJPG", ".mkv": "XVID"}
+STAGES = ("decode", "convert", "render", "encode")
+DEFAULT_FPS = 25.0
+
+
+class FrameSource:
+    """Frames of a video or image sequence, read in order or by index
+
+    read_into() fills a caller's buffer with the next frame, for the
+    pipeline; frame() returns any frame, for scrubbing, and keeps recently
+    decoded frames in a byte-bounded LRU. Both are safe to call from
+    several threads.
+    """
+
+    def __init__(self, path, count, fps, cache_bytes=256 * 1024 ** 2):
+        self.path = path
+        self.count = count
+        self.fps = fps
+        self.position = 0
+        self.lock = threading.Lock()
+        self.frames = DisplayCache(cache_bytes)
+
+    def read_into(self, out):
+        """Next frame into out (RGB, the shape and dtype of the first frame); False at the end"""
+        with self.lock:
+            ok = self._read(out)
+            if ok:
+                self.position += 1
+            return ok
+
+    def frame(self, index):
+        """RGB frame index, decoded (or from the LRU)"""
+        if not 0 <= index < self.count:
+            raise ValueError(f"Frame {index} out of range 0-{self.count - 1}")
+        image = self.frames.get(index)
+        if image is None:
+            with self.lock:
+                self.seek(index)
+                image = self._read(None)
+                if image is None:
+                    raise ValueError(f"Failed to decode frame {index} of {self.path}")
+                self.position = index + 1
+            self.frames.put(index, image, image.nbytes)
+        return image
+
+    def seek(self, index):
+        self.position = index
+
+    def first_frame(self):
+        return self.frame(0)
+
+    def close(self):
+        pass
+
+
+class VideoSource(FrameSource):
+    """A video file or numbered sequence through cv2.VideoCapture"""
+
+    def __init__(self, path, **kwargs):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Failed to open video: {path}")
+        count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        super().__init__(path, count, fps, **kwargs)
+
+    def seek(self, index):
+        # Reading on is much cheaper than a seek to the previous keyframe
+        if index != self.position:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        self.position = index
+
+    def _read(self, out):
+        ok, frame = self.capture.read(out)
+        if not ok:
+            return None if out is None else False
+        # BGR to RGB in the same buffer
+        engine.convert(frame, "bgr", "rgb", out=frame)
+        return frame if out is None else True
+
+    def close(self):
+        # Waits for a read in progress on another thread
+        with self.lock:
+            self.capture.release()
+
+
+class SequenceSource(FrameSource):
+    """The images of a directory, in file name order"""
+
+    def __init__(self, directory, **kwargs):
+        self.paths = sorted(batch.find_images(directory))
+        if not self.paths:
+            raise ValueError(f"No images in {directory}")
+        super().__init__(directory, len(self.paths), DEFAULT_FPS, **kwargs)
+
+    def _read(self, out):
+        if self.position >= len(self.paths):
+            return None if out is None else False
+        image = engine.read_image(self.paths[self.position])
+        if out is None:
+            return image
+        if image.shape != out.shape or image.dtype != out.dtype:
+            raise ValueError(f"{self.paths[self.position]} differs in size or depth from the first frame")
+        np.copyto(out, image)
+        return True
+
+
+def open_source(path, **kwargs):
+    """FrameSource of a video file, a printf-style pattern or a directory of images"""
+    if os.path.isdir(path):
+        return SequenceSource(path, **kwargs)
+    return VideoSource(path, **kwargs)
+
+
+class VideoSink:
+    def __init__(self, path, fps, size):
+        ext = os.path.splitext(path)[1].lower()
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*FOURCC.get(ext, "mp4v")), fps, size)
+        if not self.writer.isOpened():
+            raise ValueError(f"Failed to open video writer: {path}")
+
+    def write(self, index, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        self.writer.release()
+
+
+class SequenceSink:
+    """PNG frames in a directory (frame_000000.png, ...) or to a printf-style pattern"""
+
+    def __init__(self, path):
+        if "%" not in path:
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, "frame_%06d.png")
+        self.pattern = path
+
+    def write(self, index, frame):
+        path = self.pattern % index
+        if not cv2.imwrite(path, frame):
+            raise ValueError(f"Failed to write frame: {path}")
+
+    def close(self):
+        pass
+
+
+def open_sink(path, fps, size):
+    if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        return VideoSink(path, fps, size)
+    return SequenceSink(path)
+
+
+class FrameSlot:
+    """Reusable buffers of one frame in flight"""
+
+    def __init__(self, shape, dtype, converted_dtype, size):
+        self.index = -1
+        self.rgb = np.empty(shape, dtype)
+        self.converted = np.empty(shape, converted_dtype)
+        self.bgr = np.empty((size[1], size[0], 3), np.uint8)
+        self.analysis = None
+
+
+class StageMeter:
+    """Frames handled by one stage and the time it spent on them"""
+
+    def __init__(self):
+        self.frames = 0
+        self.busy = 0.0
+
+    def add(self, seconds):
+        self.frames += 1
+        self.busy += seconds
+
+    def result(self, wall):
+        return {"frames": self.frames,
+                "ms_per_frame": self.busy / self.frames * 1000 if self.frames else 0.0,
+                "fps": self.frames / self.busy if self.busy else 0.0,
+                "busy": self.busy / wall if wall else 0.0}
+
+
+class StreamPipeline:
+    """Decode, convert, render and encode frames on four threads
+
+    depth frame slots circulate between the stages, so at most depth
+    frames are decoded ahead of the encoder and no frame buffer is
+    allocated after the start.
+    """
+
+    def __init__(self, source, sink, space, channel="all", mode="rgb", normalization="fixed",
+                 colormap="gray", size=None, depth=4, start=0, end=None, analyze=False):
+        self.source = source
+        self.sink = sink
+        self.space = space
+        self.channel = channel
+        self.mode = mode
+        self.normalization = normalization
+        self.colormap = colormap
+        self.start = start
+        self.end = source.count if end is None else min(end, source.count)
+        first = source.first_frame()
+        height, width = first.shape[:2]
+        self.size = tuple(size) if size else (width, height)
+        dtype = engine.converted_dtype(first.dtype, "rgb", space)
+        self.slots = [FrameSlot(first.shape, first.dtype, dtype, self.size) for _ in range(depth)]
+        self.ranges = None
+        if normalization == "fixed" and space not in ("rgb", "bgr"):
+            self.ranges = engine.fixed_ranges(space, dtype)
+        self.analyze = analyze
+        self.analysis = []
+        self.meters = {name: StageMeter() for name in STAGES}
+        self.stop = threading.Event()
+        self.error = None
+
+    def cancel(self):
+        self.stop.set()
+
+    def decode(self, slot):
+        return self.source.read_into(slot.rgb)
+
+    def convert(self, slot):
+        engine.convert(slot.rgb, "rgb", self.space, out=slot.converted)
+        if self.analyze:
+            mean, std = cv2.meanStdDev(slot.converted)
+            slot.analysis = (mean.ravel().tolist(), std.ravel().tolist())
+
+    def render(self, slot):
+        ranges = self.ranges
+        if ranges is None and self.space not in ("rgb", "bgr"):
+            ranges = engine.normalization_ranges(slot.converted, self.space, self.normalization)
+        view = engine.render_channel(slot.converted, self.space, self.channel, self.mode, self.size,
+                                     ranges, colormap=self.colormap)
+        cv2.cvtColor(view, cv2.COLOR_RGB2BGR, dst=slot.bgr)
+
+    def encode(self, slot):
+        self.sink.write(slot.index, slot.bgr)
+        if slot.analysis is not None:
+            self.analysis.append((slot.index,) + slot.analysis)
+
+    def _timed(self, name, work, slot):
+        start = time.perf_counter()
+        result = work(slot)
+        end = time.perf_counter()
+        self.meters[name].add(end - start)
+        if profiling.enabled():
+            profiling.record(f"stream/{name}", start, end)
+        return result
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop.set()
+
+    def _produce(self, free, outbox):
+        try:
+            self.source.seek(self.start)
+            for index in range(self.start, self.end):
+                slot = free.get()
+                if self.stop.is_set():
+                    break
+                try:
+                    ok = self._timed("decode", self.decode, slot)
+                except Exception as e:
+                    self._fail(e)
+                    break
+                if not ok:
+                    break
+                slot.index = index
+                outbox.put(slot)
+        finally:
+            outbox.put(None)
+
+    def _consume(self, name, work, inbox, outbox, free, on_frame=None):
+        """Run work on every slot of inbox; after a failure slots only go back to free"""
+        while True:
+            slot = inbox.get()
+            if slot is None:
+                break
+            if self.stop.is_set():
+                free.put(slot)
+                continue
+            try:
+                self._timed(name, work, slot)
+            except Exception as e:
+                self._fail(e)
+                free.put(slot)
+                continue
+            outbox.put(slot)
+            if on_frame is not None:
+                on_frame(slot.index)
+        if outbox is not free:
+            outbox.put(None)
+
+    def run(self, on_frame=None):
+        """Stream every frame through; returns the per-stage and overall rates
+
+        on_frame(index) is called from the encoder thread after each frame.
+        """
+        free = queue.Queue()
+        for slot in self.slots:
+            free.put(slot)
+        # A slot is always free or in one of these, so none of the puts block for long
+        converted, rendered, encoded = (queue.Queue(maxsize=len(self.slots)) for _ in range(3))
+        decoded = queue.Queue(maxsize=len(self.slots))
+        threads = [
+            threading.Thread(target=self._produce, args=(free, decoded), name="stream-decode"),
+            threading.Thread(target=self._consume, args=("convert", self.convert, decoded, converted, free),
+                             name="stream-convert"),
+            threading.Thread(target=self._consume, args=("render", self.render, converted, rendered, free),
+                             name="stream-render"),
+            threading.Thread(target=self._consume, args=("encode", self.encode, rendered, free, free, on_frame),
+                             name="stream-encode"),
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        self.sink.close()
+        if self.error is not None:
+            raise self.error
+        frames = self.meters["encode"].frames
+        return {"frames": frames, "seconds": wall, "fps": frames / wall if wall else 0.0,
+                "stages": {name: meter.result(wall) for name, meter in self.meters.items()}}
+
+    def write_analysis(self, path):
+        """Per-frame mean and standard deviation of each channel as CSV"""
+        channels = spaces.get(self.space).channels
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "time_s"] + [f"{ch}_mean" for ch in channels]
+                            + [f"{ch}_std" for ch in channels])
+            for index, mean, std in self.analysis:
+                writer.writerow([index, round(index / self.source.fps, 4)]
+                                + [round(v, 4) for v in mean + std])
+
+
+def format_summary(result):
+    lines = [f"{'stage':10} {'frames':>7} {'ms/frame':>9} {'fps':>8} {'busy':>6}"]
+    for name, s in result["stages"].items():
+        lines.append(f"{name:10} {s['frames']:7} {s['ms_per_frame']:9.2f} {s['fps']:8.1f} {s['busy']:6.0%}")
+    lines.append(f"{result['frames']} frames in {result['seconds']:.2f} s, {result['fps']:.1f} fps")
+    return "\n".join(lines)
+
+
+def parse_size(value):
+    try:
+        width, height = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {value!r}") from None
+    return width, height
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py stream",
+                                     description="Convert and render every frame of a video or image sequence")
+    parser.add_argument("input", help="Video file, printf-style pattern (frames/%%04d.png) or directory")
+    parser.add_argument("output", help="Video file (.mp4/.avi/.mkv/.mov) or directory for PNG frames")
+    parser.add_argument("--to", dest="space", type=spaces.get, default=spaces.get("lab"),
+                        help="Target space (default: lab)")
+    parser.add_argument("--channel", default="all", help="Channel to render (default: all)")
+    parser.add_argument("--mode", choices=engine.MODES, default="rgb", help="Display mode (default: rgb)")
+    parser.add_argument("--normalization", choices=engine.NORMALIZATIONS, default="fixed",
+                        help="Range of stretched channels (default: fixed, no flicker)")
+    parser.add_argument("--colormap", choices=engine.COLORMAPS, default="gray")
+    parser.add_argument("--size", type=parse_size, help="Output WIDTHxHEIGHT (default: input size)")
+    parser.add_argument("--fps", type=float, help="Output frame rate (default: the input's)")
+    parser.add_argument("--start", type=int, default=0, help="First frame")
+    parser.add_argument("--end", type=int, default=None, help="Frame to stop before")
+    parser.add_argument("--depth", type=int, default=4, help="Frames in flight (default: 4)")
+    parser.add_argument("--stats", metavar="CSV", help="Write per-frame channel mean/std to CSV")
+    parser.add_argument("--json", metavar="FILE", help="Write the stage timings to FILE")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    space = args.space.name
+    if args.channel != "all" and args.channel not in args.space.channels:
+        print(f"Error: {args.space.label} has channels {', '.join(args.space.channels)}", file=sys.stderr)
+        return 2
+    try:
+        source = open_source(args.input)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    try:
+        first = source.first_frame()
+        size = args.size or first.shape[1::-1]
+        sink = open_sink(args.output, args.fps or source.fps, size)
+        pipeline = StreamPipeline(source, sink, space, args.channel, args.mode, args.normalization,
+                                  args.colormap, size, args.depth, args.start, args.end,
+                                  analyze=bool(args.stats))
+        print(f"{source.path}: {source.count} frames, {first.shape[1]}x{first.shape[0]} "
+              f"at {source.fps:g} fps", file=sys.stderr)
+        result = pipeline.run()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        source.close()
+
+    print(format_summary(result))
+    if args.stats:
+        pipeline.write_analysis(args.stats)
+    if args.json:
+        import json
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
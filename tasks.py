@@ -0,0 +1,186 @@
+"""Background task execution for the Tk application
+
+Blocking work (imread, cvtColor, imwrite) runs on a small thread pool.
+Results are handed back through a queue that the Tk thread drains with
+root.after, so callbacks always run on the Tk thread and the mainloop never
+blocks. OpenCV releases the GIL in these calls, so the workers run in
+parallel with the GUI.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task that noticed it was cancelled"""
+
+
+class Task:
+    """Handle for one submitted unit of work"""
+
+    def __init__(self, executor, description, generation, scoped=True):
+        self.description = description
+        self.generation = generation
+        self.scoped = scoped
+        self.started = time.perf_counter()
+        self.progress = None
+        self.future = None
+        self._executor = executor
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check_cancelled(self):
+        """Call from long running work to stop early when cancelled"""
+        if self._cancelled.is_set():
+            raise TaskCancelled(self.description)
+
+    def report_progress(self, fraction, text=None):
+        """Thread-safe progress update, shown through the status callback"""
+        self.progress = fraction
+        self._executor._events.put(("progress", self, (fraction, text)))
+
+
+class TaskExecutor:
+    """Run callables on worker threads and deliver results on the Tk thread
+
+    Every task remembers the generation it was submitted in. Calling
+    new_generation() (e.g. when another image is loaded) cancels the
+    outstanding scoped tasks and makes their late results be dropped
+    silently. Tasks submitted with scoped=False (saves, exports) outlive
+    generations and only stop through cancel_all().
+    """
+
+    def __init__(self, root, max_workers=2, on_status=None, poll_interval=20,
+                 status_interval=0.1):
+        self.root = root
+        self.on_status = on_status
+        self.poll_interval = poll_interval
+        self.status_interval = status_interval
+        self.generation = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._events = queue.Queue()
+        self._active = []
+        self._last_status = 0.0
+        self._polling = False
+
+    @property
+    def busy(self):
+        return bool(self._active)
+
+    def submit(self, fn, *args, description="Working", on_done=None, on_error=None,
+               pass_task=False, scoped=True, **kwargs):
+        """Run fn(*args, **kwargs) on a worker
+
+        on_done(result) or on_error(exception) are called on the Tk thread,
+        unless the task was cancelled or, for scoped tasks, its generation
+        is stale. With pass_task=True the Task is passed as the `task`
+        keyword so fn can report progress and check for cancellation.
+        """
+        task = Task(self, description, self.generation, scoped)
+        if pass_task:
+            kwargs["task"] = task
+
+        def run():
+            if task.cancelled:
+                self._events.put(("cancelled", task, None))
+                return
+            try:
+                result = fn(*args, **kwargs)
+            except TaskCancelled:
+                self._events.put(("cancelled", task, None))
+            except Exception as e:
+                self._events.put(("error", task, (e, on_error)))
+            else:
+                self._events.put(("done", task, (result, on_done)))
+
+        def dropped(future):
+            # Cancelled before a worker picked it up, run() never executes
+            if future.cancelled():
+                self._events.put(("cancelled", task, None))
+
+        self._active.append(task)
+        task.future = self._pool.submit(run)
+        task.future.add_done_callback(dropped)
+        self._show_status(force=True)
+        self._schedule_poll()
+        return task
+
+    def new_generation(self):
+        """Cancel the scoped tasks in flight and start a new generation"""
+        for task in list(self._active):
+            if task.scoped:
+                task.cancel()
+        self.generation += 1
+        return self.generation
+
+    def cancel_all(self):
+        for task in list(self._active):
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._pool.shutdown(wait=False)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                kind, task, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._handle(kind, task, payload)
+
+        self._show_status(force=not self._active)
+        if self._active:
+            self._schedule_poll()
+
+    def _handle(self, kind, task, payload):
+        if kind == "progress":
+            self._show_status(force=True)
+            return
+
+        if task in self._active:
+            self._active.remove(task)
+        stale = task.cancelled or (task.scoped and task.generation != self.generation)
+        if kind == "cancelled" or stale:
+            return
+
+        value, callback = payload
+        if callback is not None:
+            callback(value)
+        elif kind == "error":
+            raise value
+
+    def _show_status(self, force=False):
+        if self.on_status is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_status < self.status_interval:
+            return
+        self._last_status = now
+
+        if not self._active:
+            self.on_status(None)
+            return
+        task = self._active[0]
+        text = f"{task.description}..."
+        if task.progress is not None:
+            text += f" {task.progress:.0%}"
+        text += f" ({now - task.started:.1f}s)"
+        if len(self._active) > 1:
+            text += f" +{len(self._active) - 1} queued"
+        self.on_status(text)
@@ -0,0 +1,226 @@
+"""Color range thresholds: binary masks and overlays of HSV/CIELab images
+
+A threshold keeps, per channel, an inclusive (lo, hi) range in the natural
+units of the space (H in degrees, S/V 0-1, L 0-100 with signed a/b), the
+units of the float encoding and of the hover inspector. Hue ranges with
+lo > hi wrap through 0, so reds can be picked with e.g. H 340-20.
+
+Masks are one cv2.inRange over the stored encoding (two for a wrapping
+hue). Per-channel 256-entry tables (cv2.LUT, then AND) were measured at
+2-3x the cost of inRange, so they are not used; the interactive speed
+comes from the GUI evaluating the display pyramid level while a slider
+is dragged and the full-resolution planes only on release and export.
+
+Usage:
+    python main.py threshold --settings red.json photos/ masks/ --overlay
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import batch
+import engine
+import spaces
+
+SPACES = ("hsv", "lab")
+# Ranges that keep every pixel, covering the 8-bit and float encodings
+FULL_RANGES = {"hsv": ((0, 360), (0, 1), (0, 1)),
+               "lab": ((0, 100), (-128, 127), (-128, 127))}
+SETTINGS_VERSION = 1
+# Brightness kept outside the mask in overlays
+OVERLAY_DIM = 0.25
+
+
+def _encode(space, index, value):
+    """Value of channel index in natural units, in the packed 8-bit encoding"""
+    if space == "hsv":
+        return value / 2 if index == 0 else value * 255
+    if index == 0:
+        return value * 255 / 100
+    return value + 128
+
+
+class Thresholds:
+    """Per-channel inclusive ranges of one space, in natural units"""
+
+    def __init__(self, space, ranges=None):
+        if space not in SPACES:
+            raise ValueError(f"Thresholds are supported for {', '.join(SPACES)}, not {space!r}")
+        self.space = space
+        self.channels = spaces.get(space).channels
+        if ranges is None:
+            ranges = FULL_RANGES[space]
+        self.ranges = tuple((float(lo), float(hi)) for lo, hi in ranges)
+
+    def __eq__(self, other):
+        return isinstance(other, Thresholds) and (self.space, self.ranges) == (other.space, other.ranges)
+
+    def __hash__(self):
+        return hash((self.space, self.ranges))
+
+    def __repr__(self):
+        return f"Thresholds({self.space!r}, {self.ranges!r})"
+
+    def wraps(self, index):
+        """True for a hue range that wraps through 0"""
+        lo, hi = self.ranges[index]
+        return self.space == "hsv" and index == 0 and lo > hi
+
+    def describe(self):
+        return "  ".join(f"{ch} {lo:g}-{hi:g}" for ch, (lo, hi) in zip(self.channels, self.ranges))
+
+    def to_dict(self):
+        return {"version": SETTINGS_VERSION, "space": self.space,
+                "channels": {ch: list(r) for ch, r in zip(self.channels, self.ranges)}}
+
+    @classmethod
+    def from_dict(cls, data):
+        space = data["space"]
+        channels = spaces.get(space).channels
+        try:
+            return cls(space, [data["channels"][ch] for ch in channels])
+        except KeyError as e:
+            raise ValueError(f"Threshold settings lack channel {e}") from None
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def bounds(self, dtype):
+        """Per-channel (lo, hi) in the stored encoding of dtype data
+
+        8-bit bounds are rounded inwards, so a stored value is inside
+        exactly when its natural value is.
+        """
+        if np.dtype(dtype) != np.uint8:
+            return self.ranges
+        result = []
+        for index, (lo, hi) in enumerate(self.ranges):
+            top = 179 if self.space == "hsv" and index == 0 else 255
+            lo = max(0, int(np.ceil(_encode(self.space, index, lo) - 1e-6)))
+            hi = min(top, int(np.floor(_encode(self.space, index, hi) + 1e-6)))
+            result.append((lo, hi))
+        return tuple(result)
+
+
+def mask(img, thresholds):
+    """(H,W) uint8 mask, 255 where every channel of img is in range"""
+    lo, hi = zip(*thresholds.bounds(img.dtype))
+    if not thresholds.wraps(0):
+        return cv2.inRange(img, lo, hi)
+    # Wrapping hue: [lo, top] or [bottom, hi], the other channels as given
+    top = 179 if img.dtype == np.uint8 else 360
+    result = cv2.inRange(img, (lo[0],) + lo[1:], (top,) + hi[1:])
+    return cv2.bitwise_or(result, cv2.inRange(img, (0,) + lo[1:], (hi[0],) + hi[1:]), dst=result)
+
+
+def coverage(mask_image):
+    """Fraction of pixels inside the mask"""
+    return cv2.countNonZero(mask_image) / mask_image.size
+
+
+def overlay(rgb, mask_image):
+    """RGB image dimmed to OVERLAY_DIM outside the mask"""
+    result = cv2.convertScaleAbs(rgb, alpha=OVERLAY_DIM)
+    return cv2.copyTo(rgb, mask_image, result)
+
+
+def render(mask_image, rgb, view, size, interpolation=cv2.INTER_AREA):
+    """RGB display image of a mask ("mask") or masked rgb ("overlay") at size (width, height)"""
+    if mask_image.shape[1::-1] != tuple(size):
+        mask_image = cv2.resize(mask_image, tuple(size), interpolation=interpolation)
+    if view == "mask":
+        return cv2.cvtColor(mask_image, cv2.COLOR_GRAY2RGB)
+    if rgb.shape[1::-1] != tuple(size):
+        rgb = cv2.resize(rgb, tuple(size), interpolation=interpolation)
+    return overlay(engine.as_display(rgb), mask_image)
+
+
+def threshold_file(path, thresholds, out_dir, with_overlay=False):
+    """Write the mask (and overlay) of one image; returns the mask coverage"""
+    image = engine.read_image(path)
+    mask_image = mask(engine.convert(image, "rgb", thresholds.space), thresholds)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if not cv2.imwrite(os.path.join(out_dir, f"{stem}_mask.png"), mask_image):
+        raise ValueError(f"Failed to write mask of {path}")
+    if with_overlay:
+        engine.save_image(os.path.join(out_dir, f"{stem}_overlay.png"),
+                          overlay(engine.as_display(image), mask_image), "rgb")
+    return coverage(mask_image)
+
+
+def _threshold_job(job):
+    path, thresholds, out_dir, with_overlay = job
+    try:
+        return path, threshold_file(path, thresholds, out_dir, with_overlay), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def run_threshold(in_dir, out_dir, thresholds, with_overlay=False, jobs=None):
+    """Mask every image of in_dir on a process pool; returns {path: coverage} and failures"""
+    work = [(path, thresholds, out_dir, with_overlay) for path in batch.find_images(in_dir)]
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = min(jobs or os.cpu_count() or 1, max(1, len(work)))
+    if jobs == 1:
+        batch._init_worker()
+        results = list(map(_threshold_job, work))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=batch._init_worker) as executor:
+            results = list(executor.map(_threshold_job, work))
+    coverages = {path: value for path, value, error in results if error is None}
+    failures = {path: error for path, _, error in results if error is not None}
+    return coverages, failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py threshold",
+                                     description="Apply saved color thresholds to a folder of images")
+    parser.add_argument("in_dir", help="Directory of images")
+    parser.add_argument("out_dir", help="Directory for <name>_mask.png (and _overlay.png)")
+    parser.add_argument("--settings", required=True,
+                        help="Threshold settings JSON, as saved or exported by the GUI")
+    parser.add_argument("--overlay", action="store_true",
+                        help="Also write the image dimmed outside the mask")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--json", metavar="FILE", help="Write the mask coverage per image to FILE")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.in_dir):
+        print(f"Error: input directory not found: {args.in_dir}", file=sys.stderr)
+        return 2
+    try:
+        thresholds = Thresholds.load(args.settings)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: cannot read threshold settings: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{thresholds.space}: {thresholds.describe()}", file=sys.stderr)
+    coverages, failures = run_threshold(args.in_dir, args.out_dir, thresholds, args.overlay, args.jobs)
+    for path, value in coverages.items():
+        print(f"{os.path.basename(path)[:40]:40} {value:7.1%}")
+    for path, error in failures.items():
+        print(f"Failed: {path}: {error}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": thresholds.to_dict(), "coverage": coverages,
+                       "failures": failures}, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Tiled, memory-bounded conversion for images larger than RAM
+
+The source is read strip by strip straight from the file (uncompressed
+TIFF/BMP/PPM strips located through PIL, .npy arrays or headerless raw RGB
+buffers), each strip is converted with the same cvtColor codes as the GUI and
+appended to a .npy output. Two strip buffers are allocated once and reused,
+and the strip height leaves room for the temporaries of the conversion, so
+peak memory is bounded by max_memory whatever the image size.
+
+Usage:
+    python main.py tiled --to lab --max-memory 256M scan.tif scan_lab.npy
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import engine
+import spaces
+
+DEFAULT_MAX_MEMORY = 256 * 1024 * 1024
+
+# float32 (H,W,3) temporaries of the NumPy-implemented spaces per strip: the
+# linearized input and the first matrix product (see spaces.rgb_to_oklab)
+FLOAT_TEMPORARIES = 2
+
+# PIL raw modes that can be read from the file without decoding
+RAW_MODES = {"RGB": "rgb", "BGR": "bgr"}
+
+
+class Segment:
+    """A run of rows stored uncompressed in the file"""
+
+    def __init__(self, y, rows, offset, stride, bottom_up=False):
+        self.y = y
+        self.rows = rows
+        self.offset = offset
+        self.stride = stride
+        self.bottom_up = bottom_up
+
+
+class StripSource:
+    """Row-range reader over the uncompressed pixel data of a file"""
+
+    def __init__(self, path, width, height, space, segments):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.space = space
+        self.segments = segments
+        self.stride = segments[0].stride
+        self._file = open(path, "rb")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_rows(self, y0, y1, buffer):
+        """Read rows [y0, y1) into buffer, return an (rows, W, 3) view of it"""
+        rows = y1 - y0
+        out = buffer[:rows]
+        for seg in self.segments:
+            lo, hi = max(y0, seg.y), min(y1, seg.y + seg.rows)
+            if lo >= hi:
+                continue
+            if seg.bottom_up:
+                # Stored last row first, read the mirrored range and flip it
+                first = seg.rows - (hi - seg.y)
+            else:
+                first = lo - seg.y
+            self._file.seek(seg.offset + first * seg.stride)
+            chunk = out[lo - y0:hi - y0, :seg.stride]
+            self._file.readinto(memoryview(chunk).cast("B"))
+            if seg.bottom_up:
+                chunk[:] = chunk[::-1].copy()
+        return out[:, :self.width * 3].reshape(rows, self.width, 3)
+
+
+def _npy_source(path):
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if fortran or dtype != np.uint8 or len(shape) != 3 or shape[2] != 3:
+        raise ValueError(f"{path}: expected a C-ordered (H,W,3) uint8 array")
+    height, width = shape[:2]
+    return StripSource(path, width, height, "rgb",
+                       [Segment(0, height, offset, width * 3)])
+
+
+def _raw_source(path, shape):
+    if shape is None:
+        raise ValueError(f"{path}: raw buffers need an explicit shape (--shape HxW)")
+    height, width = shape
+    expected = height * width * 3
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"{path}: file is smaller than {height}x{width}x3 bytes")
+    return StripSource(path, width, height, "rgb", [Segment(0, height, 0, width * 3)])
+
+
+def _pil_source(path):
+    """Locate uncompressed strips through PIL without decoding them"""
+    from PIL import Image
+
+    with Image.open(path) as im:
+        width, height = im.size
+        tiles = list(im.tile)
+
+    segments = []
+    space = None
+    for tile in tiles:
+        codec, extents, offset, args = tile[:4]
+        x0, y0, x1, y1 = extents
+        if isinstance(args, str):
+            args = (args,)
+        if codec != "raw" or (x0, x1) != (0, width):
+            return None
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 and args[1] else width * 3
+        orientation = args[2] if len(args) > 2 else 1
+        if rawmode not in RAW_MODES or space not in (None, RAW_MODES[rawmode]):
+            return None
+        if segments and stride != segments[0].stride:
+            return None
+        space = RAW_MODES[rawmode]
+        segments.append(Segment(y0, y1 - y0, offset, stride, bottom_up=orientation < 0))
+
+    if not segments:
+        return None
+    return StripSource(path, width, height, space, segments)
+
+
+def open_source(path, shape=None):
+    """Open path for strip reading
+
+    Supports .npy arrays, headerless raw RGB buffers (.raw/.rgb, shape
+    required) and uncompressed strip images understood by PIL. Compressed
+    formats cannot be read in strips and raise ValueError.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return _npy_source(path)
+    if ext in (".raw", ".rgb"):
+        return _raw_source(path, shape)
+    source = _pil_source(path)
+    if source is None:
+        raise ValueError(f"{path}: compressed or unsupported layout, strip reading needs "
+                         "uncompressed TIFF/BMP/PPM, .npy or raw input")
+    return source
+
+
+def working_bytes_per_pixel(src, dst):
+    """Bytes per pixel engine.convert allocates on top of the output for src -> dst"""
+    if not spaces.get(dst).float_only:
+        # One cvtColor call writing straight into the output buffer
+        return 0
+    extra = FLOAT_TEMPORARIES * 3 * 4
+    if src != "rgb":
+        # Swapped to an RGB strip first
+        extra += 3
+    return extra
+
+
+def rows_per_strip(source, max_memory, space):
+    """Rows that fit in max_memory with the input and output strip buffers
+    and the working set of converting them to space"""
+    out_itemsize = 4 if spaces.get(space).float_only else 1
+    row_bytes = (source.stride
+                 + source.width * (3 * out_itemsize + working_bytes_per_pixel(source.space, space)))
+    return max(1, min(source.height, max_memory // row_bytes))
+
+
+def convert_tiled(src_path, dst_path, space, max_memory=DEFAULT_MAX_MEMORY, shape=None,
+                  progress=None, task=None):
+    """Convert src_path to space and write an (H,W,3) .npy to dst_path
+
+    The output is uint8, or float32 for spaces without an 8-bit encoding.
+
+    Returns a summary dict. progress(done_rows, total_rows) is called after
+    each strip; task (see tasks.Task) allows cancellation and progress
+    reporting when run from the GUI.
+    """
+    start = time.perf_counter()
+    with open_source(src_path, shape) as source:
+        out_dtype = np.dtype(np.float32) if spaces.get(space).float_only else np.dtype(np.uint8)
+        rows = rows_per_strip(source, max_memory, space)
+        in_buffer = np.empty((rows, source.stride), np.uint8)
+        out_buffer = np.empty((rows, source.width, 3), out_dtype)
+
+        header = {"descr": np.lib.format.dtype_to_descr(out_dtype),
+                  "fortran_order": False,
+                  "shape": (source.height, source.width, 3)}
+        with open(dst_path, "wb") as out:
+            np.lib.format.write_array_header_1_0(out, header)
+            for y0 in range(0, source.height, rows):
+                if task is not None:
+                    task.check_cancelled()
+                y1 = min(source.height, y0 + rows)
+                strip = source.read_rows(y0, y1, in_buffer)
+                # The 2^24-entry lookup tables would not respect max_memory
+                converted = engine.convert(strip, source.space, space, out=out_buffer[:y1 - y0],
+                                           use_table=False)
+                out.write(memoryview(converted).cast("B"))
+                if progress:
+                    progress(y1, source.height)
+                if task is not None:
+                    task.report_progress(y1 / source.height)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "width": source.width,
+        "height": source.height,
+        "rows_per_strip": rows,
+        "buffer_bytes": in_buffer.nbytes + out_buffer.nbytes,
+        "seconds": elapsed,
+        "megapixels_per_second": source.width * source.height / 1e6 / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def parse_size(value):
+    """Parse sizes such as 512M, 2G or 1048576 into bytes"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper().rstrip("B")
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}") from None
+
+
+def parse_shape(value):
+    try:
+        height, width = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shape {value!r}, expected HxW") from None
+    return height, width
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py tiled",
+                                     description="Convert a huge image strip by strip within a memory budget")
+    parser.add_argument("src", help="Uncompressed TIFF/BMP/PPM, .npy or raw RGB input")
+    parser.add_argument("dst", help="Output .npy file")
+    parser.add_argument("--to", dest="space", choices=spaces.target_names(), default="lab",
+                        help="Target color space (default: lab)")
+    parser.add_argument("--max-memory", type=parse_size, default=DEFAULT_MAX_MEMORY,
+                        help="Budget for the strip buffers, e.g. 256M (default: 256M)")
+    parser.add_argument("--shape", type=parse_shape, help="HxW of a headerless raw input")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    def report(done, total):
+        print(f"\r{done}/{total} rows", end="", file=sys.stderr)
+
+    try:
+        summary = convert_tiled(args.src, args.dst, args.space, args.max_memory,
+                                args.shape, progress=report)
+    except (OSError, ValueError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    print(f"Converted {summary['width']}x{summary['height']} in {summary['seconds']:.2f}s "
+          f"({summary['megapixels_per_second']:.1f} MP/s, {summary['rows_per_strip']} rows per strip, "
+          f"{summary['buffer_bytes'] / 1024 ** 2:.1f} MiB buffers)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
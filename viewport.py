@@ -0,0 +1,151 @@
+"""Zoom/pan geometry and pyramid level selection for the image canvases
+
+Pure coordinate math, no Tk or OpenCV, so it can be used (and reasoned
+about) without a display. A Viewport maps between canvas pixels and
+full-resolution image pixels; the GUI renders only the tiles of the chosen
+pyramid level that intersect the visible canvas area.
+"""
+import math
+
+# Target tile size on the canvas; tiles are 16-512 pyramid pixels so that
+# zoomed-in views do not resample far more than is visible
+TILE_SIZE = 256
+MIN_TILE_SIZE = 16
+MAX_TILE_SIZE = 512
+MAX_ZOOM = 32.0
+
+
+class Viewport:
+    """Zoom factor and position of an image on a canvas
+
+    zoom is canvas pixels per full-resolution image pixel; (x0, y0) is the
+    image coordinate shown at the canvas origin.
+    """
+
+    def __init__(self, img_width, img_height, canvas_width, canvas_height):
+        self.img_width = img_width
+        self.img_height = img_height
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.fitted = True
+        self.fit()
+
+    @property
+    def fit_zoom(self):
+        return min(self.canvas_width / self.img_width, self.canvas_height / self.img_height)
+
+    @property
+    def min_zoom(self):
+        return min(self.fit_zoom, 1.0) / 2
+
+    def fit(self):
+        """Show the whole image centered, like the original fit-to-canvas view"""
+        self.zoom = self.fit_zoom
+        self.fitted = True
+        self._center_on(self.img_width / 2, self.img_height / 2)
+
+    def actual_size(self, cx=None, cy=None):
+        """Zoom to 1:1 around canvas point (cx, cy), the center by default"""
+        self.zoom_at(1.0 / self.zoom, cx, cy)
+
+    def set_canvas_size(self, canvas_width, canvas_height):
+        """Follow a canvas resize, keeping the same image point centered"""
+        center = self.canvas_to_image(self.canvas_width / 2, self.canvas_height / 2)
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        if self.fitted:
+            self.fit()
+        else:
+            self._center_on(*center)
+
+    def zoom_at(self, factor, cx=None, cy=None):
+        """Multiply zoom by factor, keeping the image point under (cx, cy) fixed"""
+        if cx is None:
+            cx, cy = self.canvas_width / 2, self.canvas_height / 2
+        ix, iy = self.canvas_to_image(cx, cy)
+        self.zoom = min(MAX_ZOOM, max(self.min_zoom, self.zoom * factor))
+        self.fitted = False
+        self.x0 = ix - cx / self.zoom
+        self.y0 = iy - cy / self.zoom
+        self._clamp()
+
+    def pan(self, dx, dy):
+        """Move the image by (dx, dy) canvas pixels"""
+        self.x0 -= dx / self.zoom
+        self.y0 -= dy / self.zoom
+        self.fitted = False
+        self._clamp()
+
+    def canvas_to_image(self, cx, cy):
+        return self.x0 + cx / self.zoom, self.y0 + cy / self.zoom
+
+    def image_to_canvas(self, ix, iy):
+        return (ix - self.x0) * self.zoom, (iy - self.y0) * self.zoom
+
+    def level(self, n_levels, draft=False):
+        """Pyramid level to sample from: the coarsest one still >= display resolution
+
+        draft=True picks the next coarser level, a quarter of the pixels, for
+        redraws during continuous zooming.
+        """
+        level = 0 if self.zoom >= 1.0 else int(math.floor(math.log2(1.0 / self.zoom)))
+        if draft:
+            level += 1
+        return max(0, min(n_levels - 1, level))
+
+    def tile_size(self, level_width):
+        """Tile size in level pixels giving roughly TILE_SIZE canvas pixels"""
+        zoom = self.zoom * self.img_width / level_width
+        tile_size = TILE_SIZE
+        while tile_size > MIN_TILE_SIZE and tile_size * zoom > 2 * TILE_SIZE:
+            tile_size //= 2
+        while tile_size < MAX_TILE_SIZE and tile_size * zoom < TILE_SIZE / 2:
+            tile_size *= 2
+        return tile_size
+
+    def visible_tiles(self, level_width, level_height, tile_size=None):
+        """Yield (x0, y0, x1, y1, cx0, cy0, cx1, cy1) for tiles of a pyramid level
+
+        Tile bounds are in level pixels, canvas bounds are integers derived
+        from the global tile grid, so adjacent tiles never leave seams.
+        """
+        if tile_size is None:
+            tile_size = self.tile_size(level_width)
+        sx = level_width / self.img_width
+        sy = level_height / self.img_height
+        # Canvas pixels per level pixel
+        zx, zy = self.zoom / sx, self.zoom / sy
+        ox, oy = round(self.x0 * self.zoom), round(self.y0 * self.zoom)
+
+        vx0 = max(0, int(self.x0 * sx) // tile_size)
+        vy0 = max(0, int(self.y0 * sy) // tile_size)
+        vx1 = min(level_width, int(math.ceil((self.x0 + self.canvas_width / self.zoom) * sx)))
+        vy1 = min(level_height, int(math.ceil((self.y0 + self.canvas_height / self.zoom) * sy)))
+
+        for ty in range(vy0, (vy1 + tile_size - 1) // tile_size):
+            y0 = ty * tile_size
+            y1 = min(level_height, y0 + tile_size)
+            cy0, cy1 = round(y0 * zy) - oy, round(y1 * zy) - oy
+            for tx in range(vx0, (vx1 + tile_size - 1) // tile_size):
+                x0 = tx * tile_size
+                x1 = min(level_width, x0 + tile_size)
+                cx0, cx1 = round(x0 * zx) - ox, round(x1 * zx) - ox
+                if cx1 > cx0 and cy1 > cy0:
+                    yield x0, y0, x1, y1, cx0, cy0, cx1, cy1
+
+    def _center_on(self, ix, iy):
+        self.x0 = ix - self.canvas_width / 2 / self.zoom
+        self.y0 = iy - self.canvas_height / 2 / self.zoom
+
+    def _clamp(self):
+        # Keep at least part of the image on screen; center it when smaller
+        view_w = self.canvas_width / self.zoom
+        view_h = self.canvas_height / self.zoom
+        if view_w >= self.img_width:
+            self.x0 = (self.img_width - view_w) / 2
+        else:
+            self.x0 = min(max(self.x0, 0), self.img_width - view_w)
+        if view_h >= self.img_height:
+            self.y0 = (self.img_height - view_h) / 2
+        else:
+            self.y0 = min(max(self.y0, 0), self.img_height - view_h)
@@ -0,0 +1,274 @@
+"""Watch a folder and convert images as they arrive
+
+Usage:
+    python main.py watch --to lab,hsv --jobs 4 in_dir out_dir
+    python main.py watch --once in_dir out_dir      # process what is there, then exit
+
+New files are picked up once their size and modification time stop
+changing between two polls, so half-written scans are not read. Work is
+recorded in a manifest (out_dir/.manifest.json) keyed by the SHA-256 of
+the file contents, so a restart, a renamed copy or a second drop of the
+same scan skips files whose outputs already exist.
+
+A file that fails (still being written, disk full...) is not recorded and
+is retried with exponential backoff, RETRY_DELAY doubling up to
+RETRY_MAX_DELAY, until MAX_RETRIES attempts have failed; after that it
+waits for the file to change. Only files given up on, or still waiting
+for a retry when the watch stops, count as failed. --once does not retry.
+
+At most --max-pending files are queued on the --jobs worker processes;
+the rest wait as paths only, so a burst of hundreds of files does not
+hold hundreds of decoded images in memory.
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import batch
+from cache import file_digest
+
+MANIFEST_NAME = ".manifest.json"
+# Seconds before the first retry of a failed file, doubled per failure
+RETRY_DELAY = 2.0
+RETRY_MAX_DELAY = 300.0
+MAX_RETRIES = 6
+
+
+def output_key(space, ext, use_float):
+    """Manifest name of one output variant, e.g. "lab.png" or "lab-float.npy" """
+    return f"{space}{'-float' if use_float else ''}{ext}"
+
+
+class Manifest:
+    """Persistent content hash -> outputs record
+
+    Saved with a write to a temporary file and os.replace, so a crash
+    leaves either the old or the new manifest, never a partial one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def is_done(self, digest, keys):
+        """True if every output in keys was written for digest and still exists"""
+        outputs = self.entries.get(digest, {}).get("outputs", {})
+        return all(key in outputs and os.path.exists(outputs[key]) for key in keys)
+
+    def add(self, digest, source, outputs):
+        entry = self.entries.setdefault(digest, {"source": source, "outputs": {}})
+        entry["source"] = source
+        entry["outputs"].update(outputs)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+class FolderWatcher:
+    """Poll in_dir and convert stable new files on a bounded process pool"""
+
+    def __init__(self, in_dir, out_dir, spaces, jobs=None, ext=".png", use_float=False,
+                 max_pending=None, log=None):
+        self.in_dir = in_dir
+        self.out_dir = out_dir
+        self.spaces = tuple(spaces)
+        self.ext = ext
+        self.use_float = use_float
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.jobs
+        self.log = log or (lambda message: None)
+        os.makedirs(out_dir, exist_ok=True)
+        self.manifest = Manifest(os.path.join(out_dir, MANIFEST_NAME))
+        self.keys = [output_key(space, ext, use_float) for space in self.spaces]
+        # path -> (size, mtime) seen on the previous poll, and the
+        # (path, size, mtime) already handled, so unchanged files are not rehashed
+        self.last_seen = {}
+        self.handled = set()
+        # path -> ((size, mtime) that failed, failed attempts, monotonic retry time)
+        self.failures = {}
+        # False with --once, where a failure is final
+        self.retry = True
+        self.ready = collections.deque()
+        self.pending = {}
+        self.counts = collections.Counter()
+
+    def scan(self, stable=True):
+        """Queue files whose size and mtime did not change since the last poll
+
+        With stable=False every file not handled yet is queued right away.
+        """
+        current = {}
+        for path in batch.find_images(self.in_dir):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed meanwhile
+            state = (st.st_size, st.st_mtime_ns)
+            current[path] = state
+            if st.st_size and (not stable or self.last_seen.get(path) == state) \
+                    and (path,) + state not in self.handled and self.retry_due(path, state):
+                self.handled.add((path,) + state)
+                self.ready.append((path, state))
+        self.last_seen = current
+        for path in [p for p in self.failures if p not in current]:
+            del self.failures[path]  # removed
+
+    def retry_due(self, path, state):
+        """False while a failed file waits for its retry; a changed file starts over"""
+        failure = self.failures.get(path)
+        if failure is None:
+            return True
+        failed_state, _, retry_at = failure
+        if failed_state != state:
+            del self.failures[path]
+            return True
+        return time.monotonic() >= retry_at
+
+    def fail(self, path, state, error):
+        """Log a failure and schedule the retry of path, or give up on this version of it"""
+        attempts = self.failures.get(path, (state, 0, 0))[1] + 1
+        if not self.retry:
+            self.counts["failed"] += 1
+            self.log(f"Failed: {path}: {error}")
+            return
+        if attempts >= MAX_RETRIES:
+            self.counts["failed"] += 1
+            # Stays handled, so only a change to the file brings it back
+            self.failures[path] = (state, attempts, float("inf"))
+            self.log(f"Failed: {path}: {error} (giving up after {attempts} attempts until it changes)")
+            return
+        delay = min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** (attempts - 1))
+        self.failures[path] = (state, attempts, time.monotonic() + delay)
+        self.handled.discard((path,) + state)
+        self.log(f"Failed: {path}: {error} (retry in {delay:g} s)")
+
+    def submit_ready(self, executor):
+        """Move queued files to the pool while fewer than max_pending are in flight"""
+        while self.ready and len(self.pending) < self.max_pending:
+            path, state = self.ready.popleft()
+            try:
+                digest = file_digest(path)
+            except OSError as e:
+                self.fail(path, state, e)
+                continue
+            if self.manifest.is_done(digest, self.keys):
+                self.log(f"Already converted: {os.path.basename(path)}")
+                self.counts["skipped"] += 1
+                continue
+            job = (path, self.out_dir, self.spaces, self.ext, self.use_float)
+            self.pending[executor.submit(batch._convert_job, job)] = (path, state, digest)
+
+    def collect(self, timeout):
+        """Wait up to timeout for conversions and record the finished ones"""
+        if not self.pending:
+            return
+        done, _ = wait(self.pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, state, digest = self.pending.pop(future)
+            try:
+                _, _, error = future.result()
+            except Exception as e:  # e.g. a worker killed by Ctrl+C
+                error = str(e) or type(e).__name__
+            if error:
+                self.fail(path, state, error)
+                continue
+            self.failures.pop(path, None)
+            outputs = {output_key(space, self.ext, self.use_float):
+                       batch.output_path(self.out_dir, path, space, self.ext)
+                       for space in self.spaces}
+            self.manifest.add(digest, path, outputs)
+            self.counts["converted"] += 1
+            self.log(f"Converted: {os.path.basename(path)}")
+        if done:
+            self.manifest.save()
+
+    def run(self, interval=1.0, once=False):
+        """Poll until interrupted, or with once convert the files present and return
+
+        Returns the counts of converted, skipped and failed files.
+        """
+        # Tables are decided on the files present at the start; with none, the
+        # workers decide themselves and the first one to need a table builds it
+        self.retry = not once
+        initargs = batch.prepare_tables(batch.find_images(self.in_dir), () if self.use_float else self.spaces)
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=batch._init_worker,
+                                 initargs=initargs) as executor:
+            try:
+                if once:
+                    self.scan(stable=False)
+                    while self.ready or self.pending:
+                        self.submit_ready(executor)
+                        self.collect(None)
+                while not once:
+                    next_scan = time.monotonic() + interval
+                    self.scan()
+                    self.submit_ready(executor)
+                    # Refill the pool as conversions finish until the next poll
+                    while self.pending and time.monotonic() < next_scan:
+                        self.collect(next_scan - time.monotonic())
+                        self.submit_ready(executor)
+                    time.sleep(max(0.0, next_scan - time.monotonic()))
+            except KeyboardInterrupt:
+                self.log(f"Stopping, waiting for {len(self.pending)} running conversion(s)")
+                while self.pending:
+                    self.collect(None)
+        # Files still waiting for a retry did not make it either
+        self.counts["failed"] += sum(1 for _, _, retry_at in self.failures.values()
+                                     if retry_at != float("inf"))
+        return dict(self.counts)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py watch",
+                                     description="Convert images as they are dropped into a folder")
+    parser.add_argument("in_dir", help="Directory to watch")
+    parser.add_argument("out_dir", help="Directory for converted images and the manifest")
+    parser.add_argument("--to", dest="spaces", type=batch.parse_spaces, default=["lab", "hsv"],
+                        help=f"Comma separated target spaces from {','.join(batch.TARGET_SPACES)} "
+                             "(default: lab,hsv)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Files queued on the workers at once (default: 2 x jobs)")
+    parser.add_argument("--ext", default=".png",
+                        help="Output file extension, as for batch (default: .png)")
+    parser.add_argument("--float", dest="use_float", action="store_true",
+                        help="Convert in float32; needs .npy/.npz/.tiff")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Seconds between polls of the folder (default: 1)")
+    parser.add_argument("--once", action="store_true",
+                        help="Convert the files present now and exit")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    batch.check_output_args(parser, args)
+    if not os.path.isdir(args.in_dir):
+        print(f"Error: input directory not found: {args.in_dir}", file=sys.stderr)
+        return 2
+
+    watcher = FolderWatcher(args.in_dir, args.out_dir, args.spaces, args.jobs, args.ext,
+                            args.use_float, args.max_pending,
+                            log=lambda message: print(message, file=sys.stderr))
+    if not args.once:
+        print(f"Watching {args.in_dir} (Ctrl+C to stop)", file=sys.stderr)
+    counts = watcher.run(args.interval, args.once)
+    print(f"Converted {counts.get('converted', 0)}, skipped {counts.get('skipped', 0)} already done, "
+          f"{counts.get('failed', 0)} failed")
+    return 1 if counts.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())